@@ -0,0 +1,345 @@
+import email.utils
+import os
+import random
+import threading
+import time
+from datetime import datetime, timezone
+
+import requests
+import urllib3
+
+try:
+    import ijson
+except ImportError:  # fall back to decoding whole pages
+    ijson = None
+
+from atlas_cache import page_cache
+from atlas_metrics import metrics
+
+ATLAS_API_TOKEN = os.environ.get('ATLAS_TOKEN')
+
+# API Configuration; ATLAS_API_URL points the sync at another base (e.g. benchmarks/mock_atlas.py)
+API_BASE = os.environ.get('ATLAS_API_URL', "https://api.atlas.so/v1").rstrip("/")
+API_URL = f"{API_BASE}/conversations"
+
+HEADERS = {
+    "Authorization": f"Bearer {ATLAS_API_TOKEN}",
+    "Accept": "application/json"
+}
+
+FULL_START_DATE = "2021-01-01"
+
+# Timeouts are explicit: (connect, read) seconds for every request.
+CONNECT_TIMEOUT = 10
+READ_TIMEOUT = 120
+
+# Retry policy: exponential backoff with full jitter, capped.
+MAX_RETRIES = 6
+BACKOFF_BASE = 2.0
+BACKOFF_CAP = 120.0
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+# Statuses that usually mean the page was too expensive for the gateway.
+SHRINK_STATUSES = {502, 504}
+
+# Client-side request rate shared by every fetcher thread (requests per second).
+RATE_LIMIT = float(os.environ.get('ATLAS_RATE_LIMIT', 1.0))
+
+# Page-size bounds for the adaptive controller.
+PAGE_SIZE_MAX = 3000
+PAGE_SIZE_MIN = 250
+
+# Streamed list pages are handed on in chunks of this many records, so memory per
+# in-flight page no longer grows with the page size.
+STREAM_CHUNK_ROWS = int(os.environ.get('ATLAS_STREAM_CHUNK_ROWS', 500))
+
+
+class AdaptivePageSize:
+    """Thread-safe page-size controller.
+
+    Halves the page size whenever a page times out, and grows it back by
+    half again after pages that return comfortably under ``fast_seconds``.
+    """
+
+    def __init__(self, initial=PAGE_SIZE_MAX, minimum=PAGE_SIZE_MIN, maximum=PAGE_SIZE_MAX,
+                 fast_seconds=10.0):
+        self.minimum = minimum
+        self.maximum = maximum
+        self.fast_seconds = fast_seconds
+        self._limit = max(minimum, min(initial, maximum))
+        self._lock = threading.Lock()
+
+    @property
+    def limit(self):
+        with self._lock:
+            return self._limit
+
+    def shrink(self):
+        with self._lock:
+            self._limit = max(self.minimum, self._limit // 2)
+            return self._limit
+
+    def reset(self, limit):
+        """Restore a previously used page size (e.g. from a checkpoint)."""
+        with self._lock:
+            self._limit = max(self.minimum, min(limit, self.maximum))
+            return self._limit
+
+    def record(self, elapsed):
+        """Feed back the duration of a successful page."""
+        with self._lock:
+            if elapsed < self.fast_seconds and self._limit < self.maximum:
+                self._limit = min(self.maximum, int(self._limit * 1.5))
+            return self._limit
+
+
+class RateLimiter:
+    """Thread-safe limiter spacing requests at least ``1 / per_second`` apart."""
+
+    def __init__(self, per_second=RATE_LIMIT):
+        self.interval = 1.0 / per_second if per_second and per_second > 0 else 0.0
+        self._next = 0.0
+        self._lock = threading.Lock()
+
+    def configure(self, per_second):
+        with self._lock:
+            self.interval = 1.0 / per_second if per_second and per_second > 0 else 0.0
+
+    def wait(self):
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next)
+            self._next = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+
+page_size = AdaptivePageSize()
+rate_limiter = RateLimiter()
+
+_local = threading.local()
+
+
+def get_session():
+    """Per-thread keep-alive session."""
+    session = getattr(_local, "session", None)
+    if session is None:
+        session = requests.Session()
+        session.headers.update(HEADERS)
+        _local.session = session
+    return session
+
+
+def backoff_delay(attempt):
+    """Full-jitter exponential backoff for the given 0-based attempt."""
+    return random.uniform(0, min(BACKOFF_CAP, BACKOFF_BASE * (2 ** attempt)))
+
+
+def retry_after_seconds(headers):
+    """Parse a Retry-After header (seconds or HTTP date); None if absent or invalid."""
+    value = headers.get("Retry-After") if headers else None
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        moment = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    return max(0.0, (moment - datetime.now(timezone.utc)).total_seconds())
+
+
+def get_json(url, params=None, controller=None, max_limit=None, max_retries=MAX_RETRIES):
+    """GET ``url`` and decode JSON, retrying transient failures.
+
+    When ``controller`` is given, ``params["limit"]`` follows its page size
+    (capped at ``max_limit``) and shrinks after timeouts / gateway errors.
+    Returns None once retries are exhausted or on a non-retryable status.
+    """
+    params = dict(params or {})
+    for attempt in range(max_retries + 1):
+        if controller is not None:
+            params["limit"] = min(controller.limit, max_limit or controller.limit)
+        rate_limiter.wait()
+        started = time.monotonic()
+        delay = None
+        try:
+            with metrics.timer("fetch"):
+                response = get_session().get(url, params=params, timeout=(CONNECT_TIMEOUT, READ_TIMEOUT))
+            if response.status_code == 200:
+                with metrics.timer("json_decode"):
+                    data = response.json()
+                if controller is not None:
+                    controller.record(time.monotonic() - started)
+                return data
+            if response.status_code not in RETRY_STATUSES:
+                print(f"[ERROR] API request failed, Status: {response.status_code} - {response.text}")
+                return None
+            reason = f"status {response.status_code}"
+            if response.status_code in SHRINK_STATUSES and controller is not None:
+                controller.shrink()
+            delay = retry_after_seconds(response.headers)
+        except (requests.Timeout, requests.ConnectionError, requests.exceptions.ChunkedEncodingError) as e:
+            reason = type(e).__name__
+            if controller is not None:
+                controller.shrink()
+        except ValueError as e:
+            reason = f"invalid JSON ({e})"
+
+        metrics.count("fetch_retries", reason=reason)
+        if attempt == max_retries:
+            print(f"[ERROR] API request failed after {max_retries + 1} attempts ({reason}): {url} {params}")
+            return None
+        if delay is None:
+            delay = backoff_delay(attempt)
+        print(f"[WARN] {reason} for {url} {params}; retrying in {delay:.1f}s "
+              f"(attempt {attempt + 1}/{max_retries})")
+        time.sleep(delay)
+    return None
+
+
+def fetch_conversations(cursor, start_date=FULL_START_DATE, end_date=None, controller=page_size,
+                        max_limit=None):
+    """Fetch one page of conversations, adapting the page size to API latency.
+
+    Pages already in the page cache (same window and cursor, within the TTL)
+    are served from disk. The returned page may hold fewer than PAGE_SIZE_MAX
+    records; callers must advance the cursor by ``len(data["data"])``.
+    """
+    params = {
+        "cursor": cursor,
+        "startDate": start_date,
+        "endDate": end_date or datetime.today().strftime("%Y-%m-%d"),
+    }
+    cached = page_cache.get(API_URL, params, limit=max_limit or (controller.limit if controller else None))
+    if cached is not None and cached["total"] is not None:  # streamed pages are cached without a total
+        metrics.count("cache_hits")
+        return cached
+    data = get_json(API_URL, params, controller=controller, max_limit=max_limit)
+    if data is not None:
+        page_cache.put(API_URL, params, data)
+    return data
+
+
+def count_conversations(start_date=FULL_START_DATE, end_date=None):
+    """Number of conversations in the window (the page's ``total``), or None when the API is unavailable.
+
+    Asks for a single record and bypasses the page cache, so counting a window
+    neither decodes a full page nor leaves a one-record page behind in the cache.
+    """
+    params = {
+        "cursor": 0,
+        "limit": 1,
+        "startDate": start_date,
+        "endDate": end_date or datetime.today().strftime("%Y-%m-%d"),
+    }
+    data = get_json(API_URL, params)
+    return None if data is None else data.get("total")
+
+
+def _chunks(records, size):
+    for start in range(0, len(records), size):
+        yield records[start:start + size]
+
+
+def stream_conversations(cursor, start_date=FULL_START_DATE, end_date=None, controller=page_size,
+                         max_limit=None, chunk_rows=STREAM_CHUNK_ROWS, max_retries=MAX_RETRIES):
+    """Yield one page of conversations as lists of at most ``chunk_rows`` records.
+
+    The ``data`` array is decoded item by item from the socket (ijson), so the
+    full page is never held in memory. If the stream breaks or a retryable
+    status comes back, the request resumes after the records already yielded.
+    Raises RuntimeError once retries are exhausted; yields nothing at the end
+    of data. Without ijson the page is fetched whole and split into chunks.
+    """
+    params = {
+        "cursor": cursor,
+        "startDate": start_date,
+        "endDate": end_date or datetime.today().strftime("%Y-%m-%d"),
+    }
+    page_limit = min(controller.limit, max_limit or controller.limit)
+    cached = page_cache.get(API_URL, params, limit=page_limit)
+    if cached is not None:
+        metrics.count("cache_hits")
+        yield from _chunks(cached["data"], chunk_rows)
+        return
+    if ijson is None:
+        data = fetch_conversations(cursor, start_date, end_date, controller, max_limit)
+        if data is None:
+            raise RuntimeError(f"API request failed at cursor {cursor} after retries.")
+        yield from _chunks(data.get("data") or [], chunk_rows)
+        return
+
+    cache_writer = page_cache.writer(API_URL, params)
+    emitted = 0
+    chunk = []
+    committed = False
+    try:
+        for attempt in range(max_retries + 1):
+            if emitted >= page_limit:  # the stream broke after its last record
+                if chunk:
+                    yield chunk
+                cache_writer.commit()
+                committed = True
+                return
+            request = dict(params, cursor=cursor + emitted, limit=page_limit - emitted)
+            rate_limiter.wait()
+            requested = time.monotonic()
+            suspended = 0.0  # time spent waiting on the consumer, which says nothing about API latency
+            delay = None
+            try:
+                with metrics.timer("fetch"):
+                    response = get_session().get(API_URL, params=request, stream=True,
+                                                 timeout=(CONNECT_TIMEOUT, READ_TIMEOUT))
+                with response:
+                    if response.status_code == 200:
+                        response.raw.decode_content = True
+                        items = ijson.items(response.raw, "data.item", use_float=True)
+                        decode_seconds = 0.0
+                        while True:
+                            started = time.perf_counter()
+                            record = next(items, None)
+                            decode_seconds += time.perf_counter() - started
+                            if record is None:
+                                break
+                            chunk.append(record)
+                            cache_writer.write(record)
+                            emitted += 1
+                            if len(chunk) >= chunk_rows:
+                                paused = time.monotonic()
+                                yield chunk
+                                suspended += time.monotonic() - paused
+                                chunk = []
+                        metrics.observe("json_decode", decode_seconds, rows=emitted)
+                        controller.record(time.monotonic() - requested - suspended)
+                        if chunk:
+                            yield chunk
+                        cache_writer.commit()
+                        committed = True
+                        return
+                    if response.status_code not in RETRY_STATUSES:
+                        raise RuntimeError(f"API request failed, Status: {response.status_code} - {response.text}")
+                    reason = f"status {response.status_code}"
+                    if response.status_code in SHRINK_STATUSES:
+                        controller.shrink()
+                    delay = retry_after_seconds(response.headers)
+            except (requests.RequestException, urllib3.exceptions.HTTPError, ijson.JSONError) as e:
+                reason = type(e).__name__
+                if isinstance(e, (requests.Timeout, urllib3.exceptions.TimeoutError)):
+                    controller.shrink()
+
+            metrics.count("fetch_retries", reason=reason)
+            if attempt == max_retries:
+                break
+            if delay is None:
+                delay = backoff_delay(attempt)
+            print(f"[WARN] {reason} for {API_URL} {request}; retrying in {delay:.1f}s "
+                  f"(attempt {attempt + 1}/{max_retries}, {emitted} records already read)")
+            time.sleep(delay)
+        raise RuntimeError(f"API request failed at cursor {cursor + emitted} after {max_retries + 1} attempts.")
+    finally:
+        if not committed:
+            cache_writer.abort()
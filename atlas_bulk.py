@@ -0,0 +1,153 @@
+import hashlib
+import io
+from collections import namedtuple
+from datetime import datetime
+
+from atlas_metrics import metrics
+from atlas_normalize import normalize_page
+
+# Column order shared by the staging table, COPY stream and merge statement.
+CONVERSATION_COLUMNS = (
+    "conversation_id", "customer_id", "customer_first_name", "customer_last_name",
+    "customer_email", "customer_phone", "customer_external_user_id", "customer_created_at",
+    "company_id", "company_name", "company_email", "company_website", "company_external_id",
+    "started_at", "closed_at", "created_at", "assigned_at", "assigned_by",
+    "closed_by", "assigned_agent_id", "assigned_agent_name", "assigned_agent_email",
+    "assigned_agent_created_at", "browser", "operating_system",
+    "last_message_id", "last_message_text", "last_message_channel",
+    "csat_score", "csat_comment",
+    "stats_first_response_time", "stats_avg_response_time", "stats_total_resolution_time",
+    "conversation_status", "conversation_priority", "conversation_subject",
+    "assigned_team_id", "updated_by", "tags",
+    "snoozed_until", "started_channel", "started_sub_channel", "number",
+    "customer_custom_fields", "account_custom_fields", "conversation_custom_fields",
+    "escalated_at",
+)
+
+STAGING_TABLE = "conversations_staging"
+
+# Stable hash of the normalized record, used to skip upserts that would not change anything.
+HASH_COLUMN = "row_hash"
+
+UpsertResult = namedtuple("UpsertResult", "staged inserted changed unchanged")
+
+
+# === COPY text-format encoding ===
+_COPY_ESCAPES = str.maketrans({"\\": "\\\\", "\t": "\\t", "\n": "\\n", "\r": "\\r"})
+
+
+def _array_literal(values):
+    """Render a Python list as a Postgres TEXT[] literal."""
+    items = []
+    for value in values:
+        if value is None:
+            items.append("NULL")
+        else:
+            text = str(value).replace("\\", "\\\\").replace('"', '\\"')
+            items.append(f'"{text}"')
+    return "{" + ",".join(items) + "}"
+
+
+def _copy_value(value):
+    """Encode a single value for COPY ... FROM STDIN (text format)."""
+    if value is None:
+        return "\\N"
+    if isinstance(value, datetime):
+        text = value.isoformat()
+    elif isinstance(value, (list, tuple)):
+        text = _array_literal(value)
+    elif isinstance(value, bool):
+        text = "t" if value else "f"
+    else:
+        text = str(value)
+    return text.translate(_COPY_ESCAPES)
+
+
+def copy_line(row):
+    """Encode one row as a tab-separated COPY line."""
+    return "\t".join([_copy_value(value) for value in row]) + "\n"
+
+
+def hashed_copy_line(row):
+    """Encode one row as a COPY line with its content hash appended as the last column."""
+    body = "\t".join([_copy_value(value) for value in row])
+    return f"{body}\t{hashlib.md5(body.encode('utf-8')).hexdigest()}\n"
+
+
+def build_copy_buffer(rows):
+    """Encode rows (plus their row_hash) into an in-memory buffer ready for copy_expert."""
+    buffer = io.StringIO()
+    buffer.writelines(hashed_copy_line(row) for row in rows)
+    buffer.seek(0)
+    return buffer
+
+
+def ensure_row_hash_column(conn, table="atlas.conversations"):
+    """Add the row_hash column used for change detection if it is missing."""
+    with conn.cursor() as cur:
+        cur.execute(f"ALTER TABLE {table} ADD COLUMN IF NOT EXISTS {HASH_COLUMN} TEXT;")
+
+
+def reset_row_hashes(conn, table="atlas.conversations", where=None):
+    """Clear stored row_hashes (all, or those of rows matching ``where``) so the next merge applies
+    each record again; returns rows cleared."""
+    condition = f" AND ({where})" if where else ""
+    with conn.cursor() as cur:
+        cur.execute(f"UPDATE {table} SET {HASH_COLUMN} = NULL WHERE {HASH_COLUMN} IS NOT NULL{condition};")
+        return cur.rowcount
+
+
+def bulk_upsert(conn, data, on_conflict, table="atlas.conversations", after_write=(), null_positions=()):
+    """Stream a page into a temp staging table via COPY and merge it in one statement.
+
+    ``on_conflict`` is the ``ON CONFLICT ...`` clause applied to the merge, so each
+    caller keeps its own conflict rules; it refers to the existing row as ``target``.
+    Rows whose stored ``row_hash`` already matches the incoming record are filtered
+    out before the merge, so unchanged conversations produce no new tuple versions.
+    A clause that applies the whole record should also set
+    ``row_hash = EXCLUDED.row_hash``. With ``DO NOTHING`` every existing row
+    counts as unchanged, so ``inserted`` is exactly the new conversations.
+
+    Columns at ``null_positions`` (indexes into CONVERSATION_COLUMNS) are written
+    as NULL, e.g. attributes that live in dimension tables instead.
+
+    Each ``after_write`` callable is run as ``hook(cur, table, ids)`` with the ids
+    of the rows the merge inserted or updated, in the same transaction.
+
+    Returns an UpsertResult. The caller owns the transaction; nothing is committed here.
+    """
+    with metrics.timer("normalize", rows=len(data)):
+        rows = normalize_page(data)
+        if null_positions:
+            rows = [tuple(None if i in null_positions else value for i, value in enumerate(row)) for row in rows]
+        buffer = build_copy_buffer(rows)
+    if not rows:
+        return UpsertResult(0, 0, 0, 0)
+
+    columns = ", ".join(CONVERSATION_COLUMNS + (HASH_COLUMN,))
+    staged_columns = ", ".join(f"s.{column}" for column in CONVERSATION_COLUMNS + (HASH_COLUMN,))
+
+    with metrics.timer("db_write", rows=len(rows)), conn.cursor() as cur:
+        cur.execute(
+            f"CREATE TEMP TABLE IF NOT EXISTS {STAGING_TABLE} "
+            f"(LIKE {table} INCLUDING DEFAULTS) ON COMMIT DELETE ROWS;"
+        )
+        cur.execute(f"TRUNCATE {STAGING_TABLE};")
+        cur.copy_expert(f"COPY {STAGING_TABLE} ({columns}) FROM STDIN", buffer)
+        cur.execute(
+            f"INSERT INTO {table} AS target ({columns}) "
+            f"SELECT {staged_columns} FROM {STAGING_TABLE} s "
+            f"LEFT JOIN {table} existing ON existing.conversation_id = s.conversation_id "
+            f"WHERE existing.{HASH_COLUMN} IS DISTINCT FROM s.{HASH_COLUMN} "
+            f"{on_conflict.strip().rstrip(';')} "
+            f"RETURNING conversation_id, (xmax = 0) AS inserted;"
+        )
+        written = cur.fetchall()
+        if after_write and written:
+            ids = [str(conv_id) for conv_id, _ in written]
+            for hook in after_write:
+                hook(cur, table, ids)
+
+    inserted = sum(1 for _, was_inserted in written if was_inserted)
+    changed = len(written) - inserted
+    return UpsertResult(len(rows), inserted, changed, len(rows) - len(written))
@@ -0,0 +1,207 @@
+import gzip
+import hashlib
+import json
+import os
+import pathlib
+import threading
+import time
+
+# Fetched list pages, one gzip'd JSON-lines file per (endpoint, params): a header line
+# {"url", "params", "fetched_at", "total"} followed by one conversation per line.
+CACHE_DIR = pathlib.Path(os.environ.get(
+    'ATLAS_CACHE_DIR', pathlib.Path(__file__).resolve().parent / "cache"))
+CACHE_TTL = float(os.environ.get('ATLAS_CACHE_TTL', 12 * 3600))  # seconds a page may be reused
+CACHE_MAX_BYTES = int(os.environ.get('ATLAS_CACHE_MAX_BYTES', 2 * 1024 ** 3))
+# Off unless asked for (ATLAS_CACHE=1 or --cache): the daily stages fetch different
+# windows, so they never read each other's pages and caching them only costs disk.
+CACHE_ENABLED = os.environ.get('ATLAS_CACHE') == '1'
+
+_IGNORED_PARAMS = ("limit",)  # a cached page serves any request for the same cursor
+
+
+def cache_key(url, params):
+    """Stable key for an endpoint + params, ignoring the page-size parameter."""
+    kept = {k: str(v) for k, v in sorted((params or {}).items()) if k not in _IGNORED_PARAMS}
+    return hashlib.sha1(json.dumps([url, kept]).encode("utf-8")).hexdigest()
+
+
+class PageCache:
+    """On-disk page cache with TTL expiry and oldest-first eviction past ``max_bytes``.
+
+    Safe to share between fetcher threads: files are written under a temporary
+    name and renamed into place.
+    """
+
+    def __init__(self, directory=CACHE_DIR, ttl=CACHE_TTL, max_bytes=CACHE_MAX_BYTES, enabled=True):
+        self.directory = pathlib.Path(directory)
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.enabled = enabled
+        self.hits = 0
+        self.misses = 0
+        self._size = None
+        self._lock = threading.Lock()
+
+    def configure(self, enabled=None, ttl=None):
+        if enabled is not None:
+            self.enabled = enabled
+        if ttl is not None:
+            self.ttl = ttl
+
+    def _path(self, key):
+        return self.directory / f"{key}.jsonl.gz"
+
+    def _expired(self, fetched_at):
+        return self.ttl is not None and time.time() - fetched_at > self.ttl
+
+    @staticmethod
+    def _read(path):
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            header = json.loads(f.readline())
+            records = [json.loads(line) for line in f]
+        return header, records
+
+    def get(self, url, params, limit=None):
+        """Cached ``{"data", "total"}`` for the request, or None on a miss or expired entry."""
+        if not self.enabled:
+            return None
+        path = self._path(cache_key(url, params))
+        try:
+            header, records = self._read(path)
+        except (OSError, ValueError, EOFError):
+            self.misses += 1
+            return None
+        if self._expired(header["fetched_at"]):
+            self._remove(path)
+            self.misses += 1
+            return None
+        self.hits += 1
+        return {"data": records[:limit] if limit else records, "total": header.get("total")}
+
+    def put(self, url, params, page):
+        if not self.enabled or not page:
+            return
+        writer = self.writer(url, params, total=page.get("total"))
+        for record in page.get("data") or []:
+            writer.write(record)
+        writer.commit()
+
+    def writer(self, url, params, total=None):
+        """Incremental writer for a page that is decoded record by record."""
+        return _PageWriter(self, url, params, total) if self.enabled else _NoopWriter()
+
+    def _committed(self, path):
+        with self._lock:
+            if self._size is None:
+                self._size = self._disk_usage()
+            else:
+                self._size += path.stat().st_size
+            if self._size > self.max_bytes:
+                self._evict()
+
+    def _entries(self):
+        return list(self.directory.glob("*.jsonl.gz")) if self.directory.exists() else []
+
+    def _disk_usage(self):
+        return sum(path.stat().st_size for path in self._entries())
+
+    def _remove(self, path):
+        try:
+            size = path.stat().st_size
+            path.unlink()
+        except OSError:
+            return
+        with self._lock:
+            if self._size is not None:
+                self._size -= size
+
+    def _evict(self):
+        """Drop the oldest files until the cache is back under 90% of ``max_bytes``."""
+        entries = sorted(self._entries(), key=lambda p: p.stat().st_mtime)
+        target = self.max_bytes * 0.9
+        for path in entries:
+            if self._size <= target:
+                break
+            try:
+                size = path.stat().st_size
+                path.unlink()
+            except OSError:
+                continue
+            self._size -= size
+
+    def prune(self):
+        """Remove expired entries; returns how many were dropped."""
+        dropped = 0
+        for path in self._entries():
+            try:
+                with gzip.open(path, "rt", encoding="utf-8") as f:
+                    fetched_at = json.loads(f.readline())["fetched_at"]
+            except (OSError, ValueError, KeyError, EOFError):
+                fetched_at = 0
+            if self._expired(fetched_at):
+                self._remove(path)
+                dropped += 1
+        return dropped
+
+    def iter_pages(self, url):
+        """Yield (header, records) for every cached page of ``url``, oldest fetch first.
+
+        Ignores the TTL: this is what --replay rebuilds the database from.
+        """
+        headers = []
+        for path in self._entries():
+            try:
+                with gzip.open(path, "rt", encoding="utf-8") as f:
+                    header = json.loads(f.readline())
+            except (OSError, ValueError, EOFError):
+                continue
+            if header.get("url") == url:
+                headers.append((header["fetched_at"], path))
+        for _, path in sorted(headers):
+            try:
+                yield self._read(path)
+            except (OSError, ValueError, EOFError):
+                print(f"Skipping unreadable cache file {path.name}")
+
+
+class _PageWriter:
+    """Streams records into a temporary cache file; ``commit`` publishes it, ``abort`` drops it."""
+
+    def __init__(self, cache, url, params, total):
+        self.cache = cache
+        self.path = cache._path(cache_key(url, params))
+        cache.directory.mkdir(parents=True, exist_ok=True)
+        self.tmp = self.path.with_name(f"{self.path.name}.{threading.get_ident()}.tmp")
+        self.file = gzip.open(self.tmp, "wt", encoding="utf-8", compresslevel=3)
+        header = {"url": url, "params": {k: v for k, v in params.items() if k not in _IGNORED_PARAMS},
+                  "fetched_at": time.time(), "total": total}
+        self.file.write(json.dumps(header) + "\n")
+
+    def write(self, record):
+        self.file.write(json.dumps(record, separators=(",", ":")) + "\n")
+
+    def commit(self):
+        self.file.close()
+        os.replace(self.tmp, self.path)
+        self.cache._committed(self.path)
+
+    def abort(self):
+        self.file.close()
+        try:
+            self.tmp.unlink()
+        except OSError:
+            pass
+
+
+class _NoopWriter:
+    def write(self, record):
+        pass
+
+    def commit(self):
+        pass
+
+    def abort(self):
+        pass
+
+
+page_cache = PageCache(enabled=CACHE_ENABLED)
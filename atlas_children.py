@@ -0,0 +1,126 @@
+"""Search indexes and normalized child tables for tags and custom fields.
+
+The GIN indexes are always maintained. ``conversation_tags`` and
+``conversation_custom_field_values`` are optional (ATLAS_CHILD_TABLES=1 or
+``--child-tables``); when enabled they are rewritten for every conversation a
+bulk write touches, and for every conversation of a customer or company whose
+dimension row changed, inside the same transaction, so they never drift from
+``atlas.conversations`` (or ``atlas.conversations_full``).
+"""
+
+# jsonb_path_ops: smaller and faster than the default opclass, and supports the
+# containment filters dashboards use (custom_fields @> '{"plan": "pro"}').
+SEARCH_INDEXES = (
+    ("tags_gin", "GIN (tags)"),
+    ("customer_custom_fields_gin", "GIN (customer_custom_fields jsonb_path_ops)"),
+    ("account_custom_fields_gin", "GIN (account_custom_fields jsonb_path_ops)"),
+    ("conversation_custom_fields_gin", "GIN (conversation_custom_fields jsonb_path_ops)"),
+)
+
+# scope -> JSONB column on the conversations table
+CUSTOM_FIELD_SCOPES = (
+    ("customer", "customer_custom_fields"),
+    ("account", "account_custom_fields"),
+    ("conversation", "conversation_custom_fields"),
+)
+
+
+def _schema(table):
+    return table.rsplit(".", 1)[0] if "." in table else "atlas"
+
+
+def _name(table):
+    return table.rsplit(".", 1)[-1]
+
+
+def ensure_search_indexes(conn, table="atlas.conversations"):
+    """Create the GIN indexes on tags and the custom-field columns if missing."""
+    with conn.cursor() as cur:
+        for suffix, definition in SEARCH_INDEXES:
+            cur.execute(f"CREATE INDEX IF NOT EXISTS {_name(table)}_{suffix} ON {table} USING {definition};")
+
+
+def ensure_child_tables(conn, table="atlas.conversations", source=None):
+    """Create the child tables; a freshly created pair is filled from every existing conversation."""
+    schema = _schema(table)
+    with conn.cursor() as cur:
+        cur.execute("SELECT to_regclass(%s) IS NULL;", (f"{schema}.conversation_tags",))
+        created = cur.fetchone()[0]
+        cur.execute(f"""
+            CREATE TABLE IF NOT EXISTS {schema}.conversation_tags (
+                conversation_id UUID NOT NULL,
+                tag TEXT NOT NULL,
+                PRIMARY KEY (conversation_id, tag)
+            );
+            CREATE INDEX IF NOT EXISTS conversation_tags_tag_idx ON {schema}.conversation_tags (tag);
+            CREATE TABLE IF NOT EXISTS {schema}.conversation_custom_field_values (
+                conversation_id UUID NOT NULL,
+                scope TEXT NOT NULL,
+                field TEXT NOT NULL,
+                value JSONB,
+                PRIMARY KEY (conversation_id, scope, field)
+            );
+            CREATE INDEX IF NOT EXISTS conversation_custom_field_values_field_idx
+                ON {schema}.conversation_custom_field_values (scope, field, value);
+        """)
+        if created:
+            _fill(cur, source or table, None)
+
+
+def _fill(cur, table, ids):
+    """Insert child rows for ``ids`` (or for every conversation when ``ids`` is None)."""
+    schema = _schema(table)
+    where = "WHERE c.conversation_id = ANY(%(ids)s::uuid[])" if ids is not None else ""
+    scopes = " UNION ALL ".join(
+        f"SELECT c.conversation_id, '{scope}', f.key, f.value FROM {table} c "
+        f"CROSS JOIN LATERAL jsonb_each(CASE WHEN jsonb_typeof(c.{column}) = 'object' "
+        f"THEN c.{column} ELSE '{{}}'::jsonb END) f {where}"
+        for scope, column in CUSTOM_FIELD_SCOPES
+    )
+    params = {"ids": ids}
+    cur.execute(
+        f"INSERT INTO {schema}.conversation_tags (conversation_id, tag) "
+        f"SELECT DISTINCT c.conversation_id, t.tag FROM {table} c "
+        f"CROSS JOIN LATERAL unnest(c.tags) AS t(tag) {where} "
+        f"{'AND' if where else 'WHERE'} t.tag IS NOT NULL;",
+        params,
+    )
+    cur.execute(
+        f"INSERT INTO {schema}.conversation_custom_field_values (conversation_id, scope, field, value) {scopes};",
+        params,
+    )
+
+
+def refresh_child_tables(cur, table, ids, source=None):
+    """Rewrite the child rows of the conversations in ``ids`` from their stored values.
+
+    ``source`` is the relation read from (default ``table``); with dimension
+    tables on it is the wide compatibility view, where custom fields live.
+    """
+    if not ids:
+        return
+    schema = _schema(table)
+    cur.execute(f"DELETE FROM {schema}.conversation_tags WHERE conversation_id = ANY(%s::uuid[]);", (ids,))
+    cur.execute(f"DELETE FROM {schema}.conversation_custom_field_values WHERE conversation_id = ANY(%s::uuid[]);",
+                (ids,))
+    _fill(cur, source or table, ids)
+
+
+def refresh_dimension_children(cur, table, customer_ids=(), company_ids=(), source=None):
+    """Rewrite the child rows of every conversation of these customers and companies.
+
+    With dimension tables on, customer and account custom fields live in
+    ``atlas.customers`` / ``atlas.companies``; a change there leaves the
+    conversation rows (and their hashes) untouched, so their child rows are
+    refreshed here instead. Returns the number of conversations refreshed.
+    """
+    if not customer_ids and not company_ids:
+        return 0
+    cur.execute(
+        f"SELECT conversation_id FROM {table} "
+        f"WHERE customer_id = ANY(%s::uuid[]) OR company_id = ANY(%s::uuid[]);",
+        (list(customer_ids), list(company_ids)),
+    )
+    ids = [str(conv_id) for conv_id, in cur.fetchall()]
+    refresh_child_tables(cur, table, ids, source)
+    return len(ids)
@@ -0,0 +1,141 @@
+import atexit
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+import psycopg2
+from psycopg2 import pool as pg_pool
+
+from atlas_metrics import metrics
+
+# PostgreSQL Configuration
+DB_CONFIG = {
+    "dbname": os.environ.get('DB_NAME'),
+    "user": os.environ.get('DB_USER'),
+    "password": os.environ.get('DB_PASS'),
+    "host": os.environ.get('DB_HOST'),
+    "port": os.environ.get('DB_PORT', "5432"),
+    "sslmode": os.environ.get('DB_SSLMODE', "require"),
+    "options": "-c search_path=atlas",
+}
+
+POOL_MIN = int(os.environ.get('DB_POOL_MIN', 1))
+POOL_MAX = int(os.environ.get('DB_POOL_MAX', 12))
+# Connections idle for longer than this are pinged before being handed out.
+HEALTH_CHECK_IDLE_SECONDS = 30
+CONNECT_RETRIES = 3
+
+
+class ConnectionPool:
+    """Bounded, thread-safe pool of long-lived PostgreSQL connections.
+
+    Callers block while all ``maxconn`` connections are checked out instead of
+    failing, idle connections are health-checked before reuse, and broken
+    connections are discarded and replaced transparently.
+    """
+
+    def __init__(self, minconn=POOL_MIN, maxconn=POOL_MAX, **config):
+        self._config = config or DB_CONFIG
+        self._pool = pg_pool.ThreadedConnectionPool(minconn, maxconn, **self._config)
+        self._slots = threading.BoundedSemaphore(maxconn)
+        self._last_used = {}
+        self._lock = threading.Lock()
+        self.closed = False
+
+    def _is_healthy(self, conn):
+        if conn.closed:
+            return False
+        with self._lock:
+            idle = time.monotonic() - self._last_used.get(id(conn), 0)
+        if idle < HEALTH_CHECK_IDLE_SECONDS:
+            return True
+        try:
+            with conn.cursor() as cur:
+                cur.execute("SELECT 1;")
+            conn.rollback()
+            return True
+        except psycopg2.Error:
+            return False
+
+    def getconn(self):
+        """Borrow a healthy connection, waiting for a free slot if needed."""
+        self._slots.acquire()
+        try:
+            for attempt in range(CONNECT_RETRIES):
+                try:
+                    conn = self._pool.getconn()
+                except psycopg2.OperationalError as e:
+                    print(f"[WARN] Database connect failed (attempt {attempt + 1}): {e}")
+                    time.sleep(2 ** attempt)
+                    continue
+                if self._is_healthy(conn):
+                    return conn
+                print("[WARN] Discarding broken database connection and reconnecting.")
+                self._pool.putconn(conn, close=True)
+            raise psycopg2.OperationalError("Could not obtain a healthy database connection.")
+        except BaseException:
+            self._slots.release()
+            raise
+
+    def putconn(self, conn, close=False):
+        """Return a connection; broken or explicitly closed ones are dropped."""
+        try:
+            if not conn.closed and not close:
+                if conn.get_transaction_status() != psycopg2.extensions.TRANSACTION_STATUS_IDLE:
+                    conn.rollback()
+                with self._lock:
+                    self._last_used[id(conn)] = time.monotonic()
+            self._pool.putconn(conn, close=close or bool(conn.closed))
+        finally:
+            self._slots.release()
+
+    def closeall(self):
+        if not self.closed:
+            self._pool.closeall()
+            self.closed = True
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool():
+    """Return the process-wide connection pool, creating it on first use."""
+    global _pool
+    with _pool_lock:
+        if _pool is None or _pool.closed:
+            _pool = ConnectionPool()
+        return _pool
+
+
+@atexit.register
+def close_pool():
+    """Close every pooled connection (run automatically at interpreter exit)."""
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.closeall()
+            _pool = None
+
+
+@contextmanager
+def connection():
+    """Borrow a pooled connection; commit on success, roll back on error."""
+    db_pool = get_pool()
+    conn = db_pool.getconn()
+    broken = False
+    try:
+        yield conn
+        with metrics.timer("commit"):
+            conn.commit()
+    except BaseException as e:
+        broken = isinstance(e, (psycopg2.OperationalError, psycopg2.InterfaceError))
+        if not conn.closed:
+            try:
+                conn.rollback()
+            except psycopg2.Error:
+                broken = True
+        raise
+    finally:
+        db_pool.putconn(conn, close=broken)
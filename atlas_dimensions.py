@@ -0,0 +1,296 @@
+"""Customer, company and agent dimension tables.
+
+With dimensions enabled (ATLAS_DIMENSIONS=1 or ``--dimensions``) every page's
+customers, companies and agents are deduplicated in Python and upserted once
+each; the matching attribute columns of ``atlas.conversations`` are written as
+NULL, so each conversation row only carries the customer_id / company_id /
+assigned_agent_id keys. ``atlas.conversations_full`` presents the old wide
+shape by joining the dimensions back (falling back to values stored before the
+switch).
+
+Rows written before the switch keep their wide values until they are shrunk:
+
+    python atlas_dimensions.py shrink
+
+copies those values into the dimension tables (filling only attributes a
+dimension row lacks) and then nulls the moved columns in committed batches.
+Afterwards the view shows each customer's, company's and agent's current
+attributes instead of the copy an old conversation stored. VACUUM
+atlas.conversations afterwards so the freed space is reused.
+"""
+import argparse
+import hashlib
+import json
+
+from psycopg2.extras import execute_values
+
+from atlas_bulk import CONVERSATION_COLUMNS
+from atlas_db import connection
+from atlas_normalize import convert_to_timestamp
+
+COMPAT_VIEW = "conversations_full"
+
+# name -> (key column, [(column, type)])
+DIMENSIONS = {
+    "customers": ("customer_id", [
+        ("first_name", "VARCHAR(255)"),
+        ("last_name", "VARCHAR(255)"),
+        ("email", "VARCHAR(255)"),
+        ("phone", "VARCHAR(50)"),
+        ("external_user_id", "VARCHAR(255)"),
+        ("created_at", "TIMESTAMP"),
+        ("company_id", "UUID"),
+        ("custom_fields", "JSONB"),
+    ]),
+    "companies": ("company_id", [
+        ("name", "VARCHAR(255)"),
+        ("email", "VARCHAR(255)"),
+        ("website", "VARCHAR(255)"),
+        ("external_id", "VARCHAR(255)"),
+        ("custom_fields", "JSONB"),
+    ]),
+    "agents": ("agent_id", [
+        ("name", "VARCHAR(255)"),
+        ("email", "VARCHAR(255)"),
+        ("created_at", "TIMESTAMP"),
+    ]),
+}
+
+# conversations column -> (view alias, dimension column); these move out of the conversation row
+MOVED_COLUMNS = {
+    "customer_first_name": ("cu", "first_name"),
+    "customer_last_name": ("cu", "last_name"),
+    "customer_email": ("cu", "email"),
+    "customer_phone": ("cu", "phone"),
+    "customer_external_user_id": ("cu", "external_user_id"),
+    "customer_created_at": ("cu", "created_at"),
+    "customer_custom_fields": ("cu", "custom_fields"),
+    "company_name": ("co", "name"),
+    "company_email": ("co", "email"),
+    "company_website": ("co", "website"),
+    "company_external_id": ("co", "external_id"),
+    "account_custom_fields": ("co", "custom_fields"),
+    "assigned_agent_name": ("ag", "name"),
+    "assigned_agent_email": ("ag", "email"),
+    "assigned_agent_created_at": ("ag", "created_at"),
+}
+
+# dimension table -> (view alias, conversations column holding its key)
+SOURCES = {
+    "customers": ("cu", "customer_id"),
+    "companies": ("co", "company_id"),
+    "agents": ("ag", "assigned_agent_id"),
+}
+
+# Positions in the normalized conversation row that are written as NULL
+MOVED_POSITIONS = frozenset(CONVERSATION_COLUMNS.index(column) for column in MOVED_COLUMNS)
+
+
+def ensure_dimension_tables(conn, schema="atlas"):
+    """Create the dimension tables, their custom-field indexes, the key indexes and the compatibility view."""
+    with conn.cursor() as cur:
+        # The view joins on these, and dimension changes look up the conversations they affect
+        for _, key in SOURCES.values():
+            cur.execute(f"CREATE INDEX IF NOT EXISTS conversations_{key}_idx ON {schema}.conversations ({key});")
+        for table, (key, columns) in DIMENSIONS.items():
+            body = ",\n".join(f"    {column} {kind}" for column, kind in columns)
+            cur.execute(f"""
+                CREATE TABLE IF NOT EXISTS {schema}.{table} (
+                    {key} UUID PRIMARY KEY,
+                {body},
+                    row_hash TEXT,
+                    updated_at TIMESTAMP NOT NULL DEFAULT now()
+                );
+            """)
+            if any(column == "custom_fields" for column, _ in columns):
+                cur.execute(f"CREATE INDEX IF NOT EXISTS {table}_custom_fields_gin "
+                            f"ON {schema}.{table} USING GIN (custom_fields jsonb_path_ops);")
+        create_compat_view(cur, schema)
+
+
+def create_compat_view(cur, schema="atlas"):
+    """(Re)create the wide view; built from the live column list so enrichment columns are included."""
+    cur.execute(
+        "SELECT attname FROM pg_attribute WHERE attrelid = %s::regclass AND attnum > 0 AND NOT attisdropped "
+        "ORDER BY attnum;",
+        (f"{schema}.conversations",),
+    )
+    select = []
+    for (column,) in cur.fetchall():
+        if column in MOVED_COLUMNS:
+            alias, dim_column = MOVED_COLUMNS[column]
+            select.append(f"COALESCE({alias}.{dim_column}, c.{column}) AS {column}")
+        else:
+            select.append(f"c.{column}")
+    cur.execute(f"""
+        CREATE OR REPLACE VIEW {schema}.{COMPAT_VIEW} AS
+        SELECT {", ".join(select)}
+        FROM {schema}.conversations c
+        LEFT JOIN {schema}.customers cu ON cu.customer_id = c.customer_id
+        LEFT JOIN {schema}.companies co ON co.company_id = c.company_id
+        LEFT JOIN {schema}.agents ag ON ag.agent_id = c.assigned_agent_id;
+    """)
+
+
+def _json(value):
+    return json.dumps(value) if value is not None else None
+
+
+def extract_dimensions(conversations):
+    """Deduplicated {table: {id: values tuple}} for a page; the last occurrence of an id wins."""
+    found = {table: {} for table in DIMENSIONS}
+    ts = convert_to_timestamp
+    for conversation in conversations:
+        customer = conversation.get("customer") or {}
+        account = customer.get("account") or {}
+        agent = conversation.get("assignedAgent") or {}
+        if customer.get("id"):
+            found["customers"][customer["id"]] = (
+                customer.get("firstName"), customer.get("lastName"), customer.get("email"),
+                customer.get("phoneNumber"), customer.get("externalUserId"), ts(customer.get("createdAt")),
+                customer.get("companyId"), _json(customer.get("customFields")),
+            )
+        if customer.get("companyId") and account:
+            found["companies"][customer["companyId"]] = (
+                account.get("name"), account.get("email"), account.get("website"),
+                account.get("externalId"), _json(account.get("customFields")),
+            )
+        if agent.get("id"):
+            found["agents"][agent["id"]] = (
+                agent.get("firstName"), agent.get("email"), ts(agent.get("createdAt")),
+            )
+    return found
+
+
+def _row_hash(values):
+    return hashlib.md5(json.dumps(values, default=str).encode("utf-8")).hexdigest()
+
+
+def write_dimensions(conn, conversations, schema="atlas"):
+    """Upsert the page's dimension rows; returns {table: keys of the rows actually written}.
+
+    Rows are sent in key order so concurrent writers (backfill shards) lock them
+    in the same order, and rows whose hash is unchanged are not rewritten. Null
+    attributes never overwrite stored ones, matching the conversation merge.
+    """
+    written = {}
+    with conn.cursor() as cur:
+        for table, rows in extract_dimensions(conversations).items():
+            if not rows:
+                written[table] = []
+                continue
+            key, columns = DIMENSIONS[table]
+            names = [column for column, _ in columns]
+            casts = ", ".join(["%s::uuid"] + [f"%s::{kind.split('(')[0].lower()}" for _, kind in columns] + ["%s"])
+            assignments = ", ".join(f"{name} = COALESCE(EXCLUDED.{name}, target.{name})" for name in names)
+            result = execute_values(
+                cur,
+                f"""
+                INSERT INTO {schema}.{table} AS target ({key}, {", ".join(names)}, row_hash)
+                VALUES %s
+                ON CONFLICT ({key}) DO UPDATE SET {assignments}, row_hash = EXCLUDED.row_hash, updated_at = now()
+                WHERE target.row_hash IS DISTINCT FROM EXCLUDED.row_hash
+                RETURNING {key}
+                """,
+                [(dim_id, *values, _row_hash(values)) for dim_id, values in sorted(rows.items())],
+                template=f"({casts})",
+                page_size=len(rows),
+                fetch=True,
+            )
+            written[table] = [str(dim_id) for dim_id, in result]
+    return written
+
+
+# === Maintenance ===
+SHRINK_BATCH_ROWS = 50_000
+
+
+def _moved_columns(table):
+    """conversations columns that ``table`` takes over."""
+    alias = SOURCES[table][0]
+    return [column for column, (owner, _) in MOVED_COLUMNS.items() if owner == alias]
+
+
+def _source_columns(table):
+    """{dimension column: conversations column} for one dimension table."""
+    alias = SOURCES[table][0]
+    moved = {dim_column: column for column, (owner, dim_column) in MOVED_COLUMNS.items() if owner == alias}
+    return {column: moved.get(column, column) for column, _ in DIMENSIONS[table][1]}
+
+
+def backfill_dimensions(conn, schema="atlas"):
+    """Copy the wide values of existing conversations into the dimension tables; returns {table: rows}.
+
+    A dimension row takes its attributes from its newest conversation, and only
+    fills attributes it does not have yet. New rows get no row_hash, so the
+    next sync that sees them rewrites them from the API.
+    """
+    written = {}
+    with conn.cursor() as cur:
+        for table, (key, _) in DIMENSIONS.items():
+            source = _source_columns(table)
+            source_key = SOURCES[table][1]
+            moved = _moved_columns(table)
+            cur.execute(f"""
+                INSERT INTO {schema}.{table} AS target ({key}, {", ".join(source)})
+                SELECT DISTINCT ON (c.{source_key}) c.{source_key}, {", ".join(f"c.{column}" for column in source.values())}
+                FROM {schema}.conversations c
+                WHERE c.{source_key} IS NOT NULL AND ({" OR ".join(f"c.{column} IS NOT NULL" for column in moved)})
+                ORDER BY c.{source_key}, c.created_at DESC NULLS LAST
+                ON CONFLICT ({key}) DO UPDATE SET
+                    {", ".join(f"{column} = COALESCE(target.{column}, EXCLUDED.{column})" for column in source)}
+                WHERE {" OR ".join(f"target.{column} IS NULL" for column in source)};
+            """)
+            written[table] = cur.rowcount
+    return written
+
+
+def shrink(batch_rows=SHRINK_BATCH_ROWS, schema="atlas"):
+    """Backfill the dimension tables, then null the moved columns of every conversation; returns rows shrunk.
+
+    Each batch commits on its own, so an interrupted run keeps its progress and
+    a rerun carries on. Conversations without the dimension's key keep their
+    values, since the view has nothing to join them to.
+    """
+    with connection() as conn:
+        ensure_dimension_tables(conn, schema)
+        for table, rows in backfill_dimensions(conn, schema).items():
+            print(f"Backfilled {rows} rows into {schema}.{table}.")
+
+    shrunk = 0
+    for table, (_, source_key) in SOURCES.items():
+        moved = _moved_columns(table)
+        while True:
+            with connection() as conn:
+                with conn.cursor() as cur:
+                    cur.execute(f"""
+                        UPDATE {schema}.conversations SET {", ".join(f"{column} = NULL" for column in moved)}
+                        WHERE conversation_id IN (
+                            SELECT conversation_id FROM {schema}.conversations
+                            WHERE {source_key} IS NOT NULL AND ({" OR ".join(f"{column} IS NOT NULL" for column in moved)})
+                            LIMIT %s
+                        );
+                    """, (batch_rows,))
+                    rows = cur.rowcount
+            if not rows:
+                break
+            shrunk += rows
+            print(f"Nulled {table} columns on {rows} conversations ({shrunk} so far).")
+    return shrunk
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Dimension table maintenance for atlas.conversations.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    command = commands.add_parser("shrink", help="move the wide attribute values of existing rows into the dimensions")
+    command.add_argument("--batch-rows", type=int, default=SHRINK_BATCH_ROWS,
+                         help="conversations updated per transaction (default: %(default)s)")
+    args = parser.parse_args(argv)
+
+    if args.command == "shrink":
+        shrunk = shrink(args.batch_rows)
+        print(f"Shrunk {shrunk} conversation rows; run VACUUM atlas.conversations to reuse the space.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,337 @@
+import argparse
+import asyncio
+import json
+import os
+import time
+
+import aiohttp
+from psycopg2.extras import execute_values
+
+from atlas_api import API_URL, HEADERS, MAX_RETRIES, RETRY_STATUSES, backoff_delay, retry_after_seconds
+from atlas_db import connection
+from atlas_metrics import metrics
+
+ATLAS_API_BASE = f'{API_URL}/'
+
+# Global limits shared by every enricher in a run.
+CONCURRENCY = int(os.environ.get('ATLAS_ENRICH_CONCURRENCY', 20))
+RATE_LIMIT = float(os.environ.get('ATLAS_ENRICH_RATE_LIMIT', 10.0))  # requests per second
+REQUEST_TIMEOUT = 30  # seconds, per request
+
+# Results are buffered and written in one UPDATE per flush, committed per flush.
+FLUSH_ROWS = 500
+FLUSH_SECONDS = 5.0
+
+# Rows pulled per round-trip from the server-side work-queue cursor.
+WORK_ITERSIZE = 2000
+
+
+class Enricher:
+    """One per-conversation field filled from an Atlas endpoint.
+
+    ``path`` builds the URL suffix for a conversation id and ``parse`` turns the
+    decoded JSON into the value stored in ``column``. ``backfill_sql``, when set,
+    fills the column from data the main sync already stored, so the API is only
+    called for rows it could not fill.
+    """
+
+    def __init__(self, column, path, parse, backfill_sql=None):
+        self.column = column
+        self.path = path
+        self.parse = parse
+        self.backfill_sql = backfill_sql
+
+    def url(self, conv_id):
+        return f"{ATLAS_API_BASE}{self.path(conv_id)}"
+
+
+def _parse_ticket_number(data):
+    number = data.get("number")
+    return str(number) if number is not None else None
+
+
+def _parse_first_message(data):
+    messages = data.get("data")
+    return (messages[0].get("text") if messages else None) or ""  # '' marks an empty history as done
+
+
+# The list endpoint already returns `number`, which the sync stores; copy it over
+# and only hit GET /conversations/{id} for rows that arrived without one.
+TICKET_NUMBER = Enricher(
+    "ticket_number", lambda conv_id: f"{conv_id}", _parse_ticket_number,
+    backfill_sql="""
+        UPDATE atlas.conversations SET ticket_number = number::text
+        WHERE ticket_number IS NULL AND number IS NOT NULL;
+    """,
+)
+# Not in ENRICHERS: atlas_messages derives first_message from the stored history and
+# only refetches conversations whose last message moved, instead of one call per row.
+FIRST_MESSAGE = Enricher("first_message", lambda conv_id: f"{conv_id}/messages", _parse_first_message)
+
+ENRICHERS = {enricher.column: enricher for enricher in (TICKET_NUMBER,)}
+
+
+class TokenBucket:
+    """Async token bucket: ``rate`` tokens per second, bursting up to ``capacity``."""
+
+    def __init__(self, rate=RATE_LIMIT, capacity=None):
+        self.rate = rate
+        self.capacity = capacity or max(1.0, rate)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        if not self.rate or self.rate <= 0:
+            return
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+
+async def fetch_json(session, url, bucket, limiter, max_retries=MAX_RETRIES):
+    """GET ``url`` under the global limits, retrying 429/5xx and timeouts; None on failure."""
+    for attempt in range(max_retries + 1):
+        await bucket.acquire()
+        delay = None
+        try:
+            async with limiter:
+                started = time.perf_counter()
+                async with session.get(url) as response:
+                    if response.status == 200:
+                        body = await response.read()
+                        metrics.observe("enrich_fetch", time.perf_counter() - started)
+                        with metrics.timer("enrich_decode"):
+                            return json.loads(body)
+                    if response.status not in RETRY_STATUSES:
+                        print(f"Failed for {url} - Status {response.status}")
+                        return None
+                    reason = f"status {response.status}"
+                    delay = retry_after_seconds(response.headers)
+        except (aiohttp.ClientError, asyncio.TimeoutError, ValueError) as e:
+            reason = type(e).__name__
+        metrics.count("enrich_retries", reason=reason)
+        if attempt == max_retries:
+            print(f"Failed for {url} after {max_retries + 1} attempts ({reason})")
+            return None
+        await asyncio.sleep(delay if delay is not None else backoff_delay(attempt))
+    return None
+
+
+def ensure_columns(enrichers):
+    """Add the enrichment columns, plus partial indexes over the rows still missing them."""
+    with connection() as conn:
+        with conn.cursor() as cur:
+            for enricher in enrichers:
+                cur.execute(f"ALTER TABLE atlas.conversations ADD COLUMN IF NOT EXISTS {enricher.column} TEXT;")
+                cur.execute(
+                    f"CREATE INDEX IF NOT EXISTS conversations_{enricher.column}_missing_idx "
+                    f"ON atlas.conversations (conversation_id) WHERE {enricher.column} IS NULL;"
+                )
+
+
+def backfill_from_stored(enrichers):
+    """Fill enrichment columns from already-synced data; returns rows updated per column."""
+    filled = {}
+    with connection() as conn:
+        with conn.cursor() as cur:
+            for enricher in enrichers:
+                if enricher.backfill_sql:
+                    cur.execute(enricher.backfill_sql)
+                    filled[enricher.column] = cur.rowcount
+    return filled
+
+
+def iter_pending_work(enrichers, itersize=WORK_ITERSIZE):
+    """Yield chunks of (conversation_id, [enrichers still missing a value]).
+
+    Reads through a named server-side cursor, so only ``itersize`` ids are in
+    memory at a time and work can start after the first round-trip.
+    """
+    flags = ", ".join(f"{e.column} IS NULL" for e in enrichers)
+    where = " OR ".join(f"{e.column} IS NULL" for e in enrichers)
+    with connection() as conn:
+        with conn.cursor(name="enrichment_work") as cur:
+            cur.itersize = itersize
+            cur.execute(f"SELECT conversation_id, {flags} FROM atlas.conversations WHERE {where};")
+            while True:
+                rows = cur.fetchmany(itersize)
+                if not rows:
+                    return
+                yield [(row[0], [e for e, missing in zip(enrichers, row[1:]) if missing]) for row in rows]
+
+
+def write_batch(columns, rows):
+    """Apply many results for the same column set with one UPDATE ... FROM (VALUES ...)."""
+    assignments = ", ".join(f"{column} = v.{column}::text" for column in columns)
+    with connection() as conn, metrics.timer("enrich_db_write", rows=len(rows)):
+        with conn.cursor() as cur:
+            execute_values(
+                cur,
+                f"""
+                UPDATE atlas.conversations AS c SET {assignments}
+                FROM (VALUES %s) AS v (conversation_id, {", ".join(columns)})
+                WHERE c.conversation_id = v.conversation_id::uuid
+                """,
+                rows,
+                page_size=len(rows),
+            )
+
+
+class UpdateBuffer:
+    """Collects enrichment results and flushes them by row count or age.
+
+    Rows are grouped by the set of columns they fill so each group is one
+    set-based UPDATE; every flush commits on its own, so a crash loses at
+    most the rows buffered since the last flush. Subclasses change what is
+    buffered by overriding ``add`` and ``_write``.
+    """
+
+    label = "enriched conversations"
+
+    def __init__(self, max_rows=FLUSH_ROWS, max_seconds=FLUSH_SECONDS):
+        self.max_rows = max_rows
+        self.max_seconds = max_seconds
+        self.flushed = 0
+        self._groups = {}
+        self._size = 0
+        self._oldest = None
+        self._lock = asyncio.Lock()
+
+    def add(self, conv_id, values):
+        columns = tuple(values)
+        self._groups.setdefault(columns, []).append((str(conv_id), *values.values()))
+        self._size += 1
+        if self._oldest is None:
+            self._oldest = time.monotonic()
+
+    def due(self):
+        if not self._size:
+            return False
+        return self._size >= self.max_rows or time.monotonic() - self._oldest >= self.max_seconds
+
+    async def flush(self):
+        async with self._lock:
+            groups, size = self._groups, self._size
+            self._groups, self._size, self._oldest = {}, 0, None
+            if not size:
+                return
+            await self._write(groups)
+            self.flushed += size
+            print(f"Flushed {size} {self.label} ({self.flushed} total).")
+
+    async def _write(self, groups):
+        for columns, rows in groups.items():
+            await asyncio.to_thread(write_batch, columns, rows)
+
+    async def flush_periodically(self):
+        """Background task enforcing the age limit when results trickle in."""
+        while True:
+            await asyncio.sleep(self.max_seconds)
+            if self.due():
+                await self.flush()
+
+
+async def _enrich_one(session, bucket, limiter, buffer, conv_id, enrichers):
+    payloads = await asyncio.gather(*(fetch_json(session, e.url(conv_id), bucket, limiter) for e in enrichers))
+    values = {e.column: e.parse(payload) for e, payload in zip(enrichers, payloads) if payload is not None}
+    if not values:
+        return False
+    buffer.add(conv_id, values)
+    if buffer.due():
+        await buffer.flush()
+    return True
+
+
+async def process_work(chunks, handle, concurrency, counts):
+    """Feed the items of a blocking iterator of chunks to ``concurrency`` workers.
+
+    ``handle(item)`` returns True on success; ``counts`` gets "queued",
+    "updated" and "failed" totals. The queue between the iterator (usually a
+    server-side DB cursor) and the workers is bounded.
+    """
+    queue = asyncio.Queue(maxsize=concurrency * 4)
+
+    async def producer():
+        try:
+            while True:
+                chunk = await asyncio.to_thread(next, chunks, None)
+                if chunk is None:
+                    break
+                for item in chunk:
+                    await queue.put(item)
+                counts["queued"] += len(chunk)
+        finally:
+            await asyncio.to_thread(chunks.close)
+            for _ in range(concurrency):
+                await queue.put(None)
+
+    async def worker():
+        while True:
+            item = await queue.get()
+            if item is None:
+                return
+            try:
+                ok = await handle(item)
+            except Exception as e:
+                print(f"Error for {item[0]}: {e}")
+                ok = False
+            counts["updated" if ok else "failed"] += 1
+
+    await asyncio.gather(producer(), *(worker() for _ in range(concurrency)))
+
+
+async def enrich(enrichers, concurrency=CONCURRENCY, rate_limit=RATE_LIMIT,
+                 flush_rows=FLUSH_ROWS, flush_seconds=FLUSH_SECONDS):
+    """Run every enricher over the conversations that still need it, in a single pass."""
+    metrics.start("enrich")
+    await asyncio.to_thread(ensure_columns, enrichers)
+    filled = await asyncio.to_thread(backfill_from_stored, enrichers)
+    for column, count in filled.items():
+        print(f"Filled {column} for {count} conversations from synced data (no API calls).")
+    print(f"Streaming conversations that need enrichment ({', '.join(e.column for e in enrichers)}).")
+
+    bucket = TokenBucket(rate_limit)
+    limiter = asyncio.Semaphore(concurrency)
+    buffer = UpdateBuffer(flush_rows, flush_seconds)
+    counts = {"queued": 0, "updated": 0, "failed": 0}
+    timeout = aiohttp.ClientTimeout(total=REQUEST_TIMEOUT)
+    connector = aiohttp.TCPConnector(limit=concurrency, keepalive_timeout=60)
+
+    async with aiohttp.ClientSession(headers=HEADERS, timeout=timeout, connector=connector) as session:
+        async def handle(item):
+            conv_id, todo = item
+            return await _enrich_one(session, bucket, limiter, buffer, conv_id, todo)
+
+        flusher = asyncio.create_task(buffer.flush_periodically())
+        try:
+            await process_work(iter_pending_work(enrichers), handle, concurrency, counts)
+        finally:
+            flusher.cancel()
+            await buffer.flush()
+
+    print(f"Done! {counts['queued']} queued, {counts['updated']} updated, {counts['failed']} failed.")
+    metrics.report()
+    return counts
+
+
+def main(enrichers, argv=None):
+    """Command-line entry point shared by the enrichment scripts."""
+    parser = argparse.ArgumentParser(description="Atlas per-conversation enrichment.")
+    parser.add_argument("--concurrency", type=int, default=CONCURRENCY,
+                        help="max in-flight API requests (default: %(default)s)")
+    parser.add_argument("--rate-limit", type=float, default=RATE_LIMIT,
+                        help="max API requests per second (default: %(default)s)")
+    parser.add_argument("--batch-size", type=int, default=FLUSH_ROWS,
+                        help="results buffered before a flush (default: %(default)s)")
+    parser.add_argument("--flush-seconds", type=float, default=FLUSH_SECONDS,
+                        help="max age of buffered results before a flush (default: %(default)s)")
+    args = parser.parse_args(argv)
+    asyncio.run(enrich(enrichers, concurrency=args.concurrency, rate_limit=args.rate_limit,
+                       flush_rows=args.batch_size, flush_seconds=args.flush_seconds))
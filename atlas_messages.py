@@ -0,0 +1,256 @@
+"""Full message history sync into atlas.messages.
+
+Every conversation's /messages list is stored in full: bulk COPY into a staging
+table, then one merge per flush. atlas.message_sync_state remembers each
+conversation's last_message_id as of its last fetch, so a run only fetches the
+conversations whose last_message_id (kept current by the list sync) has moved
+since. first_message is derived from the stored history in the same
+transaction, so it needs no API call of its own.
+
+    python atlas_messages.py --concurrency 20 --rate-limit 10
+"""
+import argparse
+import asyncio
+import io
+import json
+import os
+import time
+
+import aiohttp
+from psycopg2.extras import execute_values
+
+from atlas_api import HEADERS
+from atlas_bulk import copy_line
+from atlas_db import connection
+from atlas_enrich import (ATLAS_API_BASE, CONCURRENCY, FIRST_MESSAGE, FLUSH_SECONDS, RATE_LIMIT, REQUEST_TIMEOUT,
+                          WORK_ITERSIZE, TokenBucket, UpdateBuffer, ensure_columns, fetch_json, process_work)
+from atlas_metrics import metrics
+from atlas_normalize import convert_to_timestamp
+
+MESSAGES_LIMIT = int(os.environ.get('ATLAS_MESSAGES_LIMIT', 100))  # messages per /messages request
+FLUSH_CONVERSATIONS = 200  # histories buffered before a flush
+
+MESSAGES_TABLE_QUERY = """
+CREATE TABLE IF NOT EXISTS atlas.messages (
+    conversation_id UUID NOT NULL,
+    message_id BIGINT NOT NULL,
+    position INTEGER NOT NULL,
+    text TEXT,
+    channel VARCHAR(255),
+    created_at TIMESTAMP,
+    payload JSONB,
+    PRIMARY KEY (conversation_id, message_id)
+);
+CREATE TABLE IF NOT EXISTS atlas.message_sync_state (
+    conversation_id UUID PRIMARY KEY,
+    last_message_id INTEGER,
+    message_count INTEGER NOT NULL,
+    synced_at TIMESTAMP NOT NULL DEFAULT now()
+);
+"""
+
+# Column order shared by the staging table and the COPY stream (the table's own order).
+MESSAGE_COLUMNS = ("conversation_id", "message_id", "position", "text", "channel", "created_at", "payload")
+
+STAGING_TABLE = "messages_staging"
+
+
+def create_tables():
+    with connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute(MESSAGES_TABLE_QUERY)
+
+
+def iter_stale_conversations(full=False, itersize=WORK_ITERSIZE):
+    """Yield chunks of (conversation_id, last_message_id) whose stored history is out of date."""
+    stale = "" if full else "AND s.last_message_id IS DISTINCT FROM c.last_message_id"
+    with connection() as conn:
+        with conn.cursor(name="message_work") as cur:
+            cur.itersize = itersize
+            cur.execute(f"""
+                SELECT c.conversation_id, c.last_message_id
+                FROM atlas.conversations c
+                LEFT JOIN atlas.message_sync_state s ON s.conversation_id = c.conversation_id
+                WHERE c.last_message_id IS NOT NULL {stale};
+            """)
+            while True:
+                rows = cur.fetchmany(itersize)
+                if not rows:
+                    return
+                yield rows
+
+
+async def fetch_messages(session, conv_id, bucket, limiter, limit=MESSAGES_LIMIT):
+    """Every message of a conversation, oldest first, following the cursor; None if a page fails."""
+    messages = []
+    while True:
+        page = await fetch_json(session, f"{ATLAS_API_BASE}{conv_id}/messages?cursor={len(messages)}&limit={limit}",
+                                bucket, limiter)
+        if page is None:
+            return None
+        data = page.get("data") or []
+        messages.extend(data)
+        total = page.get("total")
+        if not data or total is None or len(messages) >= total:
+            return messages
+
+
+def message_rows(histories):
+    """COPY rows for {conversation_id: (last_message_id, messages)}; a repeated message id keeps its last copy."""
+    rows = {}
+    for conv_id, (_, messages) in histories.items():
+        for position, message in enumerate(messages):
+            if message.get("id") is None:
+                continue
+            rows[conv_id, message["id"]] = (
+                conv_id, message["id"], position, message.get("text"), message.get("channel"),
+                convert_to_timestamp(message.get("createdAt")), json.dumps(message),
+            )
+    return list(rows.values())
+
+
+def first_message(messages):
+    """first_message for a history: the oldest message's text, '' when there is none."""
+    return (messages[0].get("text") if messages else None) or ""
+
+
+def write_messages(histories):
+    """Replace the stored history of every conversation in ``histories`` and advance their watermarks.
+
+    Messages that are unchanged are not rewritten and messages the API no longer
+    returns are deleted. first_message is refreshed from the oldest message, and
+    set to '' for an empty history so the conversation is not asked for again.
+    """
+    rows = message_rows(histories)
+    buffer = io.StringIO()
+    buffer.writelines(copy_line(row) for row in rows)
+    buffer.seek(0)
+    ids = [str(conv_id) for conv_id in histories]
+    updates = ", ".join(f"{column} = EXCLUDED.{column}" for column in MESSAGE_COLUMNS[2:])
+
+    with connection() as conn, metrics.timer("messages_db_write", rows=len(rows)):
+        with conn.cursor() as cur:
+            cur.execute(
+                f"CREATE TEMP TABLE IF NOT EXISTS {STAGING_TABLE} "
+                f"(LIKE atlas.messages INCLUDING DEFAULTS) ON COMMIT DELETE ROWS;"
+            )
+            cur.execute(f"TRUNCATE {STAGING_TABLE};")
+            cur.copy_expert(f"COPY {STAGING_TABLE} ({', '.join(MESSAGE_COLUMNS)}) FROM STDIN", buffer)
+            cur.execute(
+                f"""
+                DELETE FROM atlas.messages m
+                WHERE m.conversation_id = ANY(%s::uuid[])
+                  AND NOT EXISTS (SELECT 1 FROM {STAGING_TABLE} s
+                                  WHERE s.conversation_id = m.conversation_id AND s.message_id = m.message_id);
+                """,
+                (ids,),
+            )
+            cur.execute(
+                f"""
+                INSERT INTO atlas.messages AS target ({', '.join(MESSAGE_COLUMNS)})
+                SELECT {', '.join(MESSAGE_COLUMNS)} FROM {STAGING_TABLE}
+                ON CONFLICT (conversation_id, message_id) DO UPDATE SET {updates}
+                WHERE (target.position, target.payload) IS DISTINCT FROM (EXCLUDED.position, EXCLUDED.payload);
+                """
+            )
+            written = cur.rowcount
+            cur.execute(
+                """
+                UPDATE atlas.conversations c SET first_message = f.text
+                FROM unnest(%s::uuid[], %s::text[]) AS f(conversation_id, text)
+                WHERE c.conversation_id = f.conversation_id AND c.first_message IS DISTINCT FROM f.text;
+                """,
+                (ids, [first_message(messages) for _, messages in histories.values()]),
+            )
+            execute_values(
+                cur,
+                """
+                INSERT INTO atlas.message_sync_state (conversation_id, last_message_id, message_count, synced_at)
+                VALUES %s
+                ON CONFLICT (conversation_id) DO UPDATE SET
+                    last_message_id = EXCLUDED.last_message_id,
+                    message_count = EXCLUDED.message_count,
+                    synced_at = now()
+                """,
+                [(conv_id, last_id, len(messages)) for conv_id, (last_id, messages) in histories.items()],
+                template="(%s::uuid, %s, %s, now())",
+                page_size=len(histories),
+            )
+    return written
+
+
+class HistoryBuffer(UpdateBuffer):
+    """Fetched histories, written by write_messages once enough have been buffered."""
+
+    label = "message histories"
+
+    def add(self, conv_id, last_message_id, messages):
+        self._groups[str(conv_id)] = (last_message_id, messages)
+        self._size = len(self._groups)
+        if self._oldest is None:
+            self._oldest = time.monotonic()
+
+    async def _write(self, groups):
+        await asyncio.to_thread(write_messages, groups)
+
+
+async def _sync_one(session, bucket, limiter, buffer, conv_id, last_message_id):
+    messages = await fetch_messages(session, conv_id, bucket, limiter)
+    if messages is None:
+        return False
+    buffer.add(conv_id, last_message_id, messages)
+    if buffer.due():
+        await buffer.flush()
+    return True
+
+
+async def sync_messages(full=False, concurrency=CONCURRENCY, rate_limit=RATE_LIMIT,
+                        flush_conversations=FLUSH_CONVERSATIONS, flush_seconds=FLUSH_SECONDS):
+    """Fetch and store the history of every conversation whose last message changed."""
+    metrics.start("messages")
+    await asyncio.to_thread(create_tables)
+    await asyncio.to_thread(ensure_columns, [FIRST_MESSAGE])
+    print("Streaming conversations with new messages." if not full else "Refetching every conversation's messages.")
+
+    bucket = TokenBucket(rate_limit)
+    limiter = asyncio.Semaphore(concurrency)
+    buffer = HistoryBuffer(flush_conversations, flush_seconds)
+    counts = {"queued": 0, "updated": 0, "failed": 0}
+    timeout = aiohttp.ClientTimeout(total=REQUEST_TIMEOUT)
+    connector = aiohttp.TCPConnector(limit=concurrency, keepalive_timeout=60)
+
+    async with aiohttp.ClientSession(headers=HEADERS, timeout=timeout, connector=connector) as session:
+        async def handle(item):
+            conv_id, last_message_id = item
+            return await _sync_one(session, bucket, limiter, buffer, conv_id, last_message_id)
+
+        flusher = asyncio.create_task(buffer.flush_periodically())
+        try:
+            await process_work(iter_stale_conversations(full), handle, concurrency, counts)
+        finally:
+            flusher.cancel()
+            await buffer.flush()
+
+    print(f"Done! {counts['queued']} queued, {counts['updated']} synced, {counts['failed']} failed.")
+    metrics.report()
+    return counts
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Atlas message history sync.")
+    parser.add_argument("--full", action="store_true", help="ignore the stored watermarks and refetch everything")
+    parser.add_argument("--concurrency", type=int, default=CONCURRENCY,
+                        help="max in-flight API requests (default: %(default)s)")
+    parser.add_argument("--rate-limit", type=float, default=RATE_LIMIT,
+                        help="max API requests per second (default: %(default)s)")
+    parser.add_argument("--batch-size", type=int, default=FLUSH_CONVERSATIONS,
+                        help="histories buffered before a flush (default: %(default)s)")
+    parser.add_argument("--flush-seconds", type=float, default=FLUSH_SECONDS,
+                        help="max age of buffered histories before a flush (default: %(default)s)")
+    args = parser.parse_args(argv)
+    asyncio.run(sync_messages(args.full, concurrency=args.concurrency, rate_limit=args.rate_limit,
+                              flush_conversations=args.batch_size, flush_seconds=args.flush_seconds))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+import atexit
+import json
+import os
+import pathlib
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import datetime
+
+# One JSON object per line: every timed sample, counter bump and the end-of-run summary.
+# Set ATLAS_METRICS_FILE to an empty string to keep metrics in memory only.
+METRICS_FILE = os.environ.get(
+    'ATLAS_METRICS_FILE', str(pathlib.Path(__file__).resolve().parent / "logs" / "metrics.jsonl"))
+
+PERCENTILES = (50, 95, 99)
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return None
+    rank = max(1, -(-pct * len(sorted_values) // 100))
+    return sorted_values[int(rank) - 1]
+
+
+class Metrics:
+    """Thread-safe per-stage timers and counters for one run.
+
+    ``timer(stage, rows=n)`` records how long the block took (and how many rows
+    it handled); ``count(name)`` bumps a counter such as retries. Every event is
+    appended to the JSON-lines file; ``summary()`` aggregates p50/p95/p99 and
+    rows/sec per stage.
+    """
+
+    def __init__(self, path=METRICS_FILE):
+        self.path = path
+        self._lock = threading.Lock()
+        self._file = None
+        self.start()
+
+    def start(self, run=None):
+        """Begin a new run: clears the samples and tags later events with ``run``."""
+        with self._lock:
+            self.run = run or "run"
+            self.run_id = str(uuid.uuid4())
+            self.started = time.monotonic()
+            self._samples = {}
+            self._rows = {}
+            self._counters = {}
+
+    def _emit(self, event):
+        if not self.path:
+            return
+        if self._file is None:
+            pathlib.Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+            self._file = open(self.path, "a", encoding="utf-8", buffering=1)
+        event["ts"] = datetime.now().isoformat(timespec="milliseconds")
+        event["run"] = self.run
+        event["run_id"] = self.run_id
+        self._file.write(json.dumps(event, default=str) + "\n")
+
+    def observe(self, stage, seconds, rows=None, **fields):
+        with self._lock:
+            self._samples.setdefault(stage, []).append(seconds)
+            if rows is not None:
+                self._rows[stage] = self._rows.get(stage, 0) + rows
+            self._emit({"stage": stage, "seconds": round(seconds, 6), "rows": rows, **fields})
+
+    @contextmanager
+    def timer(self, stage, rows=None, **fields):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.perf_counter() - started, rows, **fields)
+
+    def count(self, name, n=1, **fields):
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + n
+            self._emit({"counter": name, "n": n, **fields})
+
+    def summary(self):
+        with self._lock:
+            elapsed = time.monotonic() - self.started
+            stages = {}
+            for stage, samples in self._samples.items():
+                ordered = sorted(samples)
+                total = sum(ordered)
+                stats = {"count": len(ordered), "total_s": round(total, 3)}
+                for pct in PERCENTILES:
+                    stats[f"p{pct}_ms"] = round(percentile(ordered, pct) * 1000, 2)
+                stats["max_ms"] = round(ordered[-1] * 1000, 2)
+                rows = self._rows.get(stage)
+                if rows is not None:
+                    stats["rows"] = rows
+                    stats["rows_per_s"] = round(rows / total, 1) if total else None
+                    # Stages overlap (fetchers run ahead of the writer), so wall-clock rate differs
+                    stats["rows_per_wall_s"] = round(rows / elapsed, 1) if elapsed else None
+                stages[stage] = stats
+            return {"elapsed_s": round(elapsed, 3), "stages": stages, "counters": dict(self._counters)}
+
+    def report(self):
+        """Print the end-of-run summary and append it to the metrics file."""
+        summary = self.summary()
+        with self._lock:
+            self._emit({"summary": summary})
+        print(f"=== Metrics: {self.run} ({summary['elapsed_s']:.1f}s) ===")
+        print(f"{'stage':<18}{'count':>8}{'total s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'rows/s':>12}")
+        for stage, s in summary["stages"].items():
+            rate = f"{s['rows_per_s']:,.0f}" if s.get("rows_per_s") else "-"
+            print(f"{stage:<18}{s['count']:>8}{s['total_s']:>10.2f}{s['p50_ms']:>10.1f}"
+                  f"{s['p95_ms']:>10.1f}{s['p99_ms']:>10.1f}{rate:>12}")
+        for name, value in summary["counters"].items():
+            print(f"{name}: {value}")
+        return summary
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+metrics = Metrics()
+atexit.register(metrics.close)
@@ -0,0 +1,163 @@
+import json
+import re
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
+
+# Anything datetime.fromisoformat (3.10) rejects: odd fraction lengths, compact
+# offsets, a space separator with a trailing zone, date-only values, etc.
+_ISO_RE = re.compile(
+    r"^(\d{4})-(\d{2})-(\d{2})"
+    r"(?:[T ](\d{2}):(\d{2})(?::(\d{2})(?:[.,](\d+))?)?)?"
+    r"\s*(Z|z|[+-]\d{2}(?::?\d{2})?)?$"
+)
+
+# Epoch values above this are taken to be milliseconds rather than seconds.
+_EPOCH_MS_THRESHOLD = 100_000_000_000
+
+_EMPTY_JSON = "{}"
+
+
+def _to_naive_utc(moment):
+    if moment.tzinfo is None:
+        return moment
+    return moment.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+def _parse_iso_slow(value):
+    match = _ISO_RE.match(value.strip())
+    if not match:
+        return None
+    year, month, day, hour, minute, second, fraction, zone = match.groups()
+    micro = int((fraction or "0")[:6].ljust(6, "0"))
+    try:
+        moment = datetime(int(year), int(month), int(day), int(hour or 0), int(minute or 0),
+                          int(second or 0), micro)
+    except ValueError:
+        return None
+    if zone and zone not in ("Z", "z"):
+        sign = -1 if zone[0] == "-" else 1
+        digits = zone[1:].replace(":", "")
+        offset = timedelta(hours=int(digits[:2]), minutes=int(digits[2:4] or 0))
+        moment -= sign * offset
+    return moment
+
+
+@lru_cache(maxsize=8192)
+def _parse_iso(value):
+    """Parse any Atlas ISO-8601 variant to a naive UTC datetime (None if unparseable)."""
+    # Fast path: fromisoformat handles 3/6-digit fractions and +HH:MM offsets;
+    # the trailing 'Z' Atlas uses is only accepted natively from Python 3.11.
+    text = value[:-1] if value[-1:] in ("Z", "z") else value
+    try:
+        return _to_naive_utc(datetime.fromisoformat(text))
+    except ValueError:
+        return _parse_iso_slow(value)
+
+
+def convert_to_timestamp(value):
+    """Convert UNIX timestamps (s or ms) & ISO-8601 strings to naive UTC datetimes."""
+    if not value:
+        return None
+    if isinstance(value, str):
+        return _parse_iso(value)
+    if isinstance(value, datetime):
+        return _to_naive_utc(value)
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        seconds = value / 1000 if value > _EPOCH_MS_THRESHOLD else value
+        return datetime.fromtimestamp(seconds, timezone.utc).replace(tzinfo=None)
+    return None
+
+
+def _dump_json(value):
+    """json.dumps with a shortcut for the (very common) empty custom-field blob."""
+    if not value and isinstance(value, dict):
+        return _EMPTY_JSON
+    return json.dumps(value)
+
+
+def conversation_to_row(conversation):
+    """Flatten one API conversation into a tuple ordered like CONVERSATION_COLUMNS."""
+    return normalize_page([conversation], dedupe=False)[0]
+
+
+def normalize_page(conversations, dedupe=True):
+    """Turn a page of nested API conversations into flat rows in a single pass.
+
+    Records without an id are skipped; with ``dedupe`` a repeated id keeps its
+    last occurrence, so the set-based merge never touches a row twice. Rows are
+    ordered like CONVERSATION_COLUMNS.
+    """
+    ts = convert_to_timestamp
+    dump = _dump_json
+    rows = {} if dedupe else []
+
+    for conversation in conversations:
+        get = conversation.get
+        conv_id = get("id")
+        if conv_id is None:
+            print(f"Skipping record: Missing 'conversation_id': {conversation}")
+            continue
+
+        # Extract Nested Data Safely
+        customer = get("customer") or {}
+        account = customer.get("account") or {}
+        assigned_agent = get("assignedAgent") or {}
+        last_message = get("lastMessage") or {}
+        csat = get("csat") or {}
+        stats = get("statistics") or {}
+
+        row = (
+            conv_id,
+            customer.get("id"),
+            customer.get("firstName"),
+            customer.get("lastName"),
+            customer.get("email"),
+            customer.get("phoneNumber"),
+            customer.get("externalUserId"),
+            ts(customer.get("createdAt")),
+            customer.get("companyId"),
+            account.get("name"),
+            account.get("email"),
+            account.get("website"),
+            account.get("externalId"),
+            ts(get("startedAt")),
+            ts(get("closedAt")),
+            ts(get("createdAt")),
+            ts(get("assignedAt")),
+            get("assignedBy"),
+            get("closedBy"),
+            assigned_agent.get("id"),
+            assigned_agent.get("firstName"),
+            assigned_agent.get("email"),
+            ts(assigned_agent.get("createdAt")),
+            get("browser"),
+            get("operatingSystem"),
+            last_message.get("id"),
+            last_message.get("text"),
+            last_message.get("channel"),
+            csat.get("score"),
+            csat.get("comment"),
+            stats.get("firstResponseTime"),
+            stats.get("avgResponseTime"),
+            stats.get("totalResolutionTime"),
+            get("status"),
+            get("priority"),
+            get("subject"),
+            get("assignedTeamId"),
+            get("updatedBy"),
+            get("tags") or [],
+            ts(get("snoozedUntil")),
+            get("startedChannel"),
+            get("startedSubChannel"),
+            get("number"),
+            dump(customer.get("customFields", {})),
+            dump(account.get("customFields", {})),
+            dump(get("customFields", {})),
+            ts(get("escalatedAt")),
+        )
+        if dedupe:
+            rows[conv_id] = row
+        else:
+            rows.append(row)
+
+    return list(rows.values()) if dedupe else rows
@@ -0,0 +1,277 @@
+"""Monthly range partitions of atlas.conversations by created_at.
+
+Opt-in: ATLAS_PARTITIONED=1 or ``--partitioned`` creates a new table
+partitioned, and ``python atlas_partitions.py migrate`` converts an existing
+one. Once the table is partitioned the sync detects it and merges each page
+month by month, straight into the partitions.
+
+A partitioned table cannot have a primary key on conversation_id alone, so
+every partition carries its own unique index on it instead. created_at never
+changes, so a conversation always lands in the same partition and ids stay
+unique overall. Conversations without created_at go to the default partition.
+
+Historical months can be frozen: no sync writes to a frozen partition, and the
+full sync starts after the frozen months, so daily work stays proportional to
+recent data. Only freeze months whose conversations no longer change.
+
+    python atlas_partitions.py list
+    python atlas_partitions.py freeze --before 2024-01
+    python atlas_partitions.py unfreeze --partition conversations_p2023_12
+"""
+import argparse
+import threading
+from datetime import date
+
+from atlas_api import FULL_START_DATE
+from atlas_children import ensure_search_indexes
+from atlas_db import connection
+from atlas_dimensions import COMPAT_VIEW, create_compat_view
+from atlas_normalize import convert_to_timestamp
+
+PARENT = "conversations"
+DEFAULT_PARTITION = f"{PARENT}_pdefault"
+UNPARTITIONED = f"{PARENT}_unpartitioned"  # the old table while a migration copies it
+
+PARTITION_STATE_QUERY = """
+CREATE TABLE IF NOT EXISTS atlas.conversation_partitions (
+    partition_name TEXT PRIMARY KEY,
+    range_start DATE,
+    frozen BOOLEAN NOT NULL DEFAULT FALSE,
+    frozen_at TIMESTAMP
+);
+"""
+
+# Partitions known to exist in this process, so pages only pay for DDL on a new month
+_known = set()
+_known_lock = threading.Lock()
+
+
+def month_start(value):
+    return date(value.year, value.month, 1)
+
+
+def next_month(month):
+    return date(month.year + (month.month == 12), month.month % 12 + 1, 1)
+
+
+def months_between(first, last):
+    """Month starts from ``first``'s month through ``last``'s month."""
+    month, months = month_start(first), []
+    while month <= last:
+        months.append(month)
+        month = next_month(month)
+    return months
+
+
+def partition_name(month):
+    """Partition holding ``month`` (a month-start date); None is the default partition."""
+    return DEFAULT_PARTITION if month is None else f"{PARENT}_p{month:%Y_%m}"
+
+
+def partitioned_ddl(ddl):
+    """The CREATE TABLE for the monolithic table, turned into a partitioned parent."""
+    return ddl.replace("UUID PRIMARY KEY", "UUID NOT NULL").rstrip().rstrip(";") + " PARTITION BY RANGE (created_at);"
+
+
+def is_partitioned(conn, schema="atlas"):
+    with conn.cursor() as cur:
+        cur.execute("SELECT relkind FROM pg_class WHERE oid = to_regclass(%s);", (f"{schema}.{PARENT}",))
+        row = cur.fetchone()
+    return row is not None and row[0] == "p"
+
+
+def create_partitions(conn, months, schema="atlas"):
+    """Create the partitions for ``months`` (month starts, or None for the default) on ``conn``."""
+    with conn.cursor() as cur:
+        cur.execute(PARTITION_STATE_QUERY)
+        for month in months:
+            name = partition_name(month)
+            bounds = "DEFAULT" if month is None else f"FOR VALUES FROM ('{month}') TO ('{next_month(month)}')"
+            cur.execute(f"CREATE TABLE IF NOT EXISTS {schema}.{name} PARTITION OF {schema}.{PARENT} {bounds};")
+            cur.execute(f"CREATE UNIQUE INDEX IF NOT EXISTS {name}_id_key ON {schema}.{name} (conversation_id);")
+            cur.execute(
+                f"INSERT INTO {schema}.conversation_partitions (partition_name, range_start) VALUES (%s, %s) "
+                f"ON CONFLICT (partition_name) DO NOTHING;",
+                (name, month),
+            )
+    with _known_lock:
+        _known.update(partition_name(month) for month in months)
+
+
+def prepare_partitions(conn, start, schema="atlas"):
+    """Create the default partition and every month from ``start`` to next month; returns the frozen set."""
+    create_partitions(conn, [None] + months_between(start, next_month(date.today())), schema)
+    return frozen_partitions(conn, schema)
+
+
+def ensure_partitions(months, schema="atlas"):
+    """Create any of ``months`` not yet known, in a transaction of their own."""
+    with _known_lock:
+        missing = [month for month in months if partition_name(month) not in _known]
+    if missing:
+        with connection() as conn:
+            create_partitions(conn, missing, schema)
+
+
+def frozen_partitions(conn, schema="atlas"):
+    with conn.cursor() as cur:
+        cur.execute(f"SELECT partition_name FROM {schema}.conversation_partitions WHERE frozen;")
+        return frozenset(row[0] for row in cur.fetchall())
+
+
+def first_unfrozen_month(start, frozen):
+    """First month from ``start`` on whose partition is not frozen."""
+    month = month_start(start)
+    while partition_name(month) in frozen:
+        month = next_month(month)
+    return month
+
+
+def split_page(records, frozen=frozenset(), schema="atlas"):
+    """Group a page by partition: ([(table, records)] in name order, rows skipped as frozen).
+
+    Missing partitions are created first. Name order keeps concurrent writers
+    locking partitions in the same order.
+    """
+    groups = {}
+    for record in records:
+        created = convert_to_timestamp(record.get("createdAt"))
+        groups.setdefault(month_start(created) if created else None, []).append(record)
+    ensure_partitions(list(groups), schema)
+    parts, skipped = [], 0
+    for name, part in sorted((partition_name(month), part) for month, part in groups.items()):
+        if name in frozen:
+            skipped += len(part)
+        else:
+            parts.append((f"{schema}.{name}", part))
+    return parts, skipped
+
+
+# === Maintenance ===
+def migrate(schema="atlas"):
+    """Rebuild a monolithic atlas.conversations as a partitioned table, in one transaction.
+
+    The old table is renamed, copied month by month into the new partitions,
+    checked by row count and dropped. The search indexes and the
+    conversations_full view are recreated; enrichment recreates its partial
+    indexes on its next run.
+    """
+    with connection() as conn:
+        if is_partitioned(conn, schema):
+            print(f"{schema}.{PARENT} is already partitioned.")
+            return
+        with conn.cursor() as cur:
+            cur.execute(f"LOCK TABLE {schema}.{PARENT} IN ACCESS EXCLUSIVE MODE;")
+            cur.execute("SELECT to_regclass(%s) IS NOT NULL;", (f"{schema}.{COMPAT_VIEW}",))
+            had_view = cur.fetchone()[0]
+            if had_view:
+                cur.execute(f"DROP VIEW {schema}.{COMPAT_VIEW};")
+            cur.execute(f"ALTER TABLE {schema}.{PARENT} RENAME TO {UNPARTITIONED};")
+            cur.execute(f"CREATE TABLE {schema}.{PARENT} (LIKE {schema}.{UNPARTITIONED} INCLUDING DEFAULTS) "
+                        f"PARTITION BY RANGE (created_at);")
+            cur.execute(f"SELECT min(created_at)::date, max(created_at)::date, count(*) FROM {schema}.{UNPARTITIONED};")
+            first, last, total = cur.fetchone()
+            start, end = date.fromisoformat(FULL_START_DATE), next_month(date.today())
+            months = months_between(min(first, start) if first else start, max(last, end) if last else end)
+            create_partitions(conn, [None] + months, schema)
+
+            copied = 0
+            for month in [None] + months:
+                where = ("created_at IS NULL" if month is None else
+                         f"created_at >= '{month}' AND created_at < '{next_month(month)}'")
+                cur.execute(f"INSERT INTO {schema}.{partition_name(month)} "
+                            f"SELECT * FROM {schema}.{UNPARTITIONED} WHERE {where};")
+                copied += cur.rowcount
+                if cur.rowcount:
+                    print(f"Copied {cur.rowcount} rows into {partition_name(month)}.")
+            if copied != total:
+                raise RuntimeError(f"Copied {copied} of {total} rows; rolled back.")
+            cur.execute(f"DROP TABLE {schema}.{UNPARTITIONED};")
+            if had_view:
+                create_compat_view(cur, schema)
+        ensure_search_indexes(conn, f"{schema}.{PARENT}")
+    print(f"Migrated {total} rows into {len(months) + 1} partitions.")
+
+
+def set_frozen(names, frozen, schema="atlas"):
+    """Freeze or unfreeze partitions by name; returns the names that changed."""
+    with connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute(
+                f"UPDATE {schema}.conversation_partitions "
+                f"SET frozen = %s, frozen_at = CASE WHEN %s THEN now() END "
+                f"WHERE partition_name = ANY(%s) AND frozen <> %s RETURNING partition_name;",
+                (frozen, frozen, list(names), frozen),
+            )
+            return sorted(row[0] for row in cur.fetchall())
+
+
+def vacuum_freeze(names, schema="atlas"):
+    """VACUUM (FREEZE, ANALYZE) each partition so autovacuum can leave it alone from now on."""
+    with connection() as conn:
+        conn.autocommit = True
+        try:
+            with conn.cursor() as cur:
+                for name in names:
+                    cur.execute(f"VACUUM (FREEZE, ANALYZE) {schema}.{name};")
+                    print(f"Vacuumed {name}.")
+        finally:
+            conn.autocommit = False
+
+
+def list_partitions(schema="atlas"):
+    with connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute(f"""
+                SELECT p.partition_name, p.frozen, greatest(c.reltuples, 0)::bigint,
+                       pg_total_relation_size(c.oid)
+                FROM {schema}.conversation_partitions p
+                JOIN pg_class c ON c.oid = to_regclass(%s || '.' || p.partition_name)
+                ORDER BY p.range_start NULLS FIRST;
+            """, (schema,))
+            return cur.fetchall()
+
+
+def _month_partitions_before(month, schema="atlas"):
+    with connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute(f"SELECT partition_name FROM {schema}.conversation_partitions WHERE range_start < %s;",
+                        (month,))
+            return [row[0] for row in cur.fetchall()]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Partition maintenance for atlas.conversations.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("migrate", help="convert the existing table into monthly partitions")
+    commands.add_parser("list", help="show partitions, their estimated rows, size and frozen flag")
+    for name in ("freeze", "unfreeze"):
+        command = commands.add_parser(name, help=f"{name} partitions")
+        command.add_argument("--before", help="every month partition before this month (YYYY-MM)")
+        command.add_argument("--partition", action="append", default=[], help="a partition by name (repeatable)")
+    freeze = commands.choices["freeze"]
+    freeze.add_argument("--no-vacuum", action="store_true", help="skip VACUUM (FREEZE) on newly frozen partitions")
+    args = parser.parse_args(argv)
+
+    if args.command == "migrate":
+        migrate()
+    elif args.command == "list":
+        for name, frozen, rows, size in list_partitions():
+            print(f"{name:<32}{'frozen' if frozen else '':<8}{rows:>12}{size / 1024 ** 2:>10.1f} MB")
+    else:
+        names = list(args.partition)
+        if args.before:
+            before = date.fromisoformat(f"{args.before}-01")
+            if args.command == "freeze" and before > month_start(date.today()):
+                raise SystemExit("Refusing to freeze the current month: new conversations are still written there.")
+            names += _month_partitions_before(before)
+        if not names:
+            parser.error("give --before and/or --partition")
+        changed = set_frozen(names, args.command == "freeze")
+        print(f"{'Froze' if args.command == 'freeze' else 'Unfroze'} {len(changed)} partitions: {', '.join(changed) or '-'}")
+        if args.command == "freeze" and changed and not args.no_vacuum:
+            vacuum_freeze(changed)
+
+
+if __name__ == "__main__":
+    main()
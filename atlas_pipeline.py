@@ -0,0 +1,193 @@
+import queue
+import threading
+
+from atlas_api import FULL_START_DATE, RATE_LIMIT, page_size, rate_limiter, stream_conversations
+
+# Pages buffered between the fetchers and the writer; bounds memory to roughly
+# QUEUE_DEPTH * page size records.
+QUEUE_DEPTH = 4
+FETCHERS = 2
+
+_DONE = object()
+
+
+class PipelineError(RuntimeError):
+    """Raised when a fetcher or the writer fails; ``committed_cursor`` is safe to resume from."""
+
+    def __init__(self, message, committed_cursor):
+        super().__init__(message)
+        self.committed_cursor = committed_cursor
+
+
+class _Progress:
+    """Tracks written cursor ranges and the contiguous prefix that is fully written."""
+
+    def __init__(self, start):
+        self.contiguous = start
+        self._done = {}
+
+    def after(self, start, end):
+        """Contiguous cursor once [start, end) is written (does not record it)."""
+        done = dict(self._done)
+        done[start] = end
+        cursor = self.contiguous
+        while cursor in done:
+            cursor = done.pop(cursor)
+        return cursor
+
+    def mark(self, start, end):
+        self._done[start] = end
+        while self.contiguous in self._done:
+            self.contiguous = self._done.pop(self.contiguous)
+
+
+class PagePipeline:
+    """Producer/consumer pipeline: fetcher threads page ahead, the caller's thread writes.
+
+    ``fetch(cursor, max_limit)`` returns a list of records (empty at the end of
+    data), an iterable of such lists when the page is streamed in chunks, or
+    None on failure. ``write(records, cursor, committed_cursor)`` is
+    called on the caller's thread for each page or chunk; ``committed_cursor``
+    is the contiguous cursor reached once it is written, which is what a
+    checkpoint may safely record. ``max_pages`` caps the API pages claimed,
+    however many chunks each is written in.
+    """
+
+    def __init__(self, fetch, write, start_cursor, total, fetchers=FETCHERS,
+                 queue_depth=QUEUE_DEPTH, max_pages=None):
+        self.fetch = fetch
+        self.write = write
+        self.total = total
+        self.fetchers = max(1, fetchers)
+        self.queue = queue.Queue(maxsize=max(1, queue_depth))
+        self.progress = _Progress(start_cursor)
+        self.stop = threading.Event()
+        self.errors = []
+        self._next_claim = start_cursor
+        self._end = total
+        self._lock = threading.Lock()
+        self.max_pages = max_pages
+        self.pages_claimed = 0
+
+    def _claim(self):
+        with self._lock:
+            if self.stop.is_set() or self._next_claim >= self._end:
+                return None
+            if self.max_pages is not None and self.pages_claimed >= self.max_pages:
+                return None
+            start = self._next_claim
+            end = min(self._end, start + page_size.limit)
+            self._next_claim = end
+            self.pages_claimed += 1
+            return start, end
+
+    def _end_of_data(self, cursor):
+        with self._lock:
+            self._end = min(self._end, cursor)
+
+    def _put(self, item):
+        while not self.stop.is_set():
+            try:
+                self.queue.put(item, timeout=1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _fetch_range(self, start, end):
+        """Fetch [start, end), splitting into smaller requests if the page size shrinks."""
+        cursor = start
+        while cursor < end and not self.stop.is_set():
+            result = self.fetch(cursor, end - cursor)
+            if result is None:
+                raise RuntimeError(f"API request failed at cursor {cursor} after retries.")
+            chunks = [result] if isinstance(result, list) else result
+            fetched = 0
+            try:
+                for records in chunks:
+                    if not records:
+                        continue
+                    if not self._put((cursor, records)):
+                        return
+                    cursor += len(records)
+                    fetched += len(records)
+            finally:
+                if hasattr(chunks, "close"):
+                    chunks.close()
+            if not fetched:
+                self._end_of_data(cursor)
+                return
+
+    def _fetcher(self):
+        try:
+            while not self.stop.is_set():
+                claim = self._claim()
+                if claim is None:
+                    break
+                self._fetch_range(*claim)
+        except Exception as e:
+            self.errors.append(e)
+            self.stop.set()
+        finally:
+            # The writer keeps draining until it has seen every _DONE, so this cannot block forever.
+            self.queue.put(_DONE)
+
+    def run(self):
+        """Run until every claimed page is written; returns (rows_written, committed_cursor)."""
+        threads = [threading.Thread(target=self._fetcher, name=f"fetcher-{i}", daemon=True)
+                   for i in range(self.fetchers)]
+        for thread in threads:
+            thread.start()
+
+        rows = 0
+        finished = 0
+        try:
+            while finished < len(threads):
+                item = self.queue.get()
+                if item is _DONE:
+                    finished += 1
+                    continue
+                cursor, records = item
+                end = cursor + len(records)
+                self.write(records, cursor, self.progress.after(cursor, end))
+                self.progress.mark(cursor, end)
+                rows += len(records)
+        except BaseException:
+            self.stop.set()
+            self._drain(threads)
+            raise
+
+        if self.errors:
+            raise PipelineError(str(self.errors[0]), self.progress.contiguous) from self.errors[0]
+        return rows, self.progress.contiguous
+
+    def _drain(self, threads):
+        """Unblock fetchers waiting on a full queue after the writer failed."""
+        while any(t.is_alive() for t in threads):
+            try:
+                self.queue.get(timeout=0.5)
+            except queue.Empty:
+                pass
+
+
+def conversation_fetcher(start_date=FULL_START_DATE, end_date=None):
+    """Adapt stream_conversations to the PagePipeline ``fetch`` contract (chunks of a page)."""
+    def fetch(cursor, max_limit):
+        return stream_conversations(cursor, start_date, end_date, max_limit=max_limit)
+    return fetch
+
+
+def add_pipeline_arguments(parser):
+    """Register the --fetchers / --queue-depth / --rate-limit options on ``parser``."""
+    parser.add_argument("--fetchers", type=int, default=FETCHERS,
+                        help="concurrent page fetchers (default: %(default)s)")
+    parser.add_argument("--queue-depth", type=int, default=QUEUE_DEPTH,
+                        help="fetched pages buffered ahead of the writer (default: %(default)s)")
+    parser.add_argument("--rate-limit", type=float, default=RATE_LIMIT,
+                        help="max API requests per second across fetchers (default: %(default)s)")
+
+
+def pipeline_options(args):
+    """Apply the parsed rate limit and return PagePipeline keyword options."""
+    rate_limiter.configure(args.rate_limit)
+    return {"fetchers": args.fetchers, "queue_depth": args.queue_depth}
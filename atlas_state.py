@@ -0,0 +1,131 @@
+from atlas_db import connection
+
+# Persistent per-sync bookkeeping (high-water marks) kept next to the synced data.
+SYNC_STATE_TABLE_QUERY = """
+CREATE TABLE IF NOT EXISTS atlas.sync_state (
+    sync_name TEXT PRIMARY KEY,
+    watermark TIMESTAMP,
+    updated_at TIMESTAMP NOT NULL DEFAULT now()
+);
+"""
+
+
+def create_state_tables():
+    """Ensure the sync bookkeeping tables exist."""
+    with connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute(SYNC_STATE_TABLE_QUERY)
+            cur.execute(CHECKPOINT_TABLE_QUERY)
+
+
+def get_watermark(sync_name):
+    """Return the stored high-water mark for ``sync_name``, or None on first run."""
+    with connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute("SELECT watermark FROM atlas.sync_state WHERE sync_name = %s;", (sync_name,))
+            row = cur.fetchone()
+            return row[0] if row else None
+
+
+def set_watermark(sync_name, watermark):
+    """Advance the high-water mark for ``sync_name``; it never moves backwards."""
+    with connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute(
+                """
+                INSERT INTO atlas.sync_state (sync_name, watermark, updated_at)
+                VALUES (%s, %s, now())
+                ON CONFLICT (sync_name) DO UPDATE SET
+                    watermark = GREATEST(atlas.sync_state.watermark, EXCLUDED.watermark),
+                    updated_at = now();
+                """,
+                (sync_name, watermark),
+            )
+
+
+def latest_created_at():
+    """Return max(created_at) already stored, used to seed a missing watermark."""
+    with connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute("SELECT max(created_at) FROM atlas.conversations;")
+            return cur.fetchone()[0]
+
+
+# Resumable progress for paginated syncs, written in the same transaction as each page.
+CHECKPOINT_TABLE_QUERY = """
+CREATE TABLE IF NOT EXISTS atlas.sync_checkpoints (
+    sync_name TEXT PRIMARY KEY,
+    run_id UUID NOT NULL,
+    next_cursor INTEGER NOT NULL DEFAULT 0,
+    page_size INTEGER,
+    rows_written BIGINT NOT NULL DEFAULT 0,
+    completed BOOLEAN NOT NULL DEFAULT FALSE,
+    started_at TIMESTAMP NOT NULL DEFAULT now(),
+    updated_at TIMESTAMP NOT NULL DEFAULT now()
+);
+"""
+
+
+def load_checkpoint(sync_name):
+    """Return the last checkpoint for ``sync_name`` as a dict, or None."""
+    with connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute(
+                """
+                SELECT run_id, next_cursor, page_size, rows_written, completed
+                FROM atlas.sync_checkpoints WHERE sync_name = %s;
+                """,
+                (sync_name,),
+            )
+            row = cur.fetchone()
+    if row is None:
+        return None
+    return _checkpoint_dict(row)
+
+
+def load_checkpoints(prefix):
+    """Return {sync_name: checkpoint dict} for every checkpoint whose name starts with ``prefix``."""
+    with connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute(
+                """
+                SELECT sync_name, run_id, next_cursor, page_size, rows_written, completed
+                FROM atlas.sync_checkpoints WHERE sync_name LIKE %s;
+                """,
+                (prefix.replace("%", r"\%").replace("_", r"\_") + "%",),
+            )
+            rows = cur.fetchall()
+    return {row[0]: _checkpoint_dict(row[1:]) for row in rows}
+
+
+def _checkpoint_dict(row):
+    run_id, next_cursor, page_size, rows_written, completed = row
+    return {
+        "run_id": str(run_id),
+        "next_cursor": next_cursor,
+        "page_size": page_size,
+        "rows_written": rows_written,
+        "completed": completed,
+    }
+
+
+def save_checkpoint(conn, sync_name, run_id, next_cursor, page_size, rows_written, completed=False):
+    """Record progress on ``conn``; commits together with the caller's page write."""
+    with conn.cursor() as cur:
+        cur.execute(
+            """
+            INSERT INTO atlas.sync_checkpoints
+                (sync_name, run_id, next_cursor, page_size, rows_written, completed, started_at, updated_at)
+            VALUES (%s, %s, %s, %s, %s, %s, now(), now())
+            ON CONFLICT (sync_name) DO UPDATE SET
+                started_at = CASE WHEN atlas.sync_checkpoints.run_id = EXCLUDED.run_id
+                                  THEN atlas.sync_checkpoints.started_at ELSE now() END,
+                run_id = EXCLUDED.run_id,
+                next_cursor = EXCLUDED.next_cursor,
+                page_size = EXCLUDED.page_size,
+                rows_written = EXCLUDED.rows_written,
+                completed = EXCLUDED.completed,
+                updated_at = now();
+            """,
+            (sync_name, run_id, next_cursor, page_size, rows_written, completed),
+        )
@@ -0,0 +1,793 @@
+"""Unified Atlas -> PostgreSQL conversation sync.
+
+One engine, six modes:
+
+* ``full``            walk every page since 2021-01-01, checkpointed and resumable
+* ``tail``            only the window since the stored watermark (plus an overlap)
+* ``escalation-only`` walk every page but only merge ``escalated_at`` into existing rows
+* ``backfill``        rebuild the whole history from date shards fetched in parallel
+* ``replay``          rebuild from the on-disk page cache without any API calls
+* ``tiered``          refresh hot conversations daily and the closed history on a rotation
+
+With ``--cache`` (or ATLAS_CACHE=1) list pages are cached on disk (atlas_cache),
+keyed by endpoint, date window and cursor. A retried or resumed run over the
+same window within the cache TTL re-reads them instead of calling the API, and
+``replay`` rebuilds from them. Stages with different windows do not share
+pages, so the daily job leaves the cache off.
+
+Each mode has a default conflict policy; ``--policy`` swaps in any registered one.
+``--dimensions`` moves customer / company / agent attributes into their own
+tables (atlas_dimensions); ``atlas.conversations_full`` keeps the wide shape.
+A table partitioned by month (atlas_partitions) is written partition by
+partition, and the full sync skips frozen historical months.
+
+    python -m atlas_sync --mode tail
+"""
+import argparse
+import os
+import sys
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+
+from atlas_api import API_URL, FULL_START_DATE, count_conversations, page_size
+from atlas_bulk import CONVERSATION_COLUMNS, UpsertResult, bulk_upsert, ensure_row_hash_column, reset_row_hashes
+from atlas_cache import CACHE_ENABLED, page_cache
+from atlas_children import (ensure_child_tables, ensure_search_indexes, refresh_child_tables,
+                            refresh_dimension_children)
+from atlas_db import connection
+from atlas_dimensions import COMPAT_VIEW, MOVED_POSITIONS, ensure_dimension_tables, write_dimensions
+from atlas_metrics import metrics
+from atlas_normalize import convert_to_timestamp
+from atlas_partitions import (first_unfrozen_month, is_partitioned, month_start, partition_name, partitioned_ddl,
+                              prepare_partitions, split_page)
+from atlas_pipeline import (FETCHERS, QUEUE_DEPTH, PagePipeline, PipelineError, add_pipeline_arguments, conversation_fetcher,
+                            pipeline_options)
+from atlas_state import (create_state_tables, get_watermark, latest_created_at, load_checkpoint, load_checkpoints,
+                         save_checkpoint, set_watermark)
+
+# Ensure schema is specified correctly
+TABLE_CREATION_QUERY = """
+CREATE TABLE IF NOT EXISTS atlas.conversations (
+    conversation_id UUID PRIMARY KEY,
+    customer_id UUID,
+    customer_first_name VARCHAR(255),
+    customer_last_name VARCHAR(255),
+    customer_email VARCHAR(255),
+    customer_phone VARCHAR(50),
+    customer_external_user_id VARCHAR(255),
+    customer_created_at TIMESTAMP,
+    company_id UUID,
+    company_name VARCHAR(255),
+    company_email VARCHAR(255),
+    company_website VARCHAR(255),
+    company_external_id VARCHAR(255),
+    started_at TIMESTAMP,
+    closed_at TIMESTAMP,
+    created_at TIMESTAMP,
+    assigned_at TIMESTAMP,
+    assigned_by UUID,
+    closed_by UUID,
+    assigned_agent_id UUID,
+    assigned_agent_name VARCHAR(255),
+    assigned_agent_email VARCHAR(255),
+    assigned_agent_created_at TIMESTAMP,
+    browser VARCHAR(255),
+    operating_system VARCHAR(255),
+    last_message_id INTEGER,
+    last_message_text TEXT,
+    last_message_channel VARCHAR(255),
+    csat_score VARCHAR(10),
+    csat_comment TEXT,
+    stats_first_response_time FLOAT,
+    stats_avg_response_time FLOAT,
+    stats_total_resolution_time FLOAT,
+    conversation_status VARCHAR(50),
+    conversation_priority VARCHAR(50),
+    conversation_subject TEXT,
+    assigned_team_id UUID,
+    updated_by UUID,
+    tags TEXT[],
+    snoozed_until TIMESTAMP,
+    started_channel VARCHAR(255),
+    started_sub_channel VARCHAR(255),
+    number INTEGER,
+    customer_custom_fields JSONB,
+    account_custom_fields JSONB,
+    conversation_custom_fields JSONB,
+    escalated_at TIMESTAMP
+);
+"""
+
+# Checkpoint / watermark names in atlas.sync_checkpoints and atlas.sync_state
+FULL_SYNC_NAME = "full"
+TAIL_SYNC_NAME = "tail"
+OVERLAP_DAYS = 2  # Re-read this many days before the watermark to catch late arrivals
+# Keep conversation_tags / conversation_custom_field_values in step with every write
+CHILD_TABLES = os.environ.get('ATLAS_CHILD_TABLES', '') == '1'
+# Write customer / company / agent attributes to dimension tables instead of every conversation row
+DIMENSIONS = os.environ.get('ATLAS_DIMENSIONS', '') == '1'
+# Create a missing conversations table partitioned by created_at month (atlas_partitions)
+PARTITIONED = os.environ.get('ATLAS_PARTITIONED', '') == '1'
+BACKFILL_SYNC_NAME = "backfill"  # shard checkpoints are "backfill:<start>:<end>"
+
+# Backfill: month shards are halved until each holds at most SHARD_ROWS conversations,
+# then BACKFILL_WORKERS shards are walked at once (each with its own fetch-ahead thread).
+BACKFILL_WORKERS = 4
+SHARD_ROWS = 20_000
+
+# Tiered: hot conversations (open, snoozed, or closed within RECENT_DAYS) are refreshed
+# daily, the cold history one 1/ROTATION_DAYS slice of its months per day. Due days are
+# read in month windows walked like backfill shards.
+TIERED_SYNC_NAME = "tiered"  # shard checkpoints are "tiered:<start>:<end>"
+RECENT_DAYS = 14
+ROTATION_DAYS = 30
+
+
+class ConflictPolicy:
+    """How a staged page is merged into conversations that already exist.
+
+    ``clause`` is the ``ON CONFLICT ...`` clause handed to bulk_upsert; it refers
+    to the existing row as ``target``.
+    """
+
+    def __init__(self, name, clause):
+        self.name = name
+        self.clause = clause
+
+
+# Every column the row hash covers, so a row whose hash matches really holds that record
+# (conversation_id is the key; escalated_at has its own merge below).
+_MERGED_COLUMNS = tuple(column for column in CONVERSATION_COLUMNS if column not in ("conversation_id", "escalated_at"))
+
+_ESCALATED_AT_MERGE = """
+    escalated_at = CASE
+                       WHEN EXCLUDED.escalated_at IS NOT NULL THEN EXCLUDED.escalated_at
+                       ELSE target.escalated_at
+                   END"""
+
+# Only escalated_at is merged, so row_hash is deliberately left as-is: it must keep
+# describing the last record that was applied in full.
+ESCALATION_ONLY = ConflictPolicy(
+    "escalation-only",
+    "ON CONFLICT (conversation_id)\nDO UPDATE SET" + _ESCALATED_AT_MERGE,
+)
+
+# Existing conversations are left untouched; the staged page is anti-joined against the
+# table inside the merge, so no per-run SELECT of every conversation_id is needed.
+INSERT_ONLY = ConflictPolicy("insert-only", "ON CONFLICT (conversation_id) DO NOTHING")
+
+# A NULL in the record keeps the stored value. The row then no longer matches the
+# record, so its row_hash is cleared and a later merge (e.g. replace) applies it again.
+COALESCE_MERGE = ConflictPolicy(
+    "coalesce",
+    "ON CONFLICT (conversation_id)\nDO UPDATE SET\n"
+    + "".join(f"    {column} = COALESCE(EXCLUDED.{column}, target.{column}),\n" for column in _MERGED_COLUMNS)
+    + "    row_hash = CASE\n"
+    + "                   WHEN " + "\n                     OR ".join(
+        f"(EXCLUDED.{column} IS NULL AND target.{column} IS NOT NULL)" for column in _MERGED_COLUMNS)
+    + "\n                   THEN NULL ELSE EXCLUDED.row_hash\n               END,"
+    + _ESCALATED_AT_MERGE,
+)
+
+# The incoming record is applied as-is, so fields the API clears (closed_at and closed_by
+# on a reopened conversation, snoozed_until once it wakes) are cleared here too.
+REPLACE = ConflictPolicy(
+    "replace",
+    "ON CONFLICT (conversation_id)\nDO UPDATE SET\n"
+    + "".join(f"    {column} = EXCLUDED.{column},\n" for column in _MERGED_COLUMNS)
+    + "    row_hash = EXCLUDED.row_hash,"
+    + _ESCALATED_AT_MERGE,
+)
+
+POLICIES = {policy.name: policy for policy in (ESCALATION_ONLY, INSERT_ONLY, COALESCE_MERGE, REPLACE)}
+
+
+def register_policy(policy):
+    """Make a custom ConflictPolicy selectable by name."""
+    POLICIES[policy.name] = policy
+    return policy
+
+
+class SyncStats:
+    """Running inserted / changed / unchanged totals for one sync."""
+
+    def __init__(self, mode):
+        self.mode = mode
+        self.pages = 0
+        self.rows = 0
+        self.inserted = 0
+        self.changed = 0
+        self.unchanged = 0
+        self._lock = threading.Lock()
+
+    def add(self, result):
+        with self._lock:
+            self.pages += 1
+            self.rows += result.staged
+            self.inserted += result.inserted
+            self.changed += result.changed
+            self.unchanged += result.unchanged
+
+    def as_dict(self):
+        return {key: value for key, value in vars(self).items() if not key.startswith("_")}
+
+    def __str__(self):
+        return (f"{self.rows} rows in {self.pages} pages: {self.inserted} inserted, "
+                f"{self.changed} changed, {self.unchanged} unchanged")
+
+
+# Layout of the live table, detected by create_table(): partitioned or not, and the frozen partitions
+_partitioned = False
+_frozen = frozenset()
+
+
+def create_table():
+    """Ensure the conversations table and the sync bookkeeping tables exist."""
+    global _partitioned, _frozen
+    with connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute(partitioned_ddl(TABLE_CREATION_QUERY) if PARTITIONED else TABLE_CREATION_QUERY)
+        _partitioned = is_partitioned(conn)
+        if PARTITIONED and not _partitioned:
+            raise SystemExit("atlas.conversations is not partitioned yet; run `python atlas_partitions.py migrate`.")
+        if _partitioned:
+            _frozen = prepare_partitions(conn, date.fromisoformat(FULL_START_DATE))
+        ensure_row_hash_column(conn)
+        ensure_search_indexes(conn)
+        if DIMENSIONS:
+            ensure_dimension_tables(conn)
+        if CHILD_TABLES:
+            ensure_child_tables(conn, source=_child_source())
+    create_state_tables()
+
+
+def _child_source():
+    return f"atlas.{COMPAT_VIEW}" if DIMENSIONS else None
+
+
+def _refresh_children(cur, table, ids):
+    refresh_child_tables(cur, table, ids, source=_child_source())
+
+
+def write_page(records, policy, checkpoint=None):
+    """Bulk-load a page with ``policy``; ``checkpoint`` is saved in the same transaction.
+
+    On a partitioned table each month's rows are merged straight into their
+    partition, and rows bound for frozen partitions are skipped (counted as unchanged).
+    """
+    if _partitioned:
+        parts, skipped = split_page(records, _frozen)
+    else:
+        parts, skipped = [("atlas.conversations", records)], 0
+    with connection() as conn:
+        if DIMENSIONS:
+            dimensions = write_dimensions(conn, records)
+        results = [
+            bulk_upsert(conn, part, policy.clause, table=table,
+                        after_write=(_refresh_children,) if CHILD_TABLES else (),
+                        null_positions=MOVED_POSITIONS if DIMENSIONS else ())
+            for table, part in parts
+        ]
+        if DIMENSIONS and CHILD_TABLES:
+            with conn.cursor() as cur:
+                refresh_dimension_children(cur, "atlas.conversations", dimensions["customers"],
+                                           dimensions["companies"], source=_child_source())
+        if checkpoint is not None:
+            save_checkpoint(conn, **checkpoint)
+    if skipped:
+        metrics.count("frozen_skipped", skipped)
+    return UpsertResult(*(sum(values) for values in zip(UpsertResult(skipped, 0, 0, skipped), *results)))
+
+
+def _describe(result):
+    return f"{result.inserted} inserted, {result.changed} changed, {result.unchanged} unchanged"
+
+
+def _total_records(start_date=FULL_START_DATE):
+    """Conversations available since ``start_date``, or None when the API is unavailable."""
+    total = count_conversations(start_date)
+    if total is None:
+        print("Failed to retrieve total records. Exiting.")
+    return total
+
+
+def _full_start_date():
+    """FULL_START_DATE, or the first month after the frozen partitions."""
+    if not _frozen:
+        return FULL_START_DATE
+    start = first_unfrozen_month(date.fromisoformat(FULL_START_DATE), _frozen).isoformat()
+    if start != FULL_START_DATE:
+        print(f"Skipping frozen partitions before {start}.")
+    return start
+
+
+# === Modes ===
+def sync_full(policy, restart=False, max_pages=None, **pipeline):
+    """Walk every page, checkpointing after each committed page so a rerun resumes."""
+    stats = SyncStats("full")
+    start_date = _full_start_date()
+    # A run that skips frozen months pages through a different result set, so it checkpoints separately
+    sync_name = FULL_SYNC_NAME if start_date == FULL_START_DATE else f"{FULL_SYNC_NAME}:{start_date}"
+    checkpoint = load_checkpoint(sync_name)
+    if checkpoint and not checkpoint["completed"] and not restart:
+        run_id = checkpoint["run_id"]
+        cursor = checkpoint["next_cursor"]
+        rows_written = checkpoint["rows_written"]
+        if checkpoint["page_size"]:
+            page_size.reset(checkpoint["page_size"])
+        print(f"Resuming run {run_id} at cursor {cursor} ({rows_written} rows already written).")
+    else:
+        run_id = str(uuid.uuid4())
+        cursor = 0
+        rows_written = 0
+        print(f"Starting run {run_id} from cursor 0.")
+
+    total_records = _total_records(start_date)
+    if total_records is None:
+        return stats
+    print(f"Total records available in API since {start_date}: {total_records}")
+
+    def write(records, page_cursor, committed_cursor):
+        nonlocal rows_written
+        rows_written += len(records)
+        # Insert/update the page and checkpoint the contiguous progress in one transaction
+        result = write_page(records, policy, checkpoint={
+            "sync_name": sync_name,
+            "run_id": run_id,
+            "next_cursor": committed_cursor,
+            "page_size": page_size.limit,
+            "rows_written": rows_written,
+        })
+        stats.add(result)
+        print(f"Processed {len(records)} records at cursor {page_cursor} ({_describe(result)}).")
+
+    pipeline_run = PagePipeline(
+        conversation_fetcher(start_date), write, cursor, total_records, max_pages=max_pages, **pipeline,
+    )
+    try:
+        _, cursor = pipeline_run.run()
+    except PipelineError as e:
+        raise SystemExit(f"{e}; progress is checkpointed at cursor {e.committed_cursor}.")
+
+    if max_pages is not None and pipeline_run.pages_claimed >= max_pages and cursor < total_records:
+        print(f"Stopped after {pipeline_run.pages_claimed} pages; the next run resumes at cursor {cursor}.")
+        return stats
+
+    with connection() as conn:
+        save_checkpoint(conn, sync_name, run_id, cursor, page_size.limit, rows_written, completed=True)
+    print(f"Data Sync Complete! Run {run_id}: {stats}.")
+    return stats
+
+
+def _record_watermark(conversation):
+    """Timestamp used to advance the high-water mark for one record."""
+    return convert_to_timestamp(conversation.get("updatedAt")) or convert_to_timestamp(conversation.get("createdAt"))
+
+
+def resolve_start_date(full, overlap_days):
+    """Pick the API startDate: the watermark minus the overlap window, or the full history."""
+    if full:
+        return FULL_START_DATE
+    watermark = get_watermark(TAIL_SYNC_NAME) or latest_created_at()
+    if watermark is None:
+        return FULL_START_DATE
+    start = watermark - timedelta(days=overlap_days)
+    return max(start.strftime("%Y-%m-%d"), FULL_START_DATE)
+
+
+def sync_tail(policy, full=False, overlap_days=OVERLAP_DAYS, **pipeline):
+    """Insert conversations created since the stored watermark, then advance it."""
+    stats = SyncStats("tail")
+    start_date = resolve_start_date(full, overlap_days)
+    print(f"Syncing conversations from startDate={start_date}")
+    total_records = _total_records(start_date)
+    if total_records is None:
+        return stats
+    print(f"Total records available in API since {start_date}: {total_records}")
+
+    high_water = None
+
+    def write(records, page_cursor, committed_cursor):
+        nonlocal high_water
+        for conv in records:
+            seen = _record_watermark(conv)
+            if seen and (high_water is None or seen > high_water):
+                high_water = seen
+
+        # New-vs-existing is decided in Postgres by the conflict policy (insert-only by default)
+        result = write_page(records, policy)
+        stats.add(result)
+        if result.inserted or result.changed:
+            print(f"Inserted {result.inserted} new records ({result.changed} changed, {result.unchanged} unchanged).")
+        else:
+            print(f"No new records found in batch {page_cursor}.")
+
+    try:
+        PagePipeline(
+            conversation_fetcher(start_date), write, 0, total_records, **pipeline,
+        ).run()
+    except PipelineError as e:
+        print(f"{e} Watermark left unchanged.")
+        raise SystemExit(1)
+
+    if high_water is not None:
+        set_watermark(TAIL_SYNC_NAME, high_water)
+        print(f"Watermark advanced to {high_water}.")
+    print(f"Data Sync Complete! {stats}.")
+    return stats
+
+
+def sync_escalations(policy, **pipeline):
+    """Walk every page, inserting new conversations and refreshing escalated_at on existing ones."""
+    stats = SyncStats("escalation-only")
+    total_records = _total_records()
+    if total_records is None:
+        return stats
+    print(f"Total records available in API: {total_records}")
+
+    def write(records, page_cursor, committed_cursor):
+        result = write_page(records, policy)
+        stats.add(result)
+        print(f"Processed and synchronized {len(records)} records at cursor {page_cursor} ({_describe(result)}).")
+
+    try:
+        PagePipeline(
+            conversation_fetcher(), write, 0, total_records, **pipeline,
+        ).run()
+    except PipelineError as e:
+        raise SystemExit(str(e))
+    print(f"Data Sync Complete! {stats}.")
+    return stats
+
+
+def _month_shards(start, end):
+    """Calendar-month (start, end) windows covering [start, end].
+
+    Neighbouring shards share their boundary day: whether the API treats endDate
+    as inclusive is not documented, and a day read twice merges idempotently.
+    """
+    shards = []
+    while start < end:
+        following = (start.replace(day=1) + timedelta(days=32)).replace(day=1)
+        shards.append((start, min(following, end)))
+        start = following
+    return shards
+
+
+def _shard_total(shard):
+    start, end = shard
+    total = count_conversations(start.isoformat(), end.isoformat())
+    if total is None:
+        raise RuntimeError(f"Could not count conversations for shard {start}..{end}.")
+    return total
+
+
+def plan_shards(shard_rows=SHARD_ROWS, workers=BACKFILL_WORKERS, windows=None):
+    """Split the history (or the given (start, end) ``windows``) into date shards of at most ``shard_rows``.
+
+    Returns sorted (start, end, total) tuples; empty shards are dropped. A shard
+    that is still too big at a single day is kept as-is.
+    """
+    pending = list(windows) if windows is not None else _month_shards(date.fromisoformat(FULL_START_DATE), date.today())
+    plan = []
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        while pending:
+            totals = list(pool.map(_shard_total, pending))
+            split = []
+            for (start, end), total in zip(pending, totals):
+                if total > shard_rows and (end - start).days > 1:
+                    middle = start + timedelta(days=(end - start).days // 2)
+                    split += [(start, middle), (middle, end)]
+                elif total:
+                    plan.append((start, end, total))
+            pending = split
+    return sorted(plan)
+
+
+def _sync_shard(policy, run_id, shard, checkpoint, stats, queue_depth, sync_name=BACKFILL_SYNC_NAME):
+    """Walk one date shard to the end, checkpointing it under its own name."""
+    start, end, total = shard
+    name = f"{sync_name}:{start}:{end}"
+    cursor = rows_written = 0
+    if checkpoint and checkpoint["run_id"] == run_id:
+        if checkpoint["completed"]:
+            return
+        cursor, rows_written = checkpoint["next_cursor"], checkpoint["rows_written"]
+
+    def write(records, page_cursor, committed_cursor):
+        nonlocal rows_written
+        rows_written += len(records)
+        stats.add(write_page(records, policy, checkpoint={
+            "sync_name": name,
+            "run_id": run_id,
+            "next_cursor": committed_cursor,
+            "page_size": page_size.limit,
+            "rows_written": rows_written,
+        }))
+
+    # Without a total the shard is read until the API returns an empty page
+    _, cursor = PagePipeline(
+        conversation_fetcher(start.isoformat(), end.isoformat()), write, cursor,
+        total if total is not None else sys.maxsize, fetchers=1, queue_depth=queue_depth,
+    ).run()
+    with connection() as conn:
+        save_checkpoint(conn, name, run_id, cursor, page_size.limit, rows_written, completed=True)
+    print(f"Shard {start}..{end} done: {rows_written} rows.")
+
+
+def _run_shards(stats, sync_name, plan, policy, restart, workers, queue_depth):
+    """Walk the shards ``plan()`` returns concurrently under a run-level checkpoint; returns the run id."""
+    checkpoint = load_checkpoint(sync_name)
+    if checkpoint and not checkpoint["completed"] and not restart:
+        run_id = checkpoint["run_id"]
+        print(f"Resuming {sync_name} run {run_id}.")
+    else:
+        run_id = str(uuid.uuid4())
+        print(f"Starting {sync_name} run {run_id}.")
+
+    shards = plan()
+    totals = [total for _, _, total in shards if total is not None]
+    counted = f"{sum(totals)} conversations" if len(totals) == len(shards) else "uncounted"
+    print(f"{len(shards)} shards, {counted}, {workers} workers.")
+    with connection() as conn:
+        save_checkpoint(conn, sync_name, run_id, 0, page_size.limit, 0)
+    shard_checkpoints = load_checkpoints(f"{sync_name}:")
+
+    failed = []
+    with ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="shard") as pool:
+        futures = {
+            pool.submit(_sync_shard, policy, run_id, shard,
+                        shard_checkpoints.get(f"{sync_name}:{shard[0]}:{shard[1]}"), stats, queue_depth,
+                        sync_name): shard
+            for shard in shards
+        }
+        for future, (start, end, _) in futures.items():
+            try:
+                future.result()
+            except Exception as e:
+                failed.append(f"{start}..{end}")
+                print(f"Shard {start}..{end} failed: {e}")
+
+    if failed:
+        raise SystemExit(f"{len(failed)} shard(s) failed ({', '.join(failed)}); rerun to resume them.")
+    with connection() as conn:
+        save_checkpoint(conn, sync_name, run_id, len(shards), page_size.limit, stats.rows, completed=True)
+    return run_id
+
+
+def sync_backfill(policy, restart=False, workers=BACKFILL_WORKERS, shard_rows=SHARD_ROWS,
+                  queue_depth=QUEUE_DEPTH, **_):
+    """Rebuild the full history from date shards walked concurrently, each resumable on its own."""
+    stats = SyncStats("backfill")
+    run_id = _run_shards(stats, BACKFILL_SYNC_NAME, lambda: plan_shards(shard_rows, workers),
+                         policy, restart, workers, queue_depth)
+    print(f"Backfill Complete! Run {run_id}: {stats}.")
+    return stats
+
+
+# A conversation is cold once it has been closed for longer than the recent window and is
+# neither open nor snoozed; everything else is hot and refreshed every day.
+_COLD_CONVERSATION = """
+    closed_at < (now() AT TIME ZONE 'UTC') - make_interval(days => %(recent_days)s)
+    AND coalesce(lower(conversation_status), '') NOT IN ('open', 'snoozed')
+    AND (snoozed_until IS NULL OR snoozed_until < (now() AT TIME ZONE 'UTC'))
+"""
+
+
+# Rows the COALESCE merge left behind: a field the API has cleared still holds its old
+# value. Their row_hash already matches the record, so it must be cleared to re-apply it.
+_STALE_CONVERSATION = """
+    (coalesce(lower(conversation_status), '') <> 'closed' AND (closed_at IS NOT NULL OR closed_by IS NOT NULL))
+    OR (coalesce(lower(conversation_status), '') <> 'snoozed' AND snoozed_until IS NOT NULL)
+"""
+
+
+def tiered_days(recent_days=RECENT_DAYS, rotation_days=ROTATION_DAYS, today=None):
+    """(due days, {day: rows stored}) for today's tiered sync, or None when nothing is stored yet."""
+    with connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute(
+                f"""
+                SELECT created_at::date, count(*), bool_or(NOT coalesce({_COLD_CONVERSATION}, FALSE))
+                FROM atlas.conversations WHERE created_at IS NOT NULL GROUP BY 1;
+                """,
+                {"recent_days": recent_days},
+            )
+            stored = {day: (rows, hot) for day, rows, hot in cur.fetchall()}
+    if not stored:
+        return None
+    return due_days(stored, today or date.today(), recent_days, rotation_days)
+
+
+def due_days(stored, today, recent_days=RECENT_DAYS, rotation_days=ROTATION_DAYS):
+    """(sorted due days, {day: rows}) from ``stored``, a {created_at day: (rows, holds a hot conversation)} map.
+
+    A day is due when it holds a hot conversation, falls in the last
+    ``recent_days``, or lies in one of today's rotation months (month number
+    modulo ``rotation_days`` equals today's day number modulo it, so every month
+    comes round once per rotation and is read as one window). Days in frozen
+    partitions are left out of both.
+    """
+    slot = today.toordinal() % rotation_days
+    due = {day for day, (_, hot) in stored.items() if hot or (day.year * 12 + day.month) % rotation_days == slot}
+    due.update(today - timedelta(days=n) for n in range(recent_days))
+
+    def unfrozen(day):
+        return partition_name(month_start(day)) not in _frozen
+
+    return sorted(filter(unfrozen, due)), {day: rows for day, (rows, _) in stored.items() if unfrozen(day)}
+
+
+def _month_windows(days):
+    """One (first, last) window per month holding any of the sorted ``days``; both ends inclusive.
+
+    endDate is inclusive (the tail sync's endDate=today returns today's
+    conversations), so a window ends on its last due day.
+    """
+    windows = {}
+    for day in days:
+        first = windows.get((day.year, day.month), (day, day))[0]
+        windows[day.year, day.month] = (first, day)
+    return list(windows.values())
+
+
+def plan_tiered(days, stored, limit):
+    """Month windows covering the due ``days``, or None when walking every page takes fewer requests.
+
+    ``stored`` maps days to rows stored, which estimates what each window holds.
+    A window is streamed until an empty page, one request more than its pages;
+    the full walk costs a count request plus its pages.
+    """
+    windows = _month_windows(days)
+    requests = sum(
+        sum(rows for day, rows in stored.items() if first <= day <= last) // limit + 1 for first, last in windows
+    )
+    full_walk = 1 + -(-sum(stored.values()) // limit)
+    return windows if requests < full_walk else None
+
+
+def sync_tiered(policy, restart=False, workers=BACKFILL_WORKERS, fetchers=FETCHERS, queue_depth=QUEUE_DEPTH,
+                recent_days=RECENT_DAYS, rotation_days=ROTATION_DAYS, **_):
+    """Refresh the days holding open, snoozed or recently closed conversations, plus a rotating slice of the rest.
+
+    Falls back to the full walk when nothing is stored yet or when the due
+    windows would take more requests than walking every page.
+    """
+    tiered = tiered_days(recent_days, rotation_days)
+    windows = tiered and plan_tiered(*tiered, page_size.limit)
+    if not windows:
+        print("No conversations stored yet; walking every page." if tiered is None else
+              f"{len(tiered[0])} days due, spread so widely that walking every page is cheaper.")
+        return sync_full(policy, restart=restart, fetchers=fetchers, queue_depth=queue_depth)
+    print(f"{len(tiered[0])} days due (hot, last {recent_days} days, or 1/{rotation_days} rotation) "
+          f"in {len(windows)} month windows.")
+
+    stats = SyncStats("tiered")
+    # Windows are not counted first: each is streamed until the API runs out of data
+    run_id = _run_shards(stats, TIERED_SYNC_NAME, lambda: [(first, last, None) for first, last in windows],
+                         policy, restart, workers, queue_depth)
+    print(f"Tiered Sync Complete! Run {run_id}: {stats}.")
+    return stats
+
+
+def sync_replay(policy, **_):
+    """Write every cached list page, oldest fetch first, without calling the API."""
+    stats = SyncStats("replay")
+    for header, records in page_cache.iter_pages(API_URL):
+        if not records:
+            continue
+        result = write_page(records, policy)
+        stats.add(result)
+        print(f"Replayed {len(records)} records from cursor {header['params'].get('cursor')} "
+              f"({_describe(result)}).")
+    print(f"Replay Complete! {stats}.")
+    return stats
+
+
+MODES = {
+    "full": (sync_full, COALESCE_MERGE.name),
+    "tail": (sync_tail, INSERT_ONLY.name),
+    "escalation-only": (sync_escalations, ESCALATION_ONLY.name),
+    "backfill": (sync_backfill, COALESCE_MERGE.name),
+    "tiered": (sync_tiered, REPLACE.name),
+    "replay": (sync_replay, COALESCE_MERGE.name),
+}
+
+
+def run(mode, policy=None, reset_hashes=False, repair_stale=False, **options):
+    """Run one sync mode in-process and return its SyncStats."""
+    sync, default_policy = MODES[mode]
+    metrics.start(f"sync:{mode}")
+    if mode != "replay" and page_cache.enabled:
+        dropped = page_cache.prune()
+        if dropped:
+            print(f"Dropped {dropped} expired cached pages.")
+    try:
+        create_table()
+        if reset_hashes:
+            with connection() as conn:
+                print(f"Cleared the row hash of {reset_row_hashes(conn)} conversations; every record is re-applied.")
+        elif repair_stale:
+            with connection() as conn:
+                print(f"Cleared the row hash of {reset_row_hashes(conn, where=_STALE_CONVERSATION)} conversations "
+                      f"with stale closed / snoozed fields; they are re-applied when next fetched.")
+        return sync(POLICIES[policy or default_policy], **options)
+    finally:
+        metrics.report()
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Atlas conversation sync.")
+    parser.add_argument("--mode", choices=sorted(MODES), default="full")
+    parser.add_argument("--policy", choices=sorted(POLICIES), default=None,
+                        help="conflict policy (default depends on the mode)")
+    full = parser.add_argument_group("full / backfill / tiered modes")
+    full.add_argument("--restart", action="store_true", help="ignore an unfinished checkpoint and start over")
+    full.add_argument("--max-pages", type=int, default=None,
+                      help="stop after this many API pages; the next run resumes where this one stopped")
+    tail = parser.add_argument_group("tail mode")
+    tail.add_argument("--full", action="store_true", help="ignore the watermark and scan from 2021-01-01")
+    tail.add_argument("--overlap-days", type=int, default=OVERLAP_DAYS,
+                      help="days re-read before the watermark (default: %(default)s)")
+    backfill = parser.add_argument_group("backfill / tiered modes")
+    backfill.add_argument("--workers", type=int, default=BACKFILL_WORKERS,
+                          help="date shards / month windows walked concurrently (default: %(default)s)")
+    backfill.add_argument("--shard-rows", type=int, default=SHARD_ROWS,
+                          help="split month shards until each holds at most this many rows (default: %(default)s)")
+    tiered = parser.add_argument_group("tiered mode")
+    tiered.add_argument("--recent-days", type=int, default=RECENT_DAYS,
+                        help="conversations closed within this many days stay hot (default: %(default)s)")
+    tiered.add_argument("--rotation-days", type=int, default=ROTATION_DAYS,
+                        help="the cold history is revisited once per this many days (default: %(default)s)")
+    parser.add_argument("--reset-hashes", action="store_true",
+                        help="forget stored row hashes so every fetched record is merged again "
+                             "(repairs rows written while the merge skipped columns)")
+    parser.add_argument("--repair-stale", action="store_true",
+                        help="forget the row hashes of conversations whose closed / snoozed fields disagree "
+                             "with their status, so the replace policy clears them when they are next fetched")
+    parser.add_argument("--child-tables", action="store_true",
+                        help="also maintain conversation_tags / conversation_custom_field_values")
+    parser.add_argument("--dimensions", action="store_true",
+                        help="keep customer / company / agent attributes in their own tables")
+    parser.add_argument("--partitioned", action="store_true",
+                        help="create a missing conversations table partitioned by created_at month")
+    cache = parser.add_argument_group("page cache")
+    cache.add_argument("--replay", action="store_true",
+                       help="rebuild from the pages a --cache run stored, without API calls (same as --mode replay)")
+    cache.add_argument("--cache", action="store_true",
+                       help="read and write the page cache, so a rerun or --replay can reuse the pages")
+    cache.add_argument("--no-cache", action="store_true",
+                       help="neither read nor write the page cache, even with ATLAS_CACHE=1")
+    cache.add_argument("--cache-ttl", type=float, default=None,
+                       help="seconds a cached page may be reused (default: ATLAS_CACHE_TTL or 12h)")
+    add_pipeline_arguments(parser)
+    return parser
+
+
+def main(argv=None):
+    global CHILD_TABLES, DIMENSIONS, PARTITIONED
+    args = build_parser().parse_args(argv)
+    CHILD_TABLES = CHILD_TABLES or args.child_tables
+    DIMENSIONS = DIMENSIONS or args.dimensions
+    PARTITIONED = PARTITIONED or args.partitioned
+    if args.replay:
+        args.mode = "replay"
+    page_cache.configure(enabled=(CACHE_ENABLED or args.cache) and not args.no_cache, ttl=args.cache_ttl)
+    options = pipeline_options(args)
+    if args.mode == "full":
+        options.update(restart=args.restart, max_pages=args.max_pages)
+    elif args.mode == "tail":
+        options.update(full=args.full, overlap_days=args.overlap_days)
+    elif args.mode == "backfill":
+        options.update(restart=args.restart, workers=args.workers, shard_rows=args.shard_rows)
+    elif args.mode == "tiered":
+        options.update(restart=args.restart, workers=args.workers,
+                       recent_days=args.recent_days, rotation_days=args.rotation_days)
+    return run(args.mode, args.policy, reset_hashes=args.reset_hashes, repair_stale=args.repair_stale,
+               **options)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""Benchmark the COPY bulk upsert against the old row-at-a-time insert path.
+
+Both paths are timed with each conflict policy the syncs use: the escalation-only
+merge and the COALESCE merge the daily resync runs. The second ("upsert") pass
+re-sends every page with ``--changed`` of the conversations modified, so the
+COPY path's skip of unchanged rows is measured against a realistic mix.
+
+Runs against the database in DB_HOST/DB_NAME/DB_USER/DB_PASS, inside a scratch
+schema (``atlas_bench`` by default) that is dropped and recreated per size.
+Never point BENCH_SCHEMA at ``atlas``.
+
+    python benchmarks/bench_bulk_upsert.py --sizes 10000 100000
+"""
+import argparse
+import os
+import pathlib
+import sys
+import time
+
+ROOT = pathlib.Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+import psycopg2  # noqa: E402
+
+from atlas_bulk import CONVERSATION_COLUMNS, bulk_upsert, ensure_row_hash_column  # noqa: E402
+from atlas_db import DB_CONFIG  # noqa: E402
+from atlas_normalize import conversation_to_row  # noqa: E402
+from atlas_sync import COALESCE_MERGE, ESCALATION_ONLY, TABLE_CREATION_QUERY  # noqa: E402
+from synthetic import synthetic_page  # noqa: E402
+
+PAGE_SIZE = 3000
+
+POLICIES = (ESCALATION_ONLY, COALESCE_MERGE)
+
+
+def legacy_insert(conn, table, data, on_conflict):
+    """The previous insert_into_db loop: one INSERT ... ON CONFLICT per conversation."""
+    placeholders = ", ".join(["%s"] * len(CONVERSATION_COLUMNS))
+    query = (
+        f"INSERT INTO {table} AS target ({', '.join(CONVERSATION_COLUMNS)}) "
+        f"VALUES ({placeholders}) {on_conflict}"
+    )
+    with conn.cursor() as cur:
+        for conversation in data:
+            cur.execute(query, conversation_to_row(conversation))
+
+
+def reset_schema(conn, schema):
+    with conn.cursor() as cur:
+        cur.execute(f"DROP SCHEMA IF EXISTS {schema} CASCADE;")
+        cur.execute(f"CREATE SCHEMA {schema};")
+        cur.execute(TABLE_CREATION_QUERY.replace("atlas.conversations", f"{schema}.conversations"))
+    ensure_row_hash_column(conn, f"{schema}.conversations")
+    conn.commit()
+
+
+def mutate(page, changed):
+    """Close (or reopen) roughly ``changed`` of the page's conversations and retag them."""
+    step = max(1, round(1 / changed)) if changed else 0
+    for i, conversation in enumerate(page):
+        if step and i % step == 0:
+            closing = conversation["status"] != "CLOSED"
+            conversation["status"] = "CLOSED" if closing else "OPEN"
+            conversation["closedAt"] = conversation["createdAt"] if closing else None
+            conversation["tags"] = conversation["tags"] + ["bench-changed"]
+    return page
+
+
+def timed_pass(conn, table, size, writer, on_conflict, changed=0.0):
+    started = time.perf_counter()
+    for start in range(0, size, PAGE_SIZE):
+        page = mutate(synthetic_page(start, min(PAGE_SIZE, size - start)), changed)
+        writer(conn, table, page, on_conflict)
+        conn.commit()
+    return time.perf_counter() - started
+
+
+def copy_writer(conn, table, page, on_conflict):
+    bulk_upsert(conn, page, on_conflict, table=table)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000])
+    parser.add_argument("--schema", default=os.environ.get("BENCH_SCHEMA", "atlas_bench"))
+    parser.add_argument("--changed", type=float, default=0.2,
+                        help="fraction of conversations modified before the upsert pass (default: %(default)s)")
+    args = parser.parse_args()
+    if args.schema == "atlas":
+        raise SystemExit("Refusing to benchmark inside the production schema.")
+
+    table = f"{args.schema}.conversations"
+    conn = psycopg2.connect(**DB_CONFIG)
+    try:
+        print(f"{'rows':>8} {'policy':>16} {'path':>6} {'insert s':>10} {'upsert s':>10} {'rows/s':>10}")
+        for size in args.sizes:
+            for policy in POLICIES:
+                for name, writer in (("row", legacy_insert), ("copy", copy_writer)):
+                    reset_schema(conn, args.schema)
+                    insert_s = timed_pass(conn, table, size, writer, policy.clause)
+                    upsert_s = timed_pass(conn, table, size, writer, policy.clause, args.changed)
+                    print(f"{size:>8} {policy.name:>16} {name:>6} {insert_s:>10.2f} {upsert_s:>10.2f} "
+                          f"{size / insert_s:>10.0f}")
+        with conn.cursor() as cur:
+            cur.execute(f"DROP SCHEMA IF EXISTS {args.schema} CASCADE;")
+        conn.commit()
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
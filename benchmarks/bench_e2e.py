@@ -0,0 +1,177 @@
+"""End-to-end benchmark: sync + enrichment against the mock Atlas API and a local Postgres.
+
+Starts benchmarks/mock_atlas.py as a subprocess, points the sync at it with
+ATLAS_API_URL, then runs the full sync, a tail sync, the message history sync
+and the enrichment pass in-process, reporting wall time, rows/sec and peak
+memory per stage. It writes into the ``atlas`` schema of DB_NAME, so it refuses
+any DB_HOST that is not local.
+
+    DB_NAME=atlas_bench DB_USER=postgres DB_PASS=postgres DB_HOST=localhost \\
+        python benchmarks/bench_e2e.py --conversations 100000 --reset --rate-429 0.01
+"""
+import argparse
+import asyncio
+import json
+import os
+import pathlib
+import resource
+import socket
+import subprocess
+import sys
+import threading
+import time
+import urllib.request
+
+ROOT = pathlib.Path(__file__).resolve().parent.parent
+HERE = pathlib.Path(__file__).resolve().parent
+LOCAL_HOSTS = ("localhost", "127.0.0.1", "::1", "")
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_mock(args):
+    port = free_port()
+    cmd = [sys.executable, str(HERE / "mock_atlas.py"), "--port", str(port),
+           "--conversations", str(args.conversations), "--latency-ms", str(args.latency_ms),
+           "--per-row-us", str(args.per_row_us), "--rate-429", str(args.rate_429),
+           "--rate-504", str(args.rate_504), "--seed", "1"]
+    proc = subprocess.Popen(cmd, cwd=HERE, stdout=subprocess.DEVNULL)
+    base = f"http://127.0.0.1:{port}/v1"
+    for _ in range(100):
+        try:
+            urllib.request.urlopen(f"{base}/conversations?cursor=0&limit=1", timeout=1)
+            return proc, base
+        except OSError:
+            if proc.poll() is not None:
+                raise SystemExit("mock_atlas.py exited during startup")
+            time.sleep(0.1)
+    proc.terminate()
+    raise SystemExit("mock_atlas.py did not come up")
+
+
+def rss_mb():
+    """Current resident set size; falls back to the process high-water mark where /proc is missing."""
+    try:
+        with open("/proc/self/status", encoding="ascii") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+class RssSampler:
+    """Samples RSS on a background thread, so each stage gets its own peak.
+
+    ru_maxrss is a process-wide high-water mark: every stage after the first
+    would report the earlier stage's peak.
+    """
+
+    def __init__(self, interval=0.05):
+        self.interval = interval
+        self.start = self.peak = rss_mb()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.peak = max(self.peak, rss_mb())
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self.peak = max(self.peak, rss_mb())
+
+
+def timed(name, rows_of, fn):
+    with RssSampler() as rss:
+        started = time.perf_counter()
+        result = fn()
+        seconds = time.perf_counter() - started
+    rows = rows_of(result)
+    return {"stage": name, "seconds": round(seconds, 2), "rows": rows,
+            "rows_per_s": round(rows / seconds, 1) if seconds else None,
+            "peak_rss_mb": round(rss.peak, 1), "rss_growth_mb": round(rss.peak - rss.start, 1)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--conversations", type=int, default=10_000, help="e.g. 10000 / 100000 / 1000000")
+    parser.add_argument("--latency-ms", type=float, default=20.0)
+    parser.add_argument("--per-row-us", type=float, default=5.0)
+    parser.add_argument("--rate-429", type=float, default=0.0)
+    parser.add_argument("--rate-504", type=float, default=0.0)
+    parser.add_argument("--fetchers", type=int, default=2)
+    parser.add_argument("--rate-limit", type=float, default=0.0, help="client requests/sec, 0 = unlimited")
+    parser.add_argument("--enrich-concurrency", type=int, default=50)
+    parser.add_argument("--skip-enrich", action="store_true")
+    parser.add_argument("--reset", action="store_true", help="drop atlas.conversations and the sync state first")
+    parser.add_argument("--output", type=pathlib.Path, default=None, help="also write the results as JSON")
+    args = parser.parse_args()
+
+    if os.environ.get("DB_HOST", "") not in LOCAL_HOSTS:
+        raise SystemExit("Refusing to benchmark against a non-local DB_HOST.")
+
+    proc, base = start_mock(args)
+    # Must be set before the atlas modules are imported: they read it at import time.
+    os.environ["ATLAS_API_URL"] = base
+    os.environ.setdefault("ATLAS_TOKEN", "bench")
+    os.environ.setdefault("DB_SSLMODE", "disable")
+    sys.path.insert(0, str(ROOT))
+
+    from atlas_api import rate_limiter
+    from atlas_db import connection
+    from atlas_enrich import ENRICHERS, enrich
+    from atlas_messages import sync_messages
+    from atlas_sync import run
+
+    results = []
+    try:
+        if args.reset:
+            with connection() as conn:
+                with conn.cursor() as cur:
+                    cur.execute("CREATE SCHEMA IF NOT EXISTS atlas;")
+                    cur.execute("DROP TABLE IF EXISTS atlas.conversations, atlas.sync_state, atlas.sync_checkpoints, "
+                                "atlas.customers, atlas.companies, atlas.agents, atlas.conversation_partitions, "
+                                "atlas.messages, atlas.message_sync_state CASCADE;")
+        rate_limiter.configure(args.rate_limit)
+        pipeline = {"fetchers": args.fetchers}
+
+        results.append(timed("sync full", lambda stats: stats.rows,
+                             lambda: run("full", restart=True, **pipeline)))
+        results.append(timed("sync tail", lambda stats: stats.rows,
+                             lambda: run("tail", **pipeline)))
+        if not args.skip_enrich:
+            results.append(timed("messages", lambda counts: counts["queued"], lambda: asyncio.run(
+                sync_messages(concurrency=args.enrich_concurrency, rate_limit=args.rate_limit))))
+            results.append(timed("enrich", lambda counts: counts["queued"], lambda: asyncio.run(
+                enrich(list(ENRICHERS.values()), concurrency=args.enrich_concurrency,
+                       rate_limit=args.rate_limit))))
+    finally:
+        proc.terminate()
+        proc.wait()
+
+    print(f"\n{args.conversations} conversations, latency {args.latency_ms} ms, "
+          f"429 rate {args.rate_429}, 504 rate {args.rate_504}")
+    print(f"{'stage':<12}{'seconds':>10}{'rows':>10}{'rows/s':>12}{'peak MB':>10}{'+MB':>8}")
+    for r in results:
+        print(f"{r['stage']:<12}{r['seconds']:>10.2f}{r['rows']:>10}{r['rows_per_s'] or 0:>12,.0f}"
+              f"{r['peak_rss_mb']:>10.1f}{r['rss_growth_mb']:>8.1f}")
+    if args.output:
+        args.output.write_text(json.dumps({"args": {k: str(v) for k, v in vars(args).items()}, "results": results},
+                                          indent=2), encoding="utf-8")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+"""Microbenchmarks: atlas_normalize versus the previous per-row flattening code.
+
+Needs no database or network:
+
+    python benchmarks/bench_normalize.py --rows 3000 --repeat 5
+"""
+import argparse
+import json
+import pathlib
+import sys
+import timeit
+from datetime import datetime, timezone
+
+ROOT = pathlib.Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from atlas_normalize import _parse_iso, convert_to_timestamp, normalize_page  # noqa: E402
+from synthetic import synthetic_page  # noqa: E402
+
+
+# === Previous implementation, kept verbatim for comparison ===
+def legacy_convert_to_timestamp(value):
+    if isinstance(value, datetime):
+        return value
+    if isinstance(value, int):
+        return datetime.fromtimestamp(value, timezone.utc)
+    if not value:
+        return None
+    try:
+        return datetime.strptime(value, "%Y-%m-%dT%H:%M:%S.%fZ")
+    except ValueError:
+        return None
+
+
+def legacy_flatten(conversation):
+    convert = legacy_convert_to_timestamp
+    customer = conversation.get("customer", {}) or {}
+    account = customer.get("account", {}) or {}
+    assigned_agent = conversation.get("assignedAgent", {}) or {}
+    last_message = conversation.get("lastMessage", {}) or {}
+    csat = conversation.get("csat", {}) or {}
+    stats = conversation.get("statistics", {}) or {}
+    # The old code computed these locals and then dumped each blob a second time below.
+    json.dumps(customer.get("customFields", {}))
+    json.dumps(account.get("customFields", {}))
+    json.dumps(conversation.get("customFields", {}))
+    return {
+        "conversation_id": conversation.get("id"),
+        "customer_id": customer.get("id"),
+        "customer_first_name": customer.get("firstName"),
+        "customer_last_name": customer.get("lastName"),
+        "customer_email": customer.get("email"),
+        "customer_phone": customer.get("phoneNumber"),
+        "customer_external_user_id": customer.get("externalUserId"),
+        "customer_created_at": convert(customer.get("createdAt")),
+        "company_id": customer.get("companyId"),
+        "company_name": account.get("name"),
+        "company_email": account.get("email"),
+        "company_website": account.get("website"),
+        "company_external_id": account.get("externalId"),
+        "started_at": convert(conversation.get("startedAt")),
+        "closed_at": convert(conversation.get("closedAt")),
+        "created_at": convert(conversation.get("createdAt")),
+        "assigned_at": convert(conversation.get("assignedAt")),
+        "assigned_by": conversation.get("assignedBy"),
+        "closed_by": conversation.get("closedBy"),
+        "assigned_agent_id": assigned_agent.get("id"),
+        "assigned_agent_name": assigned_agent.get("firstName"),
+        "assigned_agent_email": assigned_agent.get("email"),
+        "assigned_agent_created_at": convert(assigned_agent.get("createdAt")),
+        "browser": conversation.get("browser"),
+        "operating_system": conversation.get("operatingSystem"),
+        "last_message_id": last_message.get("id"),
+        "last_message_text": last_message.get("text"),
+        "last_message_channel": last_message.get("channel"),
+        "csat_score": csat.get("score", None),
+        "csat_comment": csat.get("comment", None),
+        "stats_first_response_time": stats.get("firstResponseTime", None),
+        "stats_avg_response_time": stats.get("avgResponseTime", None),
+        "stats_total_resolution_time": stats.get("totalResolutionTime", None),
+        "conversation_status": conversation.get("status"),
+        "conversation_priority": conversation.get("priority"),
+        "conversation_subject": conversation.get("subject"),
+        "assigned_team_id": conversation.get("assignedTeamId"),
+        "updated_by": conversation.get("updatedBy"),
+        "tags": conversation.get("tags", []) or [],
+        "snoozed_until": convert(conversation.get("snoozedUntil")),
+        "started_channel": conversation.get("startedChannel"),
+        "started_sub_channel": conversation.get("startedSubChannel"),
+        "number": conversation.get("number"),
+        "customer_custom_fields": json.dumps(customer.get("customFields", {})),
+        "account_custom_fields": json.dumps(account.get("customFields", {})),
+        "conversation_custom_fields": json.dumps(conversation.get("customFields", {})),
+        "escalated_at": convert(conversation.get("escalatedAt")),
+    }
+
+
+def cold(fn):
+    """Run ``fn`` with an empty parse cache so repeats do not flatter the new code."""
+    _parse_iso.cache_clear()
+    return fn()
+
+
+def best(stmt, repeat, number=1):
+    return min(timeit.repeat(stmt, repeat=repeat, number=number)) / number
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=3000, help="conversations per page")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    page = synthetic_page(0, args.rows)
+    stamps = [c["createdAt"] for c in page]
+
+    results = [
+        ("timestamp (strptime)", best(lambda: [legacy_convert_to_timestamp(s) for s in stamps], args.repeat)),
+        ("timestamp (fast path)", best(lambda: cold(lambda: [convert_to_timestamp(s) for s in stamps]), args.repeat)),
+        ("page (per-row dicts)", best(lambda: [legacy_flatten(c) for c in page], args.repeat)),
+        ("page (normalize_page)", best(lambda: cold(lambda: normalize_page(page)), args.repeat)),
+    ]
+    print(f"{args.rows} rows, best of {args.repeat}")
+    for name, seconds in results:
+        print(f"  {name:<24} {seconds * 1000:9.2f} ms  {args.rows / seconds:12,.0f} rows/s")
+
+
+if __name__ == "__main__":
+    main()
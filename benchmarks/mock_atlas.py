@@ -0,0 +1,190 @@
+"""Local mock of the Atlas API for benchmarks: no network, no token, configurable faults.
+
+Serves the endpoints the sync and enrichment code use:
+
+    GET /v1/conversations?cursor=&limit=&startDate=&endDate=   -> {"data": [...], "total": N}
+    GET /v1/conversations/{id}                                 -> conversation
+    GET /v1/conversations/{id}/messages                        -> {"data": [...], "total": n}
+
+Conversations are the deterministic ones from synthetic.py, spread evenly
+between 2021-01-01 and now so startDate / endDate windows behave like the real API.
+
+    python benchmarks/mock_atlas.py --conversations 100000 --latency-ms 80 --rate-429 0.01 --rate-504 0.005
+    ATLAS_API_URL=http://127.0.0.1:8765/v1 python Oldtickets.py
+"""
+import argparse
+import json
+import random
+import threading
+import time
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+from synthetic import EPOCH, synthetic_conversation, synthetic_messages, synthetic_page
+
+DEFAULT_PORT = 8765
+MAX_LIMIT = 3000
+
+
+class MockAtlas:
+    """Synthetic data set plus the fault-injection knobs shared by every request."""
+
+    def __init__(self, conversations=10_000, latency_ms=0.0, jitter_ms=0.0, per_row_us=0.0,
+                 rate_429=0.0, rate_504=0.0, retry_after=1, seed=None):
+        self.conversations = conversations
+        span = (datetime.utcnow() - EPOCH).total_seconds() / 60
+        self.minutes_apart = span / max(1, conversations)
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.per_row_us = per_row_us
+        self.rate_429 = rate_429
+        self.rate_504 = rate_504
+        self.retry_after = retry_after
+        self.random = random.Random(seed)
+        self.requests = 0
+        self._lock = threading.Lock()
+        self._index = None
+
+    def first_index(self, start_date, default=0):
+        """Index of the first conversation created on or after ``start_date``."""
+        if not start_date:
+            return default
+        try:
+            start = datetime.strptime(start_date[:10], "%Y-%m-%d")
+        except ValueError:
+            return default
+        minutes = (start - EPOCH).total_seconds() / 60
+        return min(self.conversations, max(0, -int(-minutes // self.minutes_apart)))
+
+    def window(self, start_date, end_date):
+        """[first, stop) indexes for a startDate..endDate query; endDate is inclusive."""
+        first = self.first_index(start_date)
+        if end_date:
+            try:
+                end_date = (datetime.strptime(end_date[:10], "%Y-%m-%d") + timedelta(days=1)).strftime("%Y-%m-%d")
+            except ValueError:
+                end_date = None
+        return first, max(first, self.first_index(end_date, self.conversations))
+
+    def index_of(self, conversation_id):
+        """conversation id -> index; the map is built on first use (ids are uuid5 hashes)."""
+        with self._lock:
+            if self._index is None:
+                self._index = {synthetic_conversation(i)["id"]: i for i in range(self.conversations)}
+        return self._index.get(conversation_id)
+
+    def fault(self):
+        """Pick an injected failure for this request: 429, 504 or None."""
+        with self._lock:
+            self.requests += 1
+            roll = self.random.random()
+        if roll < self.rate_429:
+            return 429
+        if roll < self.rate_429 + self.rate_504:
+            return 504
+        return None
+
+    def delay(self, rows=0):
+        jitter = random.uniform(-self.jitter_ms, self.jitter_ms) if self.jitter_ms else 0.0
+        seconds = max(0.0, self.latency_ms + jitter) / 1000 + rows * self.per_row_us / 1_000_000
+        if seconds:
+            time.sleep(seconds)
+
+
+class Handler(BaseHTTPRequestHandler):
+    atlas = None  # set by make_server
+    protocol_version = "HTTP/1.1"  # keep-alive, like the real API
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status, body=None, headers=None):
+        payload = json.dumps(body if body is not None else {"error": status}).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def do_GET(self):
+        atlas = self.atlas
+        url = urlsplit(self.path)
+        parts = [part for part in url.path.split("/") if part]
+        if parts[:2] != ["v1", "conversations"] or len(parts) > 4:
+            return self._send(404)
+
+        fault = atlas.fault()
+        if fault == 429:
+            return self._send(429, headers={"Retry-After": str(atlas.retry_after)})
+
+        if len(parts) == 2:
+            query = parse_qs(url.query)
+            cursor = int(query.get("cursor", ["0"])[0])
+            limit = min(MAX_LIMIT, int(query.get("limit", [str(MAX_LIMIT)])[0]))
+            first, stop = atlas.window(query.get("startDate", [None])[0], query.get("endDate", [None])[0])
+            total = stop - first
+            start = first + cursor
+            count = max(0, min(limit, stop - start))
+            atlas.delay(count)
+            if fault == 504:
+                return self._send(504)
+            return self._send(200, {"data": synthetic_page(start, count, atlas.minutes_apart), "total": total})
+
+        index = atlas.index_of(parts[2])
+        atlas.delay()
+        if fault == 504:
+            return self._send(504)
+        if index is None:
+            return self._send(404)
+        if len(parts) == 3:
+            return self._send(200, synthetic_conversation(index, atlas.minutes_apart))
+        if parts[3] == "messages":
+            messages = synthetic_messages(index)
+            return self._send(200, {"data": messages, "total": len(messages)})
+        return self._send(404)
+
+
+class _Server(ThreadingHTTPServer):
+    def handle_error(self, request, client_address):
+        pass  # clients dropping keep-alive connections mid-stream is expected
+
+
+def make_server(atlas, host="127.0.0.1", port=DEFAULT_PORT):
+    handler = type("MockAtlasHandler", (Handler,), {"atlas": atlas})
+    server = _Server((host, port), handler)
+    server.daemon_threads = True
+    return server
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--conversations", type=int, default=10_000, help="data set size, e.g. 10000 / 100000 / 1000000")
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="base latency added to every response")
+    parser.add_argument("--jitter-ms", type=float, default=0.0, help="uniform +/- jitter on the base latency")
+    parser.add_argument("--per-row-us", type=float, default=0.0, help="extra latency per listed conversation")
+    parser.add_argument("--rate-429", type=float, default=0.0, help="fraction of requests answered with 429")
+    parser.add_argument("--rate-504", type=float, default=0.0, help="fraction of requests answered with 504")
+    parser.add_argument("--retry-after", type=int, default=1, help="Retry-After seconds sent with a 429")
+    parser.add_argument("--seed", type=int, default=None, help="seed for the fault injection")
+    args = parser.parse_args(argv)
+
+    atlas = MockAtlas(args.conversations, args.latency_ms, args.jitter_ms, args.per_row_us,
+                      args.rate_429, args.rate_504, args.retry_after, args.seed)
+    server = make_server(atlas, args.host, args.port)
+    print(f"Mock Atlas serving {args.conversations} conversations on "
+          f"http://{args.host}:{server.server_address[1]}/v1", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
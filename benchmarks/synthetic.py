@@ -0,0 +1,96 @@
+"""Deterministic synthetic Atlas conversations for benchmarks."""
+import uuid
+from datetime import datetime, timedelta
+
+EPOCH = datetime(2021, 1, 1)
+_STATUSES = ("OPEN", "CLOSED", "SNOOZED")
+_PRIORITIES = ("LOW", "MEDIUM", "HIGH")
+_CHANNELS = ("email", "chat", "whatsapp")
+
+
+def _uuid(kind, i):
+    return str(uuid.uuid5(uuid.NAMESPACE_URL, f"atlas-bench/{kind}/{i}"))
+
+
+def _iso(moment):
+    return moment.strftime("%Y-%m-%dT%H:%M:%S.") + f"{moment.microsecond // 1000:03d}Z"
+
+
+def synthetic_conversation(i, minutes_apart=17):
+    """Build the i-th conversation shaped like a /v1/conversations list item."""
+    created = EPOCH + timedelta(minutes=minutes_apart * i)
+    customer_no = i % 5000
+    company_no = i % 400
+    agent_no = i % 25
+    status = _STATUSES[i % len(_STATUSES)]
+    return {
+        "id": _uuid("conversation", i),
+        "number": i + 1,
+        "status": status,
+        "priority": _PRIORITIES[i % len(_PRIORITIES)],
+        "subject": f"Synthetic conversation {i}",
+        "createdAt": _iso(created),
+        "startedAt": _iso(created),
+        "assignedAt": _iso(created + timedelta(minutes=3)),
+        "closedAt": _iso(created + timedelta(hours=5)) if status == "CLOSED" else None,
+        "snoozedUntil": _iso(created + timedelta(days=2)) if status == "SNOOZED" else None,
+        "escalatedAt": _iso(created + timedelta(hours=1)) if i % 11 == 0 else None,
+        "assignedBy": _uuid("agent", agent_no),
+        "closedBy": _uuid("agent", agent_no) if status == "CLOSED" else None,
+        "updatedBy": _uuid("agent", agent_no),
+        "assignedTeamId": _uuid("team", i % 4),
+        "browser": "Chrome",
+        "operatingSystem": "macOS",
+        "startedChannel": _CHANNELS[i % len(_CHANNELS)],
+        "startedSubChannel": None,
+        "tags": [f"tag-{i % 7}", f"tag-{i % 13}"],
+        "customFields": {"plan": f"plan-{i % 3}", "region": f"r{i % 5}"},
+        "customer": {
+            "id": _uuid("customer", customer_no),
+            "firstName": f"First{customer_no}",
+            "lastName": f"Last{customer_no}",
+            "email": f"customer{customer_no}@example.com",
+            "phoneNumber": f"+1555{customer_no:07d}",
+            "externalUserId": f"ext-{customer_no}",
+            "createdAt": _iso(EPOCH + timedelta(hours=customer_no)),
+            "companyId": _uuid("company", company_no),
+            "customFields": {"tier": customer_no % 4},
+            "account": {
+                "name": f"Company {company_no}",
+                "email": f"hello@company{company_no}.example.com",
+                "website": f"https://company{company_no}.example.com",
+                "externalId": f"acct-{company_no}",
+                "customFields": {"seats": company_no * 3},
+            },
+        },
+        "assignedAgent": {
+            "id": _uuid("agent", agent_no),
+            "firstName": f"Agent{agent_no}",
+            "email": f"agent{agent_no}@example.com",
+            "createdAt": _iso(EPOCH),
+        },
+        "lastMessage": {
+            "id": i * 10 + 9,
+            "text": f"Last message for conversation {i}\nwith a second line\tand a tab",
+            "channel": _CHANNELS[i % len(_CHANNELS)],
+        },
+        "csat": {"score": str(i % 5 + 1), "comment": None},
+        "statistics": {
+            "firstResponseTime": float(i % 600),
+            "avgResponseTime": float(i % 900),
+            "totalResolutionTime": float(i % 18000),
+        },
+    }
+
+
+def synthetic_page(start, count, minutes_apart=17):
+    """Return ``count`` consecutive synthetic conversations starting at ``start``."""
+    return [synthetic_conversation(i, minutes_apart) for i in range(start, start + count)]
+
+
+def synthetic_messages(i, count=3):
+    """Messages for the i-th conversation, shaped like /v1/conversations/{id}/messages."""
+    return [
+        {"id": i * 10 + n, "text": f"Message {n} for conversation {i}", "channel": _CHANNELS[i % len(_CHANNELS)]}
+        for n in range(count)
+    ]
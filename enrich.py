@@ -0,0 +1,10 @@
+# Fill every enrichment column: ticket numbers through atlas_enrich, then message
+# histories (and first_message, derived from them) through atlas_messages, which
+# only fetches conversations whose last message changed. Both read --concurrency,
+# --rate-limit, --batch-size and --flush-seconds.
+from atlas_enrich import ENRICHERS, main
+from atlas_messages import main as sync_messages
+
+if __name__ == "__main__":
+    main(list(ENRICHERS.values()))
+    sync_messages()
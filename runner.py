@@ -1,47 +1,228 @@
-import subprocess as sp, sys, pathlib, datetime
+import subprocess as sp, sys, pathlib, datetime, json, threading, time, traceback, argparse
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from contextlib import redirect_stdout, redirect_stderr
 
 PY = sys.executable           # use the current interpreter (handles venvs)
 ATLAS = pathlib.Path(__file__).resolve().parent
 LOG_DIR = ATLAS / "logs"
 LOG_DIR.mkdir(parents=True, exist_ok=True)
+sys.path.insert(0, str(ATLAS))
+
+from atlas_sync import main as sync_main
+
+MAX_PARALLEL = 2              # global cap on steps running at once
+RETRY_DELAY = 60              # seconds before a failed step is retried
+
+# In-process steps share sys.stdout and the module-level page-size / rate-limit
+# controllers, so only one of them runs at a time; subprocess steps overlap freely.
+_IN_PROCESS_LOCK = threading.Lock()
+_console = sys.stdout
+
+
+def say(msg):
+    """Runner progress goes to the real console even while an in-process step redirects stdout."""
+    print(msg, file=_console, flush=True)
+
+
+class Step:
+    """One node of the daily DAG.
+
+    ``target`` is either a script path (run as a subprocess) or a callable taking
+    ``args`` (run in-process). A step starts as soon as every step in ``deps``
+    has succeeded; it is skipped if any of them failed.
+    """
+
+    def __init__(self, name, target, args=(), deps=(), timeout=None, retries=0):
+        self.name = name
+        self.target = target
+        self.args = list(args)
+        self.deps = list(deps)
+        self.timeout = timeout
+        self.retries = retries
+        self.kind = "subprocess" if isinstance(target, str) else "in-process"
+        self.status = "pending"
+        self.attempts = 0
+        self.started = None
+        self.finished = None
+        self.error = None
+        self.started_at = None
+        self.finished_at = None
+        self.abandoned = False
+
+    def report(self):
+        return {
+            "name": self.name, "kind": self.kind, "deps": self.deps, "status": self.status,
+            "attempts": self.attempts, "timeout": self.timeout, "retries": self.retries,
+            "started": self.started, "finished": self.finished,
+            "duration": round(self.finished_at - self.started_at, 3) if self.finished_at else None,
+            "error": self.error,
+        }
+
+
+# === The daily job ===
+# Ticket numbers only need the rows the tail sync just added, so they overlap the tiered
+# resync; the resync resumes from its shard checkpoints, which makes retries cheap.
+# Message histories (and first_message, derived from them) wait for the resync, which
+# moves last_message_id on the older conversations that got new messages.
+STEPS = [
+    Step("1_final-atlasforlast500", sync_main, ["--mode", "tail"], timeout=2 * 3600, retries=1),
+    Step("2_ticketnumber", "ticketnumber.py", deps=["1_final-atlasforlast500"], timeout=4 * 3600, retries=1),
+    Step("4_oldtickets", sync_main, ["--mode", "tiered"], deps=["1_final-atlasforlast500"],
+         timeout=8 * 3600, retries=2),
+    Step("3_1stmessagefetch", "1stmessagefetch.py", deps=["4_oldtickets"], timeout=4 * 3600, retries=1),
+]
+
+
+def _header(f, step, what):
+    f.write(f"Started: {datetime.datetime.now()}\n")
+    f.write(f"CWD: {ATLAS}\n{what}\nAttempt: {step.attempts}\n\n")
+    f.flush()
+
+
+def _run_subprocess(step, f):
+    _header(f, step, f"CMD: {PY} {step.target} {' '.join(step.args)}")
+    try:
+        res = sp.run([PY, step.target, *step.args], cwd=ATLAS, stdout=f, stderr=sp.STDOUT, timeout=step.timeout)
+    except sp.TimeoutExpired:
+        return f"timed out after {step.timeout}s"
+    if res.returncode != 0:
+        return f"failed with exit code {res.returncode}"
+    return None
+
+
+def _call(step, log, outcome):
+    # Runs holding _IN_PROCESS_LOCK (taken by _run_in_process) and releases it when done.
+    # Own handle, so an abandoned (timed-out) attempt can keep logging after run_step moves on
+    try:
+        with log.open("a", encoding="utf-8") as f, redirect_stdout(f), redirect_stderr(f):
+            try:
+                step.target(step.args)
+            except SystemExit as e:
+                if e.code not in (None, 0):
+                    print(e.code)
+                    outcome.append(f"failed with exit code {e.code if isinstance(e.code, int) else 1}")
+            except Exception:
+                traceback.print_exc()
+                outcome.append("failed with an exception (see log)")
+            f.flush()
+    finally:
+        _IN_PROCESS_LOCK.release()
+
+
+def _run_in_process(step, f):
+    _header(f, step, f"CALL: {step.target.__module__}.{step.target.__name__}({step.args})")
+    outcome = []
+    # The step's timeout only starts once it holds the lock; a step that never got it has not
+    # run at all, so that attempt fails normally (and may be retried) instead of being abandoned.
+    if not _IN_PROCESS_LOCK.acquire(timeout=-1 if step.timeout is None else step.timeout):
+        return f"could not start: another in-process step held the lock for {step.timeout}s"
+    worker = threading.Thread(target=_call, args=(step, pathlib.Path(f.name), outcome), name=step.name, daemon=True)
+    try:
+        worker.start()
+    except BaseException:
+        _IN_PROCESS_LOCK.release()
+        raise
+    worker.join(step.timeout)
+    if worker.is_alive():
+        # A thread cannot be killed: the attempt keeps running (holding the in-process
+        # lock) and is only reported as timed out; it is not retried.
+        step.abandoned = True
+        return f"timed out after {step.timeout}s"
+    return outcome[0] if outcome else None
+
+
+def run_step(step):
+    """Run ``step`` with its retries; returns True on success."""
+    step.started = datetime.datetime.now().isoformat(timespec="seconds")
+    step.started_at = time.monotonic()
+    step.status = "running"
+    while True:
+        step.attempts += 1
+        say(f">> {step.name} (attempt {step.attempts}, {step.kind})")
+        log = LOG_DIR / f"{step.name}.log"
+        with log.open("w" if step.attempts == 1 else "a", encoding="utf-8") as f:
+            runner = _run_subprocess if step.kind == "subprocess" else _run_in_process
+            step.error = runner(step, f)
+        if step.error is None:
+            step.status = "succeeded"
+            break
+        say(f"!! {step.name} {step.error}")
+        if step.attempts > step.retries or step.abandoned:
+            step.status = "failed"
+            break
+        time.sleep(RETRY_DELAY)
+    step.finished = datetime.datetime.now().isoformat(timespec="seconds")
+    step.finished_at = time.monotonic()
+    return step.status == "succeeded"
+
+
+def run_dag(steps, max_parallel=MAX_PARALLEL):
+    """Start each step once its dependencies succeed, at most ``max_parallel`` at a time."""
+    by_name = {step.name: step for step in steps}
+    for step in steps:
+        missing = [dep for dep in step.deps if dep not in by_name]
+        if missing:
+            raise SystemExit(f"{step.name} depends on unknown step(s): {', '.join(missing)}")
+
+    running = {}
+    with ThreadPoolExecutor(max_workers=max(1, max_parallel)) as pool:
+        while True:
+            for step in steps:
+                if step.status != "pending":
+                    continue
+                dep_states = [by_name[dep].status for dep in step.deps]
+                if any(state in ("failed", "skipped") for state in dep_states):
+                    step.status = "skipped"
+                    step.error = "dependency did not succeed"
+                    say(f"-- {step.name} skipped")
+                elif all(state == "succeeded" for state in dep_states):
+                    step.status = "queued"
+                    running[pool.submit(run_step, step)] = step
+            if not running:
+                break
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                step = running.pop(future)
+                if future.exception() is not None:
+                    step.status = "failed"
+                    step.error = repr(future.exception())
+
+    for step in steps:
+        if step.status != "pending":
+            continue
+        # Only reachable with a dependency cycle
+        step.status = "skipped"
+        step.error = "dependency cycle"
+    return steps
+
+
+def write_report(steps, started, path):
+    report = {
+        "started": started,
+        "finished": datetime.datetime.now().isoformat(timespec="seconds"),
+        "succeeded": all(step.status == "succeeded" for step in steps),
+        "steps": [step.report() for step in steps],
+    }
+    path.write_text(json.dumps(report, indent=2), encoding="utf-8")
+    return report
 
-def run_and_log(script, log_name):
-    print(f">> {log_name}")
-    with (LOG_DIR / f"{log_name}.log").open("w", encoding="utf-8") as f:
-        f.write(f"Started: {datetime.datetime.now()}\n")
-        f.write(f"CWD: {ATLAS}\nCMD: {PY} {script}\n\n")
-        res = sp.run([PY, script], cwd=ATLAS, stdout=f, stderr=sp.STDOUT)
-        if res.returncode != 0:
-            raise SystemExit(f"{log_name} failed with exit code {res.returncode}")
-
-def run_parallel(pairs):
-    procs = []
-    for script, base in pairs:
-        out = (LOG_DIR / f"{base}.out.log").open("w", encoding="utf-8")
-        err = (LOG_DIR / f"{base}.err.log").open("w", encoding="utf-8")
-        print(f">> starting {script}")
-        p = sp.Popen([PY, script], cwd=ATLAS, stdout=out, stderr=err)
-        procs.append((p, out, err, script))
-    for p, out, err, script in procs:
-        code = p.wait()
-        out.close(); err.close()
-        if code != 0:
-            raise SystemExit(f"{script} failed with exit code {code}")
 
 if __name__ == "__main__":
     if not ATLAS.exists():
         raise SystemExit(f"atlas directory not found at {ATLAS}")
 
-    # 1) first
-    run_and_log("Final-atlasforlast500.py", "1_final-atlasforlast500")
-
-    # 2) middle pair together
-    run_parallel([
-        ("ticketnumber.py", "2_ticketnumber"),
-        ("1stmessagefetch.py", "3_1stmessagefetch"),
-    ])
-
-    # 3) last
-    run_and_log("Oldtickets.py", "4_oldtickets")
+    parser = argparse.ArgumentParser(description="Run the daily Atlas job as a dependency graph.")
+    parser.add_argument("--max-parallel", type=int, default=MAX_PARALLEL,
+                        help="max steps running at once (default: %(default)s)")
+    parser.add_argument("--report", type=pathlib.Path, default=LOG_DIR / "run_report.json",
+                        help="where to write the JSON run report (default: %(default)s)")
+    args = parser.parse_args()
 
-    print("All steps completed.")
+    started = datetime.datetime.now().isoformat(timespec="seconds")
+    run_dag(STEPS, args.max_parallel)
+    report = write_report(STEPS, started, args.report)
+    for step in report["steps"]:
+        say(f"   {step['name']:<28} {step['status']:<10} {step['duration'] or 0:>9.1f}s  attempts={step['attempts']}")
+    if not report["succeeded"]:
+        raise SystemExit(f"Some steps did not succeed; see {args.report}")
+    say("All steps completed.")
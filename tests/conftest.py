@@ -0,0 +1,48 @@
+import os
+
+import pytest
+
+# Tests marked ``db`` need a disposable PostgreSQL database: set ATLAS_TEST_DB=1 and the
+# usual DB_HOST / DB_PORT / DB_NAME / DB_USER / DB_PASS / DB_SSLMODE. They only create
+# temporary tables and roll back, but never point them at the production database.
+TEST_DB = os.environ.get("ATLAS_TEST_DB") == "1"
+
+
+def pytest_configure(config):
+    config.addinivalue_line("markers", "db: needs a PostgreSQL test database (ATLAS_TEST_DB=1)")
+
+
+def pytest_collection_modifyitems(config, items):
+    if TEST_DB:
+        return
+    skip = pytest.mark.skip(reason="set ATLAS_TEST_DB=1 to run database tests")
+    for item in items:
+        if "db" in item.keywords:
+            item.add_marker(skip)
+
+
+@pytest.fixture
+def pg():
+    """A connection whose work is rolled back afterwards; tables go in pg_temp."""
+    import psycopg2
+
+    from atlas_db import DB_CONFIG
+
+    conn = psycopg2.connect(**{key: value for key, value in DB_CONFIG.items() if key != "options"})
+    try:
+        yield conn
+    finally:
+        conn.rollback()
+        conn.close()
+
+
+@pytest.fixture
+def conversations(pg):
+    """A temporary table shaped like atlas.conversations (with row_hash); returns its name."""
+    from atlas_bulk import ensure_row_hash_column
+    from atlas_sync import TABLE_CREATION_QUERY
+
+    with pg.cursor() as cur:
+        cur.execute(TABLE_CREATION_QUERY.replace("atlas.conversations", "pg_temp.conversations"))
+    ensure_row_hash_column(pg, "pg_temp.conversations")
+    return "pg_temp.conversations"
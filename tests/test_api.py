@@ -0,0 +1,201 @@
+import email.utils
+import io
+import json
+from datetime import datetime, timedelta, timezone
+
+import pytest
+import requests
+import urllib3
+
+import atlas_api
+from atlas_api import AdaptivePageSize, get_json, retry_after_seconds, stream_conversations
+
+
+def test_shrink_halves_down_to_the_minimum():
+    controller = AdaptivePageSize(initial=1000, minimum=250, maximum=3000)
+    assert controller.shrink() == 500
+    assert controller.shrink() == 250
+    assert controller.shrink() == 250
+
+
+def test_fast_pages_grow_up_to_the_maximum():
+    controller = AdaptivePageSize(initial=1000, minimum=250, maximum=3000, fast_seconds=10)
+    assert controller.record(1.0) == 1500
+    assert controller.record(1.0) == 2250
+    assert controller.record(1.0) == 3000
+    assert controller.record(1.0) == 3000
+
+
+def test_slow_pages_keep_the_size():
+    controller = AdaptivePageSize(initial=1000, fast_seconds=10)
+    assert controller.record(10.0) == 1000
+    assert controller.record(30.0) == 1000
+
+
+def test_initial_and_reset_are_clamped():
+    assert AdaptivePageSize(initial=10, minimum=250, maximum=3000).limit == 250
+    controller = AdaptivePageSize(initial=5000, minimum=250, maximum=3000)
+    assert controller.limit == 3000
+    assert controller.reset(700) == 700
+    assert controller.reset(1) == 250
+    assert controller.reset(10_000) == 3000
+
+
+# === Retries ===
+class FakeResponse:
+    def __init__(self, status, body=None, headers=None):
+        self.status_code = status
+        self.body = body
+        self.headers = headers or {}
+        self.text = repr(body)
+
+    def json(self):
+        if isinstance(self.body, Exception):
+            raise self.body
+        return self.body
+
+
+class FakeSession:
+    """Answers each GET with the next scripted response (or raises it)."""
+
+    def __init__(self, responses):
+        self.responses = list(responses)
+        self.calls = []
+
+    def get(self, url, params=None, **kwargs):
+        self.calls.append(dict(params or {}))
+        response = self.responses.pop(0)
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+
+@pytest.fixture
+def session(monkeypatch):
+    sleeps = []
+    monkeypatch.setattr(atlas_api.time, "sleep", sleeps.append)
+    monkeypatch.setattr(atlas_api, "backoff_delay", lambda attempt: 0.5)
+    monkeypatch.setattr(atlas_api, "rate_limiter", atlas_api.RateLimiter(0))
+
+    def install(*responses):
+        fake = FakeSession(responses)
+        fake.sleeps = sleeps
+        monkeypatch.setattr(atlas_api, "get_session", lambda: fake)
+        return fake
+    return install
+
+
+def test_retry_after_seconds_and_http_dates():
+    assert retry_after_seconds({"Retry-After": "3"}) == 3.0
+    assert retry_after_seconds({"Retry-After": "-4"}) == 0.0
+    assert retry_after_seconds({}) is None and retry_after_seconds(None) is None
+    assert retry_after_seconds({"Retry-After": "soon"}) is None
+    later = email.utils.format_datetime(datetime.now(timezone.utc) + timedelta(seconds=30), usegmt=True)
+    assert 25 <= retry_after_seconds({"Retry-After": later}) <= 30
+    assert retry_after_seconds({"Retry-After": "Mon, 01 Jan 2001 00:00:00 GMT"}) == 0.0
+
+
+def test_get_json_retries_and_honours_retry_after(session):
+    fake = session(FakeResponse(429, headers={"Retry-After": "7"}), requests.ConnectionError(),
+                   FakeResponse(200, {"data": []}))
+    assert get_json("http://atlas.test", {"cursor": 0}) == {"data": []}
+    assert len(fake.calls) == 3
+    assert fake.sleeps == [7.0, 0.5]
+
+
+def test_get_json_gives_up_on_client_errors_and_after_max_retries(session):
+    fake = session(FakeResponse(404, {"error": "missing"}))
+    assert get_json("http://atlas.test") is None
+    assert len(fake.calls) == 1
+
+    fake = session(*[FakeResponse(503)] * 3)
+    assert get_json("http://atlas.test", max_retries=2) is None
+    assert len(fake.calls) == 3 and fake.sleeps == [0.5, 0.5]
+
+
+def test_get_json_shrinks_the_page_after_gateway_errors_and_timeouts(session):
+    controller = AdaptivePageSize(initial=2000, minimum=250, maximum=3000)
+    fake = session(FakeResponse(504), requests.Timeout(), FakeResponse(200, {"data": []}))
+    get_json("http://atlas.test", controller=controller, max_limit=1500)
+    assert [call["limit"] for call in fake.calls] == [1500, 1000, 500]
+
+
+def test_get_json_retries_invalid_json(session):
+    fake = session(FakeResponse(200, ValueError("truncated")), FakeResponse(200, {"total": 1}))
+    assert get_json("http://atlas.test") == {"total": 1}
+    assert len(fake.calls) == 2
+
+
+# === Streaming ===
+class BrokenStream(io.RawIOBase):
+    """A body that raises a protocol error after ``cut`` bytes."""
+
+    def __init__(self, payload, cut):
+        self.payload = payload[:cut]
+        self.offset = 0
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        if self.offset >= len(self.payload):
+            raise urllib3.exceptions.ProtocolError("connection reset")
+        size = min(len(buffer), len(self.payload) - self.offset, 7)
+        buffer[:size] = self.payload[self.offset:self.offset + size]
+        self.offset += size
+        return size
+
+
+class StreamResponse(FakeResponse):
+    def __init__(self, status, records=None, cut=None):
+        super().__init__(status)
+        payload = json.dumps({"data": records or [], "total": 99}).encode()
+        self.raw = io.BytesIO(payload) if cut is None else BrokenStream(payload, cut)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+def _records(first, count):
+    return [{"id": str(i)} for i in range(first, first + count)]
+
+
+@pytest.fixture
+def stream(session, monkeypatch):
+    monkeypatch.setattr(atlas_api.page_cache, "enabled", False)
+
+    def run(*responses, limit=6, chunk_rows=2, max_retries=3):
+        fake = session(*responses)
+        controller = AdaptivePageSize(initial=limit, minimum=1, maximum=limit)
+        chunks = list(stream_conversations(10, controller=controller, chunk_rows=chunk_rows,
+                                           max_retries=max_retries))
+        return fake, chunks
+    return run
+
+
+def test_stream_yields_chunks_of_one_page(stream):
+    fake, chunks = stream(StreamResponse(200, _records(10, 5)))
+    assert [[record["id"] for record in chunk] for chunk in chunks] == [["10", "11"], ["12", "13"], ["14"]]
+    assert fake.calls == [{"cursor": 10, "limit": 6, "startDate": atlas_api.FULL_START_DATE,
+                           "endDate": fake.calls[0]["endDate"]}]
+
+
+def test_stream_resumes_after_the_records_already_read(stream):
+    records = _records(10, 6)
+    payload = json.dumps({"data": records, "total": 99})
+    cut = payload.index('{"id": "14"}')  # the stream breaks inside the fifth record
+    fake, chunks = stream(StreamResponse(200, records, cut=cut), StreamResponse(503),
+                          StreamResponse(200, records[4:]))
+    assert [record["id"] for chunk in chunks for record in chunk] == [str(i) for i in range(10, 16)]
+    assert [(call["cursor"], call["limit"]) for call in fake.calls] == [(10, 6), (14, 2), (14, 2)]
+
+
+def test_stream_ends_quietly_at_the_end_of_data_and_raises_when_retries_run_out(stream):
+    assert stream(StreamResponse(200, []))[1] == []
+    with pytest.raises(RuntimeError, match="after 2 attempts"):
+        stream(StreamResponse(502), StreamResponse(502), max_retries=1)
+    with pytest.raises(RuntimeError, match="Status: 401"):
+        stream(StreamResponse(401))
@@ -0,0 +1,42 @@
+from datetime import datetime
+
+from atlas_bulk import _copy_value, copy_line, hashed_copy_line
+
+
+def test_null_and_scalars():
+    assert _copy_value(None) == "\\N"
+    assert _copy_value(True) == "t"
+    assert _copy_value(False) == "f"
+    assert _copy_value(42) == "42"
+    assert _copy_value(1.5) == "1.5"
+    assert _copy_value(datetime(2024, 3, 5, 14, 7, 9, 123000)) == "2024-03-05T14:07:09.123000"
+
+
+def test_copy_special_characters_are_escaped():
+    assert _copy_value("a\tb\nc\rd\\e") == "a\\tb\\nc\\rd\\\\e"
+    # The literal two characters backslash-N must not read back as NULL
+    assert _copy_value("\\N") == "\\\\N"
+
+
+def test_arrays():
+    assert _copy_value([]) == "{}"
+    assert _copy_value(["a", "b c"]) == '{"a","b c"}'
+    assert _copy_value(("a", None)) == '{"a",NULL}'
+    assert _copy_value(["NULL"]) == '{"NULL"}'
+
+
+def test_array_quotes_and_backslashes_are_escaped_for_both_layers():
+    # Array literal escaping first ({"say \"hi\""}), then COPY doubles every backslash
+    assert _copy_value(['say "hi"']) == '{"say \\\\"hi\\\\""}'
+    assert _copy_value(["a\\b"]) == '{"a\\\\\\\\b"}'
+    assert _copy_value(["tab\there"]) == '{"tab\\there"}'
+
+
+def test_copy_lines():
+    assert copy_line(("x", None, 3)) == "x\t\\N\t3\n"
+    line = hashed_copy_line(("x", None, 3))
+    body, digest = line.rstrip("\n").rsplit("\t", 1)
+    assert body == "x\t\\N\t3"
+    assert len(digest) == 32
+    assert hashed_copy_line(("x", None, 3)) == line
+    assert hashed_copy_line(("x", None, 4)) != line
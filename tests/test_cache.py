@@ -0,0 +1,73 @@
+import os
+import time
+
+from atlas_cache import PageCache, cache_key
+
+URL = "http://atlas.test/v1/conversations"
+
+
+def _params(cursor, limit=500):
+    return {"cursor": cursor, "startDate": "2024-01-01", "endDate": "2024-01-31", "limit": limit}
+
+
+def _page(n, total=None):
+    return {"data": [{"id": str(i), "text": "x" * 200} for i in range(n)], "total": total}
+
+
+def test_key_ignores_the_page_size():
+    assert cache_key(URL, _params(0, 100)) == cache_key(URL, _params(0, 3000))
+    assert cache_key(URL, _params(0)) != cache_key(URL, _params(500))
+
+
+def test_hit_trims_to_the_requested_limit(tmp_path):
+    cache = PageCache(tmp_path)
+    cache.put(URL, _params(0), _page(5, total=40))
+    page = cache.get(URL, _params(0), limit=3)
+    assert [record["id"] for record in page["data"]] == ["0", "1", "2"]
+    assert page["total"] == 40
+    assert len(cache.get(URL, _params(0))["data"]) == 5
+    assert cache.get(URL, _params(5)) is None
+    assert (cache.hits, cache.misses) == (2, 1)
+
+
+def test_expired_entries_miss_and_are_pruned(tmp_path):
+    cache = PageCache(tmp_path, ttl=60)
+    cache.put(URL, _params(0), _page(2))
+    cache.put(URL, _params(2), _page(2))
+    cache.ttl = -1  # everything stored so far is now expired
+    assert cache.get(URL, _params(0)) is None
+    assert len(list(tmp_path.glob("*.jsonl.gz"))) == 1
+    assert cache.prune() == 1
+    assert not list(tmp_path.glob("*.jsonl.gz"))
+
+
+def test_oldest_files_are_evicted_past_max_bytes(tmp_path):
+    cache = PageCache(tmp_path)
+    cache.put(URL, _params(0), _page(50))
+    size = next(tmp_path.glob("*.jsonl.gz")).stat().st_size
+    cache.max_bytes = int(size * 2.5)
+    old = time.time() - 100
+    os.utime(next(tmp_path.glob("*.jsonl.gz")), (old, old))
+    cache.put(URL, _params(50), _page(50))
+    cache.put(URL, _params(100), _page(50))
+    assert cache.get(URL, _params(0)) is None
+    assert cache.get(URL, _params(50)) is not None and cache.get(URL, _params(100)) is not None
+
+
+def test_disabled_cache_and_aborted_writes_leave_nothing(tmp_path):
+    PageCache(tmp_path, enabled=False).put(URL, _params(0), _page(2))
+    writer = PageCache(tmp_path).writer(URL, _params(0))
+    writer.write({"id": "1"})
+    writer.abort()
+    assert not list(tmp_path.iterdir())
+
+
+def test_iter_pages_replays_in_fetch_order_ignoring_the_ttl(tmp_path):
+    cache = PageCache(tmp_path, ttl=-1)
+    for cursor in (0, 2):
+        cache.put(URL, _params(cursor), _page(2))
+        time.sleep(0.01)
+    cache.put("http://other.test/v1/conversations", _params(0), _page(1))
+    pages = list(cache.iter_pages(URL))
+    assert [header["params"]["cursor"] for header, _ in pages] == [0, 2]
+    assert all("limit" not in header["params"] for header, _ in pages)
@@ -0,0 +1,50 @@
+from datetime import datetime
+
+from atlas_bulk import CONVERSATION_COLUMNS
+from atlas_dimensions import DIMENSIONS, MOVED_COLUMNS, MOVED_POSITIONS, extract_dimensions
+
+
+def _conversation(conv_id, customer_id, first_name, company_id="co1", agent_id="ag1"):
+    return {
+        "id": conv_id,
+        "customer": {"id": customer_id, "firstName": first_name, "companyId": company_id,
+                     "createdAt": "2024-03-05T14:07:09Z", "customFields": {"tier": 1},
+                     "account": {"name": "Acme", "customFields": {}}},
+        "assignedAgent": {"id": agent_id, "firstName": "Ann", "email": "ann@example.com"},
+    }
+
+
+def test_values_follow_the_dimension_columns():
+    found = extract_dimensions([_conversation("c1", "cu1", "Bo")])
+    for table, rows in found.items():
+        assert all(len(values) == len(DIMENSIONS[table][1]) for values in rows.values())
+    customer = found["customers"]["cu1"]
+    assert customer[0] == "Bo"
+    assert customer[5] == datetime(2024, 3, 5, 14, 7, 9)
+    assert customer[6:] == ("co1", '{"tier": 1}')
+    assert found["companies"] == {"co1": ("Acme", None, None, None, "{}")}
+    assert found["agents"] == {"ag1": ("Ann", "ann@example.com", None)}
+
+
+def test_each_id_appears_once_and_the_last_occurrence_wins():
+    found = extract_dimensions([
+        _conversation("c1", "cu1", "Old"),
+        _conversation("c2", "cu2", "Other"),
+        _conversation("c3", "cu1", "New"),
+    ])
+    assert sorted(found["customers"]) == ["cu1", "cu2"]
+    assert found["customers"]["cu1"][0] == "New"
+    assert list(found["companies"]) == ["co1"] and list(found["agents"]) == ["ag1"]
+
+
+def test_missing_keys_produce_no_dimension_rows():
+    found = extract_dimensions([
+        {"id": "c1"},
+        {"id": "c2", "customer": {"id": "cu1", "account": {"name": "No company id"}}, "assignedAgent": {}},
+    ])
+    assert list(found["customers"]) == ["cu1"]
+    assert found["companies"] == {} and found["agents"] == {}
+
+
+def test_moved_positions_point_at_the_moved_columns():
+    assert {CONVERSATION_COLUMNS[i] for i in MOVED_POSITIONS} == set(MOVED_COLUMNS)
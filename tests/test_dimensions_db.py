@@ -0,0 +1,55 @@
+import uuid
+
+import pytest
+
+from atlas_bulk import bulk_upsert
+from atlas_children import ensure_child_tables, refresh_child_tables, refresh_dimension_children
+from atlas_dimensions import MOVED_POSITIONS, ensure_dimension_tables, write_dimensions
+from atlas_sync import REPLACE
+
+pytestmark = pytest.mark.db
+
+CUSTOMER = str(uuid.uuid4())
+COMPANY = str(uuid.uuid4())
+
+
+def _conversation(conv_id, tier):
+    return {"id": conv_id, "status": "OPEN", "createdAt": "2024-03-01T10:00:00Z",
+            "customer": {"id": CUSTOMER, "companyId": COMPANY, "customFields": {"tier": tier},
+                         "account": {"name": "Acme", "customFields": {"region": "eu"}}}}
+
+
+def _write(pg, table, records):
+    dimensions = write_dimensions(pg, records, schema="pg_temp")
+    hook = lambda cur, written, ids: refresh_child_tables(cur, written, ids, source="pg_temp.conversations_full")
+    result = bulk_upsert(pg, records, REPLACE.clause, table=table, after_write=[hook], null_positions=MOVED_POSITIONS)
+    with pg.cursor() as cur:
+        refreshed = refresh_dimension_children(cur, table, dimensions["customers"], dimensions["companies"],
+                                               source="pg_temp.conversations_full")
+    return dimensions, result, refreshed
+
+
+def _tiers(pg):
+    with pg.cursor() as cur:
+        cur.execute("SELECT conversation_id::text, value FROM pg_temp.conversation_custom_field_values "
+                    "WHERE scope = 'customer' AND field = 'tier' ORDER BY 1;")
+        return cur.fetchall()
+
+
+def test_customer_change_refreshes_child_rows_of_unchanged_conversations(pg, conversations):
+    ensure_dimension_tables(pg, "pg_temp")
+    ensure_child_tables(pg, conversations, source="pg_temp.conversations_full")
+    ids = sorted(str(uuid.uuid4()) for _ in range(2))
+    _write(pg, conversations, [_conversation(conv_id, 0) for conv_id in ids])
+    assert _tiers(pg) == [(conv_id, 0) for conv_id in ids]
+
+    # Only the customer's custom field changed: the conversation rows (and hashes) stay the same
+    dimensions, result, refreshed = _write(pg, conversations, [_conversation(ids[0], 99)])
+    assert result.unchanged == 1
+    assert dimensions["customers"] == [CUSTOMER] and dimensions["companies"] == []
+    assert refreshed == 2
+    assert _tiers(pg) == [(conv_id, 99) for conv_id in ids]
+
+    # Nothing changed: no dimension row is rewritten and no child rows are touched
+    dimensions, _, refreshed = _write(pg, conversations, [_conversation(ids[0], 99)])
+    assert dimensions["customers"] == [] and refreshed == 0
@@ -0,0 +1,100 @@
+import asyncio
+import time
+
+import atlas_enrich
+from atlas_enrich import TokenBucket, UpdateBuffer, write_batch
+
+
+def test_token_bucket_bursts_to_capacity_then_paces():
+    async def timed(bucket, n):
+        started = time.monotonic()
+        for _ in range(n):
+            await bucket.acquire()
+        return time.monotonic() - started
+
+    assert asyncio.run(timed(TokenBucket(rate=50, capacity=5), 5)) < 0.05
+    assert 0.08 <= asyncio.run(timed(TokenBucket(rate=50, capacity=5), 10)) < 0.5
+
+
+def test_token_bucket_without_a_rate_never_waits():
+    async def run():
+        bucket = TokenBucket(rate=0)
+        for _ in range(1000):
+            await bucket.acquire()
+    started = time.monotonic()
+    asyncio.run(run())
+    assert time.monotonic() - started < 0.1
+
+
+class RecordingBuffer(UpdateBuffer):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.writes = []
+
+    async def _write(self, groups):
+        self.writes.append(groups)
+
+
+def test_update_buffer_groups_rows_by_column_set():
+    buffer = RecordingBuffer(max_rows=10, max_seconds=60)
+    buffer.add("a", {"ticket_number": "1"})
+    buffer.add("b", {"ticket_number": "2", "first_message": "hi"})
+    buffer.add("c", {"ticket_number": "3"})
+    assert not buffer.due()
+    asyncio.run(buffer.flush())
+    assert buffer.writes == [{
+        ("ticket_number",): [("a", "1"), ("c", "3")],
+        ("ticket_number", "first_message"): [("b", "2", "hi")],
+    }]
+    assert buffer.flushed == 3
+    asyncio.run(buffer.flush())  # nothing buffered: no write
+    assert len(buffer.writes) == 1
+
+
+def test_update_buffer_is_due_by_rows_or_age():
+    buffer = RecordingBuffer(max_rows=2, max_seconds=60)
+    buffer.add("a", {"ticket_number": "1"})
+    assert not buffer.due()
+    buffer.add("b", {"ticket_number": "2"})
+    assert buffer.due()
+
+    buffer = RecordingBuffer(max_rows=100, max_seconds=0.01)
+    assert not buffer.due()
+    buffer.add("a", {"ticket_number": "1"})
+    time.sleep(0.02)
+    assert buffer.due()
+
+
+def test_periodic_flush_writes_rows_that_trickle_in():
+    async def run():
+        buffer = RecordingBuffer(max_rows=100, max_seconds=0.01)
+        flusher = asyncio.create_task(buffer.flush_periodically())
+        buffer.add("a", {"ticket_number": "1"})
+        await asyncio.sleep(0.1)
+        flusher.cancel()
+        return buffer
+    assert asyncio.run(run()).flushed == 1
+
+
+def test_write_batch_sends_one_update_per_column_set(monkeypatch):
+    statements = []
+
+    class Cursor:
+        def __enter__(self):
+            return self
+
+        def __exit__(self, *exc):
+            return False
+
+    class Connection(Cursor):
+        def cursor(self):
+            return Cursor()
+
+    monkeypatch.setattr(atlas_enrich, "connection", Connection)
+    monkeypatch.setattr(atlas_enrich, "execute_values",
+                        lambda cur, sql, rows, page_size: statements.append((" ".join(sql.split()), rows, page_size)))
+    write_batch(("ticket_number",), [("a", "1"), ("b", "2")])
+    [(sql, rows, page_size)] = statements
+    assert "SET ticket_number = v.ticket_number::text" in sql
+    assert "AS v (conversation_id, ticket_number)" in sql
+    assert rows == [("a", "1"), ("b", "2")] and page_size == 2
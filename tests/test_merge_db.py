@@ -0,0 +1,53 @@
+import uuid
+
+import pytest
+
+from atlas_bulk import bulk_upsert
+from atlas_sync import COALESCE_MERGE, REPLACE
+
+pytestmark = pytest.mark.db
+
+AGENT = str(uuid.uuid4())
+
+
+def _conversation(conv_id, **fields):
+    record = {"id": conv_id, "status": "CLOSED", "createdAt": "2024-03-01T10:00:00Z",
+              "closedAt": "2024-03-02T10:00:00Z", "closedBy": AGENT}
+    record.update(fields)
+    return record
+
+
+def _stored(pg, table, conv_id):
+    with pg.cursor() as cur:
+        cur.execute(f"SELECT conversation_status, closed_at, closed_by, row_hash FROM {table} "
+                    f"WHERE conversation_id = %s;", (conv_id,))
+        return cur.fetchone()
+
+
+def test_coalesce_keeping_a_stored_value_clears_the_hash(pg, conversations):
+    conv_id = str(uuid.uuid4())
+    bulk_upsert(pg, [_conversation(conv_id)], COALESCE_MERGE.clause, table=conversations)
+    reopened = _conversation(conv_id, status="OPEN", closedAt=None, closedBy=None)
+
+    result = bulk_upsert(pg, [reopened], COALESCE_MERGE.clause, table=conversations)
+    status, closed_at, closed_by, row_hash = _stored(pg, conversations, conv_id)
+    assert result.changed == 1
+    assert status == "OPEN"
+    assert closed_at is not None and str(closed_by) == AGENT
+    assert row_hash is None
+
+    # The stale row is not mistaken for an unchanged one: replace applies the record
+    result = bulk_upsert(pg, [reopened], REPLACE.clause, table=conversations)
+    assert result.changed == 1
+    assert _stored(pg, conversations, conv_id)[1:3] == (None, None)
+    assert bulk_upsert(pg, [reopened], REPLACE.clause, table=conversations).unchanged == 1
+
+
+def test_coalesce_applying_the_whole_record_keeps_the_hash(pg, conversations):
+    conv_id = str(uuid.uuid4())
+    bulk_upsert(pg, [_conversation(conv_id, status="OPEN", closedAt=None, closedBy=None)],
+                COALESCE_MERGE.clause, table=conversations)
+    result = bulk_upsert(pg, [_conversation(conv_id)], COALESCE_MERGE.clause, table=conversations)
+    assert result.changed == 1
+    assert _stored(pg, conversations, conv_id)[3] is not None
+    assert bulk_upsert(pg, [_conversation(conv_id)], COALESCE_MERGE.clause, table=conversations).unchanged == 1
@@ -0,0 +1,30 @@
+import json
+from datetime import datetime
+
+from atlas_enrich import FIRST_MESSAGE
+from atlas_messages import MESSAGE_COLUMNS, first_message, message_rows
+
+
+def test_message_rows_follow_the_column_order_and_keep_positions():
+    message = {"id": 7, "text": "hi", "channel": "EMAIL", "createdAt": "2024-03-05T14:07:09Z"}
+    [row] = message_rows({"c1": (7, [message])})
+    assert len(row) == len(MESSAGE_COLUMNS)
+    assert row[:6] == ("c1", 7, 0, "hi", "EMAIL", datetime(2024, 3, 5, 14, 7, 9))
+    assert json.loads(row[6]) == message
+
+
+def test_message_rows_skip_ids_that_are_missing_and_keep_the_last_repeat():
+    history = [{"id": 1, "text": "a"}, {"text": "no id"}, {"id": 2, "text": "b"}, {"id": 1, "text": "a again"}]
+    rows = message_rows({"c1": (1, history), "c2": (None, [])})
+    assert [(row[1], row[2], row[3]) for row in rows] == [(1, 3, "a again"), (2, 2, "b")]
+
+
+def test_first_message_is_the_oldest_text_or_empty():
+    assert first_message([{"text": "first"}, {"text": "second"}]) == "first"
+    assert first_message([{"text": None}]) == ""
+    assert first_message([]) == ""
+
+
+def test_first_message_enricher_marks_empty_histories_as_done():
+    assert FIRST_MESSAGE.parse({"data": [{"text": "hello"}]}) == "hello"
+    assert FIRST_MESSAGE.parse({"data": []}) == ""
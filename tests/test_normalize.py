@@ -0,0 +1,76 @@
+from datetime import datetime, timezone
+
+import pytest
+
+from atlas_bulk import CONVERSATION_COLUMNS
+from atlas_normalize import conversation_to_row, convert_to_timestamp, normalize_page
+
+EXPECTED = datetime(2024, 3, 5, 14, 7, 9, 123000)
+
+
+@pytest.mark.parametrize("value", [
+    "2024-03-05T14:07:09.123Z",
+    "2024-03-05T14:07:09.123z",
+    "2024-03-05T14:07:09.123+00:00",
+    "2024-03-05T16:07:09.123+02:00",
+    "2024-03-05T16:07:09.123+0200",
+    "2024-03-05T12:07:09.123-02",
+    "2024-03-05 14:07:09.123 Z",
+    "2024-03-05T14:07:09,123Z",
+    "2024-03-05T14:07:09.1230000Z",
+])
+def test_iso_variants_become_naive_utc(value):
+    assert convert_to_timestamp(value) == EXPECTED
+
+
+def test_short_fraction_and_missing_parts():
+    assert convert_to_timestamp("2024-03-05T14:07:09.5Z") == datetime(2024, 3, 5, 14, 7, 9, 500000)
+    assert convert_to_timestamp("2024-03-05T14:07Z") == datetime(2024, 3, 5, 14, 7)
+    assert convert_to_timestamp("2024-03-05") == datetime(2024, 3, 5)
+
+
+def test_epoch_seconds_and_milliseconds():
+    expected = datetime(2023, 11, 14, 22, 13, 20)
+    assert convert_to_timestamp(1_700_000_000) == expected
+    assert convert_to_timestamp(1_700_000_000_000) == expected
+    assert convert_to_timestamp(1_700_000_000.5) == expected.replace(microsecond=500000)
+
+
+def test_datetimes_are_converted_to_naive_utc():
+    naive = datetime(2024, 3, 5, 14, 7, 9)
+    assert convert_to_timestamp(naive) is naive
+    aware = datetime(2024, 3, 5, 14, 7, 9, tzinfo=timezone.utc)
+    assert convert_to_timestamp(aware) == naive
+
+
+@pytest.mark.parametrize("value", [None, "", 0, "not a date", "2024-13-01T00:00:00Z", True, [2024]])
+def test_unusable_values_are_none(value):
+    assert convert_to_timestamp(value) is None
+
+
+def _column(row, name):
+    return row[CONVERSATION_COLUMNS.index(name)]
+
+
+def test_normalize_page_keeps_the_last_copy_of_a_repeated_id():
+    rows = normalize_page([{"id": "a", "status": "OPEN"}, {"id": "b"}, {"id": "a", "status": "CLOSED"}])
+    assert [row[0] for row in rows] == ["a", "b"]
+    assert _column(rows[0], "conversation_status") == "CLOSED"
+    assert len(normalize_page([{"id": "a"}, {"id": "a"}], dedupe=False)) == 2
+
+
+def test_normalize_page_skips_records_without_an_id(capsys):
+    rows = normalize_page([{"status": "OPEN"}, {"id": None}, {"id": "a"}])
+    assert [row[0] for row in rows] == ["a"]
+    assert capsys.readouterr().out.count("Skipping record") == 2
+
+
+def test_row_shape_and_defaults():
+    row = conversation_to_row({"id": "a", "customer": {"id": "c", "customFields": {"tier": 1}},
+                               "createdAt": "2024-03-05T14:07:09.123Z"})
+    assert len(row) == len(CONVERSATION_COLUMNS)
+    assert _column(row, "customer_id") == "c"
+    assert _column(row, "created_at") == EXPECTED
+    assert _column(row, "tags") == []
+    assert _column(row, "customer_custom_fields") == '{"tier": 1}'
+    assert _column(row, "account_custom_fields") == "{}"
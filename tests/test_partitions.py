@@ -0,0 +1,60 @@
+from datetime import date, datetime
+
+import pytest
+
+import atlas_partitions
+from atlas_partitions import (DEFAULT_PARTITION, first_unfrozen_month, months_between, next_month, partition_name,
+                              partitioned_ddl, split_page)
+from atlas_sync import TABLE_CREATION_QUERY
+
+
+@pytest.fixture
+def created(monkeypatch):
+    months = []
+    monkeypatch.setattr(atlas_partitions, "ensure_partitions", lambda wanted, schema="atlas": months.extend(wanted))
+    return months
+
+
+def _record(conv_id, created_at):
+    return {"id": conv_id, "createdAt": created_at}
+
+
+def test_partitioned_ddl_drops_the_primary_key_and_partitions_by_month():
+    ddl = partitioned_ddl(TABLE_CREATION_QUERY)
+    assert "PRIMARY KEY" not in ddl
+    assert "conversation_id UUID NOT NULL" in ddl
+    assert ddl.endswith(") PARTITION BY RANGE (created_at);")
+
+
+def test_month_helpers():
+    assert next_month(date(2024, 12, 1)) == date(2025, 1, 1)
+    assert months_between(datetime(2024, 11, 20), date(2025, 1, 5)) == [
+        date(2024, 11, 1), date(2024, 12, 1), date(2025, 1, 1)]
+    assert partition_name(date(2024, 3, 1)) == "conversations_p2024_03"
+    assert partition_name(None) == DEFAULT_PARTITION
+    frozen = {partition_name(date(2024, 1, 1)), partition_name(date(2024, 2, 1))}
+    assert first_unfrozen_month(date(2024, 1, 15), frozen) == date(2024, 3, 1)
+
+
+def test_split_page_groups_by_month_in_name_order(created):
+    records = [
+        _record("a", "2024-03-05T10:00:00Z"),
+        _record("b", "2024-01-31T23:59:59Z"),
+        _record("c", None),
+        _record("d", "2024-03-01T00:00:00Z"),
+    ]
+    parts, skipped = split_page(records)
+    assert [(table, [r["id"] for r in part]) for table, part in parts] == [
+        ("atlas.conversations_p2024_01", ["b"]),
+        ("atlas.conversations_p2024_03", ["a", "d"]),
+        ("atlas.conversations_pdefault", ["c"]),
+    ]
+    assert skipped == 0
+    assert sorted(created, key=str) == sorted([date(2024, 3, 1), date(2024, 1, 1), None], key=str)
+
+
+def test_split_page_skips_frozen_partitions(created):
+    records = [_record("a", "2023-06-01T00:00:00Z"), _record("b", "2024-06-01T00:00:00Z")]
+    parts, skipped = split_page(records, frozen={"conversations_p2023_06"}, schema="pg_temp")
+    assert [(table, len(part)) for table, part in parts] == [("pg_temp.conversations_p2024_06", 1)]
+    assert skipped == 1
@@ -0,0 +1,54 @@
+from atlas_api import page_size
+from atlas_pipeline import PagePipeline, _Progress
+
+
+def test_progress_advances_only_over_contiguous_ranges():
+    progress = _Progress(100)
+    progress.mark(200, 300)
+    assert progress.contiguous == 100
+    progress.mark(100, 200)
+    assert progress.contiguous == 300
+    progress.mark(400, 500)
+    progress.mark(300, 400)
+    assert progress.contiguous == 500
+
+
+def test_progress_after_does_not_record():
+    progress = _Progress(0)
+    progress.mark(10, 20)
+    assert progress.after(0, 10) == 20
+    assert progress.after(20, 30) == 0
+    assert progress.contiguous == 0
+    progress.mark(0, 10)
+    assert progress.contiguous == 20
+
+
+def _chunked_fetch(chunk_rows):
+    def fetch(cursor, max_limit):
+        return (list(range(start, min(start + chunk_rows, cursor + max_limit)))
+                for start in range(cursor, cursor + max_limit, chunk_rows))
+    return fetch
+
+
+def test_pipeline_writes_every_record_once():
+    page_size.reset(250)
+    written = []
+    pipeline = PagePipeline(_chunked_fetch(100), lambda records, cursor, committed: written.extend(records),
+                            0, 1000, fetchers=3, queue_depth=2)
+    assert pipeline.run() == (1000, 1000)
+    assert sorted(written) == list(range(1000))
+
+
+def test_max_pages_counts_api_pages_not_chunks():
+    page_size.reset(250)
+    pipeline = PagePipeline(_chunked_fetch(100), lambda records, cursor, committed: None, 0, 1000,
+                            fetchers=2, max_pages=3)
+    assert pipeline.run() == (750, 750)
+    assert pipeline.pages_claimed == 3
+
+
+def test_end_of_data_before_total():
+    page_size.reset(250)
+    pipeline = PagePipeline(lambda cursor, limit: list(range(cursor, min(cursor + limit, 600))),
+                            lambda records, cursor, committed: None, 0, 1000, fetchers=1)
+    assert pipeline.run() == (600, 600)
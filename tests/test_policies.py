@@ -0,0 +1,37 @@
+from atlas_bulk import CONVERSATION_COLUMNS
+from atlas_sync import (COALESCE_MERGE, ESCALATION_ONLY, INSERT_ONLY, POLICIES, REPLACE, ConflictPolicy,
+                        _MERGED_COLUMNS, register_policy)
+
+
+def test_merged_columns_are_every_hashed_column_but_the_key_and_escalated_at():
+    assert set(_MERGED_COLUMNS) == set(CONVERSATION_COLUMNS) - {"conversation_id", "escalated_at"}
+
+
+def test_coalesce_keeps_stored_values_and_clears_the_hash_when_it_does():
+    for column in _MERGED_COLUMNS:
+        assert f"{column} = COALESCE(EXCLUDED.{column}, target.{column})" in COALESCE_MERGE.clause
+        assert f"(EXCLUDED.{column} IS NULL AND target.{column} IS NOT NULL)" in COALESCE_MERGE.clause
+    assert "THEN NULL ELSE EXCLUDED.row_hash" in COALESCE_MERGE.clause
+
+
+def test_replace_applies_the_record_as_is():
+    for column in _MERGED_COLUMNS:
+        assert f"    {column} = EXCLUDED.{column},\n" in REPLACE.clause
+    assert "row_hash = EXCLUDED.row_hash" in REPLACE.clause
+    assert "COALESCE" not in REPLACE.clause
+
+
+def test_escalated_at_is_never_cleared():
+    for policy in (ESCALATION_ONLY, COALESCE_MERGE, REPLACE):
+        assert "WHEN EXCLUDED.escalated_at IS NOT NULL THEN EXCLUDED.escalated_at" in policy.clause
+    assert "row_hash" not in ESCALATION_ONLY.clause
+
+
+def test_insert_only_and_registry():
+    assert INSERT_ONLY.clause == "ON CONFLICT (conversation_id) DO NOTHING"
+    assert set(POLICIES) >= {"escalation-only", "insert-only", "coalesce", "replace"}
+    custom = register_policy(ConflictPolicy("test-custom", INSERT_ONLY.clause))
+    try:
+        assert POLICIES["test-custom"] is custom
+    finally:
+        del POLICIES["test-custom"]
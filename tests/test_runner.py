@@ -0,0 +1,84 @@
+import sys
+import time
+
+import pytest
+
+import runner
+from runner import Step, run_dag
+
+
+@pytest.fixture(autouse=True)
+def quick(monkeypatch, tmp_path):
+    monkeypatch.setattr(runner, "LOG_DIR", tmp_path)
+    monkeypatch.setattr(runner, "RETRY_DELAY", 0)
+    monkeypatch.setattr(runner, "_console", sys.stderr)
+
+
+def _states(steps):
+    return {step.name: step.status for step in steps}
+
+
+def test_failed_dependency_skips_its_dependents_only():
+    order = []
+
+    def fail(args):
+        raise SystemExit(2)
+
+    steps = [
+        Step("a", lambda args: order.append("a")),
+        Step("b", fail, deps=["a"]),
+        Step("c", lambda args: order.append("c"), deps=["b"]),
+        Step("d", lambda args: order.append("d"), deps=["a"]),
+    ]
+    run_dag(steps)
+    assert _states(steps) == {"a": "succeeded", "b": "failed", "c": "skipped", "d": "succeeded"}
+    assert order == ["a", "d"]
+    assert steps[1].error == "failed with exit code 2"
+    assert steps[2].error == "dependency did not succeed"
+
+
+def test_failed_attempts_are_retried():
+    attempts = []
+
+    def flaky(args):
+        attempts.append(args)
+        if len(attempts) == 1:
+            raise RuntimeError("boom")
+
+    steps = [Step("flaky", flaky, ["--x"], retries=1)]
+    run_dag(steps)
+    assert steps[0].status == "succeeded"
+    assert steps[0].attempts == 2 and attempts == [["--x"], ["--x"]]
+    assert "RuntimeError: boom" in (runner.LOG_DIR / "flaky.log").read_text()
+
+
+def test_timed_out_step_is_abandoned_not_retried():
+    steps = [
+        Step("slow", lambda args: time.sleep(0.3), timeout=0.05, retries=3),
+        Step("after", lambda args: None, deps=["slow"]),
+    ]
+    run_dag(steps)
+    assert _states(steps) == {"slow": "failed", "after": "skipped"}
+    assert steps[0].attempts == 1 and steps[0].abandoned
+    assert steps[0].error == "timed out after 0.05s"
+    time.sleep(0.4)  # let the abandoned attempt release the in-process lock
+
+
+def test_subprocess_steps_and_the_report(tmp_path):
+    script = tmp_path / "ok.py"
+    script.write_text("print('from the subprocess')")
+    steps = [Step("sub", str(script))]
+    run_dag(steps)
+    assert steps[0].status == "succeeded" and steps[0].kind == "subprocess"
+    assert "from the subprocess" in (tmp_path / "sub.log").read_text()
+    report = runner.write_report(steps, "start", tmp_path / "report.json")
+    assert report["succeeded"] and report["steps"][0]["attempts"] == 1
+
+
+def test_unknown_dependencies_and_cycles():
+    with pytest.raises(SystemExit, match="unknown step"):
+        run_dag([Step("a", lambda args: None, deps=["missing"])])
+    steps = [Step("a", lambda args: None, deps=["b"]), Step("b", lambda args: None, deps=["a"])]
+    run_dag(steps)
+    assert _states(steps) == {"a": "skipped", "b": "skipped"}
+    assert steps[0].error == "dependency cycle"
@@ -0,0 +1,53 @@
+from datetime import date
+
+from atlas_sync import _month_shards, _month_windows, due_days, plan_tiered
+
+
+def test_month_shards_cover_the_range_and_share_boundaries():
+    assert _month_shards(date(2023, 11, 15), date(2024, 2, 10)) == [
+        (date(2023, 11, 15), date(2023, 12, 1)),
+        (date(2023, 12, 1), date(2024, 1, 1)),
+        (date(2024, 1, 1), date(2024, 2, 1)),
+        (date(2024, 2, 1), date(2024, 2, 10)),
+    ]
+
+
+def test_month_shards_single_month_and_empty_range():
+    assert _month_shards(date(2024, 2, 1), date(2024, 3, 1)) == [(date(2024, 2, 1), date(2024, 3, 1))]
+    assert _month_shards(date(2024, 2, 1), date(2024, 2, 1)) == []
+
+
+def test_month_windows_span_the_due_days_of_each_month():
+    days = [date(2024, 2, 3), date(2024, 2, 27), date(2024, 3, 1), date(2024, 3, 5), date(2025, 3, 9)]
+    assert _month_windows(days) == [
+        (date(2024, 2, 3), date(2024, 2, 27)),
+        (date(2024, 3, 1), date(2024, 3, 5)),
+        (date(2025, 3, 9), date(2025, 3, 9)),
+    ]
+    assert _month_windows([]) == []
+
+
+def test_due_days_are_hot_recent_or_in_a_rotation_month():
+    today = date(2024, 6, 15)
+    slot = today.toordinal() % 30
+    months = [(year, month) for year in (2021, 2022, 2023) for month in range(1, 13)]
+    rotation_day = next(date(y, m, 11) for y, m in months if (y * 12 + m) % 30 == slot)
+    cold_day, hot_day = [date(y, m, 11) for y, m in months if (y * 12 + m) % 30 != slot][:2]
+    stored = {hot_day: (5, True), cold_day: (5, False), rotation_day: (7, False), date(2024, 6, 10): (3, False)}
+
+    days, rows = due_days(stored, today, recent_days=14, rotation_days=30)
+    assert hot_day in days and rotation_day in days
+    assert cold_day not in days
+    assert {today, date(2024, 6, 10), date(2024, 6, 2)} <= set(days)
+    assert date(2024, 6, 1) not in days
+    assert rows == {day: count for day, (count, _) in stored.items()}
+
+
+def test_plan_tiered_falls_back_when_the_full_walk_is_cheaper():
+    stored = {date(2024, month, day): 10 for month in range(1, 13) for day in (1, 28)}
+    # One hot day per month: 12 windows (24 requests) against a 1-page full walk (2 requests)
+    assert plan_tiered([date(2024, month, 1) for month in range(1, 13)], stored, limit=3000) is None
+    # At 3,000 rows a day the full walk takes 25 requests, the two windows 4
+    stored = {day: 3000 for day in stored}
+    windows = plan_tiered([date(2024, 5, 1), date(2024, 12, 28)], stored, limit=3000)
+    assert windows == [(date(2024, 5, 1), date(2024, 5, 1)), (date(2024, 12, 28), date(2024, 12, 28))]
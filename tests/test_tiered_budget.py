@@ -0,0 +1,100 @@
+"""Request budget of the tiered sync against the mock Atlas API (benchmarks/mock_atlas.py)."""
+import contextlib
+import pathlib
+import sys
+import threading
+from datetime import date, timedelta
+
+import pytest
+
+import atlas_api
+import atlas_sync
+from atlas_api import PAGE_SIZE_MAX, page_size, rate_limiter
+from atlas_bulk import UpsertResult
+from atlas_cache import page_cache
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parent.parent / "benchmarks"))
+from mock_atlas import MockAtlas, make_server  # noqa: E402
+from synthetic import EPOCH, synthetic_conversation  # noqa: E402
+
+
+@pytest.fixture
+def api(monkeypatch):
+    """Start a mock API and point the sync at it, with its database work stubbed out."""
+    servers = []
+    written = []
+
+    def start(conversations):
+        atlas = MockAtlas(conversations)
+        server = make_server(atlas, port=0)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+        monkeypatch.setattr(atlas_api, "API_URL", f"http://127.0.0.1:{server.server_port}/v1/conversations")
+        return atlas
+
+    def write_page(records, policy, checkpoint=None):
+        written.extend(record["id"] for record in records)
+        return UpsertResult(len(records), 0, 0, len(records))
+
+    monkeypatch.setattr(atlas_sync, "write_page", write_page)
+    monkeypatch.setattr(atlas_sync, "connection", contextlib.nullcontext)
+    monkeypatch.setattr(atlas_sync, "save_checkpoint", lambda *args, **kwargs: None)
+    monkeypatch.setattr(atlas_sync, "load_checkpoint", lambda name: None)
+    monkeypatch.setattr(atlas_sync, "load_checkpoints", lambda prefix: {})
+    cache_enabled, interval = page_cache.enabled, rate_limiter.interval
+    page_cache.configure(enabled=False)
+    rate_limiter.configure(0)
+    page_size.reset(PAGE_SIZE_MAX)
+    yield start, written
+    for server in servers:
+        server.shutdown()
+    page_cache.configure(enabled=cache_enabled)
+    rate_limiter.interval = interval
+
+
+def _stored(atlas, hot):
+    """{created_at day: (rows, holds a hot conversation)} as tiered_days would read it from the table."""
+    stored = {}
+    for i in range(atlas.conversations):
+        day = (EPOCH + timedelta(minutes=atlas.minutes_apart * i)).date()
+        rows, is_hot = stored.get(day, (0, False))
+        stored[day] = (rows + 1, is_hot or hot(i))
+    return stored
+
+
+def _requests(atlas, sync, **options):
+    before = atlas.requests
+    sync(atlas_sync.REPLACE, queue_depth=2, **options)
+    return atlas.requests - before
+
+
+def _plan(monkeypatch, atlas, hot):
+    stored = _stored(atlas, hot)
+    monkeypatch.setattr(atlas_sync, "tiered_days",
+                        lambda recent_days, rotation_days: atlas_sync.due_days(stored, date.today()))
+
+
+def test_scattered_hot_conversations_cost_no_more_than_the_full_walk(api, monkeypatch):
+    start, written = api
+    atlas = start(10_000)
+    _plan(monkeypatch, atlas, hot=lambda i: i % 50 == 0)  # 2% open, spread over the whole history
+
+    full = _requests(atlas, atlas_sync.sync_full, fetchers=2)
+    written.clear()
+    assert _requests(atlas, atlas_sync.sync_tiered, workers=2) <= full
+    assert len(written) == 10_000
+
+
+def test_recent_hot_conversations_cost_a_fraction_of_the_full_walk(api, monkeypatch):
+    start, written = api
+    atlas = start(60_000)
+    recent = atlas.conversations - atlas.conversations // 100  # only the newest 1% are hot
+    _plan(monkeypatch, atlas, hot=lambda i: i >= recent)
+
+    full = _requests(atlas, atlas_sync.sync_full, fetchers=2)
+    written.clear()
+    tiered = _requests(atlas, atlas_sync.sync_tiered, workers=2)
+    assert tiered * 2 <= full
+    assert len(written) < atlas.conversations // 5
+    fetched = set(written)
+    assert all(synthetic_conversation(i)["id"] in fetched for i in range(recent, atlas.conversations, 97))